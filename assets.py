@@ -0,0 +1,119 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import customtkinter as ctk
+from PIL import Image, ImageOps
+
+# Artwork loader. A source image is scaled once to the pixel size it is shown
+# at (its CTk size times the display scaling, so HiDPI screens get a sharp
+# variant) and that variant is kept in ASSET_CACHE_DIR as a small PNG named
+# after the source's hash and the pixel size. Later launches decode the small
+# file instead of the full-size source (icon.png is 1759x2048), and an edited
+# source gets a new hash, so stale variants are never used.
+#
+# CTkImages are shared through an in-memory LRU: every card showing the same
+# thumbnail uses one image, and at most MAX_CACHED_IMAGES are kept alive by
+# the cache itself.
+
+ASSET_CACHE_DIR = "asset_cache"
+# Optional product pictures for the order window's cards: <product id>.png
+# (or .jpg/.jpeg/.webp) in this folder
+PRODUCT_IMAGE_DIR = "product_images"
+PRODUCT_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+THUMBNAIL_SIZE = (32, 32)
+MAX_CACHED_IMAGES = 512 # ~4 MB of thumbnails; more than a catalogue shows at once
+
+_images = OrderedDict() # (path, size, scaling, fit) -> CTkImage, least recently used first
+_source_hashes = {} # path -> ((mtime, file size), hash)
+_product_images = (None, {}) # (folder mtime, {product id: path})
+
+# Where images came from, for benchmarks/bench_assets.py
+stats = {"memory": 0, "disk": 0, "scaled": 0}
+
+
+def _source_hash(path):
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _source_hashes.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, "rb") as f:
+            cached = _source_hashes[path] = (key, hashlib.sha1(f.read()).hexdigest()[:16])
+    return cached[1]
+
+def _scale(path, pixel_size, fit):
+    with Image.open(path) as source:
+        source.draft("RGB", pixel_size) # JPEGs decode straight at a reduced size
+        if fit:
+            # Thumbnails keep their aspect ratio inside the box
+            image = ImageOps.contain(source, pixel_size, Image.LANCZOS)
+        else:
+            # Same stretch CTkImage applies to the full-size image
+            image = source.resize(pixel_size, Image.LANCZOS)
+    return image if image.mode in ("RGB", "RGBA") else image.convert("RGBA")
+
+def load_scaled(path, pixel_size, fit=False):
+    # PIL image of `path` at pixel_size, from the disk cache when possible
+    width, height = pixel_size
+    cached_path = os.path.join(ASSET_CACHE_DIR, f"{_source_hash(path)}_{width}x{height}{'_fit' if fit else ''}.png")
+    if os.path.exists(cached_path):
+        stats["disk"] += 1
+        image = Image.open(cached_path)
+        image.load()
+        return image
+
+    stats["scaled"] += 1
+    image = _scale(path, pixel_size, fit)
+    try:
+        # Written under a .tmp name and renamed, so a crash never leaves a half-written PNG
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        image.save(cached_path + ".tmp", "PNG")
+        os.replace(cached_path + ".tmp", cached_path)
+    except OSError as e:
+        print(f"Error caching {path}: {e}")
+    return image
+
+def get_image(path, size, scaling=1.0, fit=False):
+    # Shared CTkImage of `path` shown at `size` (CTk units) on a display with
+    # this scaling, e.g. ctk.ScalingTracker.get_widget_scaling(widget)
+    key = (path, size, scaling, fit)
+    image = _images.get(key)
+    if image is not None:
+        stats["memory"] += 1
+        _images.move_to_end(key)
+        return image
+
+    # CTkImage resizes to round(size * scaling); at that size its resize is just a copy
+    pixel_size = (round(size[0] * scaling), round(size[1] * scaling))
+    image = _images[key] = ctk.CTkImage(load_scaled(path, pixel_size, fit), size=size)
+    if len(_images) > MAX_CACHED_IMAGES:
+        _images.popitem(last=False)
+    return image
+
+def product_image_path(product_id):
+    # The picture file of a product, or None. The folder is listed again only
+    # when it changes.
+    global _product_images
+    try:
+        mtime = os.stat(PRODUCT_IMAGE_DIR).st_mtime_ns
+    except OSError:
+        return None
+    if _product_images[0] != mtime:
+        paths = {}
+        for entry in os.scandir(PRODUCT_IMAGE_DIR):
+            stem, extension = os.path.splitext(entry.name)
+            if stem.isdigit() and extension.lower() in PRODUCT_IMAGE_EXTENSIONS:
+                paths[int(stem)] = entry.path
+        _product_images = (mtime, paths)
+    return _product_images[1].get(product_id)
+
+def product_thumbnail(product_id, scaling=1.0):
+    # CTkImage for a product card, or None when the product has no picture
+    path = product_image_path(product_id)
+    if path is None:
+        return None
+    try:
+        return get_image(path, THUMBNAIL_SIZE, scaling, fit=True)
+    except OSError as e:
+        print(f"Error loading {path}: {e}")
+        return None
@@ -0,0 +1,125 @@
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Make the app modules importable when a benchmark is run as a script.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connection
+import database
+
+
+@contextmanager
+def temp_database():
+    # Points the database module at a throwaway file, so benchmarks never
+    # touch the real stock_control.db.
+    original_name = database.DATABASE_NAME
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE_NAME = os.path.join(tmp_dir, "bench.db")
+        try:
+            database.init_db()
+            yield database.DATABASE_NAME
+        finally:
+            connection.close_all()
+            database.DATABASE_NAME = original_name
+
+
+def old_get_orders(status=None):
+    # The order list query from before get_orders_page and the streaming
+    # export (grouping in Python into dicts), kept only for comparisons
+    query = """
+        SELECT
+            o.id,
+            o.order_date,
+            o.status,
+            o.customer_name,
+            o.metodo_pago,
+            o.es_socio,
+            p.id,
+            p.name,
+            oi.quantity,
+            oi.item_price
+        FROM orders o
+        JOIN order_items oi ON o.id = oi.order_id
+        JOIN products p ON oi.product_id = p.id
+    """
+    params = ()
+    if status is not None:
+        query += " WHERE o.status = ?"
+        params = (status,)
+    query += " ORDER BY o.order_date DESC"
+    with connection.transaction(database.DATABASE_NAME) as c:
+        c.execute(query, params)
+        orders_data = c.fetchall()
+
+    # Group order items by order ID
+    orders_grouped = {}
+    for order_id, order_date, order_status, customer_name, metodo_pago, es_socio, product_id, product_name, quantity, item_price in orders_data:
+        if order_id not in orders_grouped:
+            orders_grouped[order_id] = {
+                "id": order_id,
+                "order_date": order_date,
+                "status": order_status,
+                "customer_name": customer_name,
+                "metodo_pago": metodo_pago,
+                "es_socio": es_socio,
+                "items": [],
+                "total_price": 0
+            }
+        orders_grouped[order_id]["items"].append({
+            "product_id": product_id,
+            "product_name": product_name,
+            "quantity": quantity,
+            "item_price": item_price
+        })
+        orders_grouped[order_id]["total_price"] += (quantity * item_price)
+
+    return list(orders_grouped.values())
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(label, seconds):
+    print(f"{label:<45} {seconds * 1e6:10.1f} us")
+
+
+def populate(order_count, items_per_order=3, product_count=60, completed_ratio=0.9, seed=1):
+    # Fills the current benchmark database with synthetic products and orders
+    # using raw executemany, bypassing the app's own write path.
+    import random
+
+    rng = random.Random(seed)
+    categories = ["Pizzas", "Empanadas", "Bebidas"]
+    payment_methods = ["Efectivo", "Transferencia"]
+    with connection.transaction(database.DATABASE_NAME) as c:
+        c.executemany(
+            "INSERT INTO products (name, price, stock, category) VALUES (?, ?, ?, ?)",
+            [(f"Producto {i}", float(rng.randrange(1000, 20000, 500)), 1_000_000, categories[i % 3]) for i in range(product_count)],
+        )
+        orders = []
+        items = []
+        for order_id in range(1, order_count + 1):
+            completed = rng.random() < completed_ratio
+            day = 1 + (order_id - 1) * 28 // order_count
+            orders.append((
+                order_id,
+                f"2026-02-{day:02d} {rng.randrange(18, 24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+                1 if completed else 0,
+                f"Cliente {rng.randrange(500)}",
+                rng.choice(payment_methods) if completed else None,
+                1 if rng.random() < 0.2 else 0,
+            ))
+            for product_id in rng.sample(range(1, product_count + 1), items_per_order):
+                items.append((order_id, product_id, rng.randrange(1, 5), float(rng.randrange(1000, 20000, 500))))
+        c.executemany(
+            "INSERT INTO orders (id, order_date, status, customer_name, metodo_pago, es_socio) VALUES (?, ?, ?, ?, ?, ?)",
+            orders,
+        )
+        c.executemany("INSERT INTO order_items (order_id, product_id, quantity, item_price) VALUES (?, ?, ?, ?)", items)
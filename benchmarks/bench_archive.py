@@ -0,0 +1,53 @@
+# Clearing the night's orders: the old DELETE of every order row versus
+# archive_orders, which renames the tables inside one transaction. Then
+# drop_old_archives on the exported archive, checking that its pages are
+# really returned and the file shrinks.
+#
+#   python benchmarks/bench_archive.py
+import os
+import time
+
+from _common import connection, database, populate, report, temp_database
+
+
+def delete_orders():
+    # The old clear_all_orders
+    with connection.transaction(database.DATABASE_NAME) as c:
+        c.execute("DELETE FROM order_items")
+        c.execute("DELETE FROM orders")
+        c.execute("DELETE FROM sales_totals")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    for orders in (1_000, 10_000, 100_000):
+        with temp_database():
+            populate(orders, completed_ratio=1.0)
+            database.checkpoint()
+            report(f"DELETE orders, {orders} orders", timed(delete_orders))
+
+        with temp_database():
+            populate(orders, completed_ratio=1.0)
+            database.checkpoint()
+            report(f"archive_orders, {orders} orders", timed(database.archive_orders))
+
+            for archive_id in database.get_unexported_archives():
+                database.mark_archive_exported(archive_id, "bench.csv")
+            conn = connection.get_connection(database.DATABASE_NAME)
+            database.checkpoint()
+            size_before = os.path.getsize(database.DATABASE_NAME)
+            report(f"drop_old_archives, {orders} orders", timed(lambda: database.drop_old_archives(keep=0, vacuum_pages=10 ** 6)))
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            database.checkpoint()
+            size_after = os.path.getsize(database.DATABASE_NAME)
+            print(f"{'':<45} {size_before / 1e6:.2f} MB -> {size_after / 1e6:.2f} MB, {free_pages} free pages left")
+            assert free_pages == 0 and size_after < size_before, "the archive's pages weren't returned"
+
+
+if __name__ == "__main__":
+    main()
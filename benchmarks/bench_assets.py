@@ -0,0 +1,66 @@
+# Sidebar icon and product thumbnails: the old load (decode the full-size
+# icon.png, which CTkImage keeps and resizes on first paint) versus
+# assets.load_scaled with a cold and a warm disk cache, plus the pixels each
+# keeps in memory. Then builds thumbnails for a catalogue of synthetic
+# product pictures, cold and warm. Runs headless.
+#
+#   python benchmarks/bench_assets.py
+import os
+import tempfile
+import time
+
+from _common import report
+
+from PIL import Image
+
+import assets
+
+ICON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "icon.png")
+ICON_SIZE = (160, 200)
+PRODUCTS = 300
+
+
+def old_icon(scaling):
+    image = Image.open(ICON)
+    scaled = image.resize((round(ICON_SIZE[0] * scaling), round(ICON_SIZE[1] * scaling)))
+    return image, scaled
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assets.ASSET_CACHE_DIR = os.path.join(tmp_dir, "cache")
+        assets.PRODUCT_IMAGE_DIR = os.path.join(tmp_dir, "products")
+
+        for scaling in (1.0, 1.5):
+            pixel_size = (round(ICON_SIZE[0] * scaling), round(ICON_SIZE[1] * scaling))
+            (source, scaled), seconds = timed(lambda: old_icon(scaling))
+            report(f"icon x{scaling}: full-size decode + resize", seconds)
+            print(f"{'':<45} {source.width * source.height * len(source.getbands()) / 1e6:10.1f} MB kept by CTkImage")
+            image, seconds = timed(lambda: assets.load_scaled(ICON, pixel_size))
+            report(f"icon x{scaling}: load_scaled, cold cache", seconds)
+            image, seconds = timed(lambda: assets.load_scaled(ICON, pixel_size))
+            report(f"icon x{scaling}: load_scaled, warm cache", seconds)
+            print(f"{'':<45} {image.width * image.height * len(image.getbands()) / 1e6:10.2f} MB kept")
+
+        os.makedirs(assets.PRODUCT_IMAGE_DIR)
+        for product_id in range(1, PRODUCTS + 1):
+            Image.new("RGB", (800, 600), (product_id % 256, product_id // 256 * 40, 160)).save(os.path.join(assets.PRODUCT_IMAGE_DIR, f"{product_id}.jpg"), quality=85)
+
+        for label in ("cold cache", "warm cache"):
+            assets._images.clear() # As on a new launch
+            assets._source_hashes.clear()
+            _, seconds = timed(lambda: [assets.product_thumbnail(product_id) for product_id in range(1, PRODUCTS + 1)])
+            report(f"{PRODUCTS} thumbnails, {label} (per thumbnail)", seconds / PRODUCTS)
+        _, seconds = timed(lambda: [assets.product_thumbnail(product_id) for product_id in range(1, PRODUCTS + 1)])
+        report(f"{PRODUCTS} thumbnails, shared CTkImages (per thumbnail)", seconds / PRODUCTS)
+        print(f"sources: {assets.stats}")
+
+
+if __name__ == "__main__":
+    main()
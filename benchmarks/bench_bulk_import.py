@@ -0,0 +1,38 @@
+# Orders per second: a loop of add_order calls versus one add_orders_bulk.
+#
+#   python benchmarks/bench_bulk_import.py
+import random
+import time
+
+from _common import database, populate, temp_database
+
+
+def make_orders(count, product_ids, seed=1):
+    rng = random.Random(seed)
+    return [
+        database.BulkOrder(customer_name=f"Cliente {i}", es_socio=rng.random() < 0.2,
+                           items=[(pid, rng.randint(1, 3), 1000.0) for pid in rng.sample(product_ids, 3)])
+        for i in range(count)
+    ]
+
+
+def main():
+    for count in (1_000, 10_000):
+        for label in ("add_order loop", "add_orders_bulk"):
+            with temp_database():
+                populate(0)
+                product_ids = [row[0] for row in database.get_products()]
+                orders = make_orders(count, product_ids)
+
+                start = time.perf_counter()
+                if label == "add_order loop":
+                    for order in orders:
+                        database.add_order(order.items, order.customer_name, order.es_socio)
+                else:
+                    database.add_orders_bulk(orders)
+                elapsed = time.perf_counter() - start
+                print(f"{label:<20} {count:>6} orders {count / elapsed:>10,.0f} orders/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Product reads served by the catalogue cache versus the products table, at a
+# growing catalogue size: the whole list (App.load_products, every order
+# window), a PRODUCTS_CHANGED patch, and a view asking whether anything
+# changed at all. Then a round of writes, checking the cache still matches
+# the table.
+#
+#   python benchmarks/bench_catalogue.py
+import json
+
+from _common import connection, database, populate, report, temp_database, time_per_call
+
+import catalogue
+
+REPEAT = 200
+
+
+def sql_products(ids=None):
+    with connection.transaction(database.DATABASE_NAME) as c:
+        if ids is None:
+            c.execute("SELECT id, name, price, stock, category FROM products")
+        else:
+            c.execute("SELECT id, name, price, stock, category FROM products WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+        return c.fetchall()
+
+
+def main():
+    for product_count in (100, 1000, 10000):
+        with temp_database():
+            populate(0, product_count=product_count)
+            changed = [1, product_count // 2, product_count]
+            print(f"{product_count} products")
+            report("  all products, SQL", time_per_call(sql_products, REPEAT))
+            report("  all products, cache", time_per_call(database.get_products, REPEAT))
+            report("  3 changed products, SQL", time_per_call(lambda: sql_products(changed), REPEAT))
+            report("  3 changed products, cache", time_per_call(lambda: database.get_products(ids=changed), REPEAT))
+            version, products = database.get_catalogue()
+            report("  unchanged check (get_catalogue)", time_per_call(lambda: database.get_catalogue(version), REPEAT))
+
+            for product_id in changed:
+                database.update_product_stock(product_id, 5)
+                database.add_order([(product_id, 2, 100.0)], "Mesa 1", 0)
+            order_id = database.add_order([(changed[0], 1, 100.0)], "Mesa 2", 0)
+            database.update_order(order_id, [(changed[1], 1, 100.0)], 0)
+            database.add_product("Nuevo", 100.0, 10)
+            print(f"  after writes: version {catalogue.version}, {len(database.verify_catalogue())} differences, stats {catalogue.stats}")
+            catalogue.stats.update(hits=0, misses=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# What the views re-read after each user action: the old blanket reload
+# (every pending order, every product, the sales totals) versus the queries
+# App.apply_database_events makes for the change events the action publishes.
+# Counts the SQL statements and rows read, and times them, with a growing
+# number of pending orders.
+#
+#   python benchmarks/bench_change_events.py
+import time
+
+from _common import connection, database, populate, temp_database
+
+import events
+
+
+def blanket_reload():
+    return [database.get_orders_page(status=0), database.get_products(),
+            [database.get_total_sales(), database.get_total_sales_by_payment_method("Efectivo")]]
+
+
+def event_reload(changes):
+    # Same mapping as App.apply_database_events
+    order_ids, closed_ids, product_ids, sales_changed = set(), set(), set(), False
+    for event in changes:
+        if event.kind in (events.ORDERS_ADDED, events.ORDERS_UPDATED):
+            order_ids.update(event.ids)
+        elif event.kind == events.ORDERS_CLOSED:
+            closed_ids.update(event.ids)
+        elif event.kind == events.PRODUCTS_CHANGED:
+            product_ids.update(event.ids)
+        elif event.kind == events.SALES_CHANGED:
+            sales_changed = True
+    results = []
+    if order_ids - closed_ids:
+        results.append(database.get_orders_page(status=0, ids=sorted(order_ids - closed_ids)))
+    if product_ids:
+        results.append(database.get_products(ids=sorted(product_ids)))
+    if sales_changed:
+        results.append([database.get_total_sales(), database.get_total_sales_by_payment_method("Efectivo")])
+    return results
+
+
+def measure(reload):
+    statements = []
+    conn = connection.get_connection(database.DATABASE_NAME)
+    conn.set_trace_callback(statements.append)
+    start = time.perf_counter()
+    results = reload()
+    elapsed = time.perf_counter() - start
+    conn.set_trace_callback(None)
+    rows = sum(len(result) for result in results)
+    queries = sum(1 for statement in statements if statement.lstrip().upper().startswith("SELECT"))
+    return queries, rows, elapsed
+
+
+def main():
+    print(f"{'pending':>8} {'action':<14} {'reload':<8} {'queries':>8} {'rows':>7} {'ms':>8}")
+    for pending in (100, 1000, 10000):
+        with temp_database():
+            populate(pending, product_count=200, completed_ratio=0.0)
+            product_ids = [row[0] for row in database.get_products()]
+            changes = []
+            events.subscribe(changes.append)
+
+            actions = [
+                ("new order", lambda: database.add_order([(product_ids[0], 1, 100.0), (product_ids[1], 2, 100.0)], "Mesa 1", 0)),
+                ("edit order", lambda: database.update_order(1, [(product_ids[0], 3, 100.0)], 0)),
+                ("close order", lambda: database.update_order_status_and_payment_method(2, 1, "Efectivo")),
+            ]
+            for label, action in actions:
+                changes.clear()
+                action()
+                for name, reload in (("blanket", blanket_reload), ("events", lambda: event_reload(changes))):
+                    queries, rows, elapsed = measure(reload)
+                    print(f"{pending:>8} {label:<14} {name:<8} {queries:>8} {rows:>7} {elapsed * 1000:>8.2f}")
+            events.unsubscribe(changes.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Size and parse time of an export as CSV versus its .pcol copy: parsing the
+# CSV into typed values, reading the .pcol columns, and rebuilding CSV-like
+# tuples from the .pcol.
+#
+#   python benchmarks/bench_columnar.py
+import csv
+import os
+import tempfile
+import time
+
+from _common import populate, report, temp_database
+
+import columnar
+import export
+
+
+def parse_csv(filename):
+    with open(filename, newline="", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        return [(int(r[0]), r[1], r[2], r[3], r[4], int(r[5]), float(r[6]), float(r[7])) for r in reader]
+
+
+def best_of(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    for orders in (10_000, 170_000): # ~30k and ~500k lines
+        with temp_database(), tempfile.TemporaryDirectory() as csv_dir:
+            populate(orders, completed_ratio=1.0)
+            csv_filename = export.export_and_clear_orders(csv_dir)
+            pcol_filename = os.path.splitext(csv_filename)[0] + ".pcol"
+
+            csv_size, pcol_size = os.path.getsize(csv_filename), os.path.getsize(pcol_filename)
+            print(f"{orders} orders: CSV {csv_size / 1e6:.1f} MB, .pcol {pcol_size / 1e6:.1f} MB ({pcol_size / csv_size:.0%})")
+            report(f"parse CSV, {orders} orders", best_of(lambda: parse_csv(csv_filename)))
+            report(f"read .pcol columns, {orders} orders", best_of(lambda: columnar.read_columns(pcol_filename)))
+            report(f"read .pcol as lines, {orders} orders", best_of(lambda: list(columnar.iter_lines(pcol_filename))))
+            report(f"read .pcol footer, {orders} orders", best_of(lambda: columnar.read_footer(pcol_filename)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Per-call latency of database functions with a fresh sqlite3.connect per call
+# (the old behaviour) versus the pooled connection from connection.py.
+#
+#   python benchmarks/bench_connection.py
+import sqlite3
+
+from _common import database, report, temp_database, time_per_call
+
+REPEAT = 2000
+
+
+def get_products_fresh_connection():
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    c = conn.cursor()
+    c.execute("SELECT id, name, price, stock, category FROM products")
+    products = c.fetchall()
+    conn.close()
+    return products
+
+
+def update_stock_fresh_connection():
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    c = conn.cursor()
+    c.execute("UPDATE products SET stock = ? WHERE id = ?", (100, 1))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    with temp_database():
+        for i in range(50):
+            database.add_product(f"Producto {i}", 1000.0 + i, 100, "Pizzas")
+
+        report("get_products (fresh connection)", time_per_call(get_products_fresh_connection, REPEAT))
+        report("get_products (pooled connection)", time_per_call(database.get_products, REPEAT))
+        report("update stock (fresh connection)", time_per_call(update_stock_fresh_connection, REPEAT // 4))
+        report("update stock (pooled connection)", time_per_call(lambda: database.update_product_stock(1, 100), REPEAT // 4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Throughput and peak memory of the CSV export for ~1M order lines: the old
+# path (old_get_orders into nested dicts, then DictWriter) versus streaming from
+# the cursor with export.write_orders_csv. Each path runs in its own process
+# so that ru_maxrss reflects only that path.
+#
+#   python benchmarks/bench_export.py [order_lines]
+import csv
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from _common import connection, database, old_get_orders, populate, temp_database
+
+import export
+
+ITEMS_PER_ORDER = 3
+
+
+def old_export(filename):
+    completed_orders = old_get_orders(status=1)
+    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=export.CSV_FIELDS)
+        writer.writeheader()
+        for order in completed_orders:
+            for item in order['items']:
+                writer.writerow({
+                    'order_id': order['id'],
+                    'customer_name': order.get('customer_name', 'N/A'),
+                    'order_date': order['order_date'],
+                    'metodo_pago': order.get('metodo_pago', 'N/A'),
+                    'product_name': item['product_name'],
+                    'quantity': item['quantity'],
+                    'item_price': item['item_price'],
+                    'total_order_price': order['total_price']
+                })
+
+
+def run_child(path, kind):
+    # Child process: export from an existing database and report
+    database.DATABASE_NAME = path
+    database.apply_performance_profile()
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    filename = path + f".{kind}.csv"
+    start = time.perf_counter()
+    if kind == "old":
+        old_export(filename)
+    else:
+        export.write_orders_csv(filename, status=1)
+    elapsed = time.perf_counter() - start
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+    lines = database.count_order_lines(1)
+    print(f"{kind:<10} {elapsed:7.2f} s  {lines / elapsed:10.0f} lines/s  extra peak RSS {peak_kib / 1024:7.1f} MiB")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3])
+        return
+
+    order_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with temp_database() as path:
+        populate(order_lines // ITEMS_PER_ORDER, items_per_order=ITEMS_PER_ORDER, completed_ratio=1.0)
+        connection.close_all()
+        print(f"{database.count_order_lines(1)} completed order lines")
+        for kind in ("old", "streaming"):
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, kind], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Latency and peak Python memory of the old get_orders (grouping in Python into
+# dicts) versus get_orders_page (grouping in SQLite into namedtuples) for a
+# backlog of 50k pending orders.
+#
+#   python benchmarks/bench_get_orders.py
+import time
+import tracemalloc
+
+from _common import database, old_get_orders, populate, temp_database
+
+ORDERS = 50_000
+
+
+def measure(label, fn):
+    # Timed without tracemalloc, which slows allocation-heavy code a lot
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<45} {elapsed * 1000:8.1f} ms  peak {peak / 2**20:7.1f} MiB  ({len(result)} orders)")
+    return result
+
+
+def main():
+    with temp_database():
+        populate(ORDERS, completed_ratio=0.0)
+        measure("old get_orders(status=0)", lambda: old_get_orders(status=0))
+        measure("get_orders_page(status=0)", lambda: database.get_orders_page(status=0))
+        first_page = measure("get_orders_page(status=0, limit=50)", lambda: database.get_orders_page(status=0, limit=50))
+        measure("get_orders_page(..., offset=49950)", lambda: database.get_orders_page(status=0, limit=50, offset=ORDERS - 50))
+
+        last = first_page[-1]
+        cursor = (last.order_date, last.id)
+        for _ in range(ORDERS // 50 - 2):
+            page = database.get_orders_page(status=0, limit=50, before=cursor)
+            cursor = (page[-1].order_date, page[-1].id)
+        measure("get_orders_page(..., before=last page)", lambda: database.get_orders_page(status=0, limit=50, before=cursor))
+
+
+if __name__ == "__main__":
+    main()
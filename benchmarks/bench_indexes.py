@@ -0,0 +1,65 @@
+# Query plans and timings of the hot queries on a synthetic 100k-order
+# database, with only the base schema (migration 1) and after the index
+# migrations.
+#
+#   python benchmarks/bench_indexes.py
+import time
+
+from _common import connection, populate, temp_database
+
+import migrations
+
+ORDERS = 100_000
+
+QUERIES = {
+    "get_orders(status=0)": ("""
+        SELECT o.id, o.order_date, p.name, oi.quantity, oi.item_price
+        FROM orders o
+        JOIN order_items oi ON o.id = oi.order_id
+        JOIN products p ON oi.product_id = p.id
+        WHERE o.status = ?
+        ORDER BY o.order_date DESC
+    """, (0,)),
+    "update_order item lookup": ("SELECT id FROM order_items WHERE order_id = ? AND product_id = ?", (ORDERS // 2, 7)),
+    "get_total_sales_by_payment_method": ("""
+        SELECT SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END)
+        FROM orders o
+        JOIN order_items oi ON o.id = oi.order_id
+        WHERE o.status = 1 AND o.metodo_pago = ?
+    """, ("Efectivo",)),
+}
+
+
+def show(conn, label):
+    print(f"--- {label} ---")
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        elapsed = float("inf")
+        for _ in range(3): # Best of three, so the page cache is warm
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            elapsed = min(elapsed, time.perf_counter() - start)
+        print(f"{name}: {elapsed * 1000:.1f} ms")
+        for step in plan:
+            print(f"    {step}")
+
+
+def main():
+    with temp_database() as path:
+        conn = connection.get_connection(path)
+        # Roll the schema back to the base tables without indexes
+        conn.execute("DROP INDEX idx_order_items_order_product_unique")
+        conn.execute("DROP INDEX idx_orders_status_date")
+        conn.execute("PRAGMA user_version = 1")
+        populate(ORDERS)
+        conn.execute("ANALYZE")
+        show(conn, "schema version 1 (no indexes)")
+
+        with connection.transaction(path) as c:
+            migrations.migrate(c)
+        conn.execute("ANALYZE")
+        show(conn, f"schema version {migrations.get_version(conn.cursor())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Scripted clicks on a large edited order: per-click cost of the old increment
+# (linear scan of the original order, full summary rewrite) versus OrderDraft
+# (precomputed stock limits, running total, one summary line). Runs headless:
+# it times the bookkeeping and the summary text the textbox would receive.
+#
+#   python benchmarks/bench_order_clicks.py
+import time
+
+from _common import database
+
+from order_draft import OrderDraft
+
+CLICKS = 2000
+
+
+def make_order(lines):
+    items = tuple(database.OrderItem(pid, f"Producto {pid}", 2, 1000.0 + pid) for pid in range(1, lines + 1))
+    total = sum(item.quantity * item.item_price for item in items)
+    return database.Order(1, "2026-02-05 21:00:00", 0, "Mesa 30", None, 1, items, total, total * 0.85)
+
+
+def old_click(order, order_items, stock, pid):
+    current_quantity = order_items.get(pid, {}).get("quantity", 0)
+    adjusted_stock = stock[pid]
+    for item in order.items:
+        if item.product_id == pid:
+            adjusted_stock += item.quantity
+            break
+    if current_quantity < adjusted_stock:
+        order_items[pid]["quantity"] += 1
+        lines = []
+        total_price = 0
+        for item in order_items.values():
+            line_total = item["quantity"] * item["price"]
+            total_price += line_total
+            lines.append(f"{item['name']} x{item['quantity']} - ${line_total:.2f}\n")
+        return "".join(lines), total_price * 0.85
+
+
+def new_click(draft, pid):
+    if draft.increment(pid):
+        return draft.line_text(pid), draft.totals(1)
+
+
+def main():
+    for lines in (5, 50, 500):
+        order = make_order(lines)
+        products = [(item.product_id, item.product_name, item.item_price, 1_000_000, "Pizzas") for item in order.items]
+        stock = {p[0]: p[3] for p in products}
+        order_items = {item.product_id: {"name": item.product_name, "quantity": item.quantity, "price": item.item_price} for item in order.items}
+        draft = OrderDraft(products, order)
+        last_pid = lines # Worst case for the old linear scan
+
+        start = time.perf_counter()
+        for _ in range(CLICKS):
+            old_click(order, order_items, stock, last_pid)
+        old_us = (time.perf_counter() - start) / CLICKS * 1e6
+
+        start = time.perf_counter()
+        for _ in range(CLICKS):
+            new_click(draft, last_pid)
+        new_us = (time.perf_counter() - start) / CLICKS * 1e6
+
+        print(f"{lines:4d} order lines: old click {old_us:8.1f} us   OrderDraft click {new_us:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
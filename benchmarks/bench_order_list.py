@@ -0,0 +1,65 @@
+# Refresh latency of the pending-orders list at 10 / 100 / 1000 orders:
+# the old full teardown-and-rebuild versus OrderListView. Needs a display.
+#
+#   python benchmarks/bench_order_list.py
+import time
+
+from _common import database
+
+import customtkinter as ctk
+import main
+
+
+def fake_orders(count, revision=0):
+    orders = []
+    for order_id in range(count, 0, -1):
+        items = (database.OrderItem(1, "Pizza 300", 1 + revision, 16000.0), database.OrderItem(2, "Hnk", 2, 9000.0))
+        total = sum(item.quantity * item.item_price for item in items)
+        orders.append(database.Order(order_id, f"2026-02-05 21:{order_id % 60:02d}:00", 0, f"Cliente {order_id}", None, 0, items, total, total))
+    return orders
+
+
+def rebuild_like_before(frame, orders):
+    for widget in frame.winfo_children():
+        widget.destroy()
+    for i, order in enumerate(orders):
+        items_str = ", ".join([f"{item.product_name} (x{item.quantity})" for item in order.items])
+        ctk.CTkLabel(frame, text=order.customer_name).grid(row=i + 1, column=0, padx=5, pady=2, sticky="w")
+        ctk.CTkLabel(frame, text=items_str, wraplength=200, justify="left").grid(row=i + 1, column=1, padx=5, pady=2, sticky="w")
+        ctk.CTkLabel(frame, text=f"${order.total_due:.2f}").grid(row=i + 1, column=2, padx=5, pady=2, sticky="w")
+        actions_frame = ctk.CTkFrame(frame)
+        actions_frame.grid(row=i + 1, column=3, padx=5, pady=2, sticky="ew")
+        ctk.CTkButton(actions_frame, text="Editar").pack(side="left", padx=2)
+        ctk.CTkButton(actions_frame, text="Cerrar").pack(side="left", padx=2)
+
+
+def timed(root, fn):
+    start = time.perf_counter()
+    fn()
+    root.update_idletasks()
+    return (time.perf_counter() - start) * 1000
+
+
+def main_benchmark():
+    root = ctk.CTk()
+    root.geometry("1000x700")
+
+    old_frame = ctk.CTkScrollableFrame(root)
+    old_frame.pack(fill="both", expand=True)
+    view = main.OrderListView(root, on_edit=lambda order: None, on_close=lambda order_id: None)
+    view.pack(fill="both", expand=True)
+    root.update()
+
+    for count in (10, 100, 1000):
+        first, second = fake_orders(count), fake_orders(count, revision=1)
+        old_ms = timed(root, lambda: rebuild_like_before(old_frame, first)) + timed(root, lambda: rebuild_like_before(old_frame, second))
+        new_ms = timed(root, lambda: view.set_orders(first)) + timed(root, lambda: view.set_orders(second))
+        keyed_ms = timed(root, lambda: view.upsert(first[0]))
+        print(f"{count:5d} orders: rebuild {old_ms / 2:8.1f} ms   OrderListView {new_ms / 2:7.1f} ms   single upsert {keyed_ms:6.1f} ms")
+        rebuild_like_before(old_frame, [])
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main_benchmark()
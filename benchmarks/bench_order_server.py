@@ -0,0 +1,78 @@
+# Load generator for order_server.py: N terminals (threads, each with its own
+# keep-alive connection) place orders as fast as they can. Reports orders per
+# second and p50/p99 latency per add_order call. Without a URL it starts a
+# server in this process on a temporary database, once with group commit
+# and once committing every order on its own, for comparison.
+#
+#   python benchmarks/bench_order_server.py [terminals] [orders per terminal] [server URL]
+import sys
+import threading
+import time
+
+from _common import database, temp_database
+
+import order_client
+import order_server
+
+
+def terminal(client, product_ids, order_count, latencies):
+    for i in range(order_count):
+        items = [(product_ids[(i + k) % len(product_ids)], 1, 1000.0) for k in range(3)]
+        start = time.perf_counter()
+        order_id = client.database.add_order(items, "Carga", 0)
+        latencies.append(time.perf_counter() - start)
+        assert order_id is not None
+
+
+def run_load(url, terminal_count, order_count):
+    client = order_client.OrderClient(url)
+    product_ids = [product[0] for product in client.database.get_products()]
+    if not product_ids:
+        for i in range(20):
+            client.database.add_product(f"Carga {i}", 1000.0, 10 ** 9)
+        product_ids = [product[0] for product in client.database.get_products()]
+
+    latencies = []
+    threads = [threading.Thread(target=terminal, args=(client, product_ids, order_count, latencies)) for _ in range(terminal_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)]
+    return len(latencies) / elapsed, p50, p99
+
+
+def print_result(label, result):
+    orders_per_second, p50, p99 = result
+    print(f"{label:<30} {orders_per_second:10,.0f} orders/s   p50 {p50 * 1000:6.2f} ms   p99 {p99 * 1000:6.2f} ms")
+
+
+def main():
+    terminal_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    order_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    print(f"{terminal_count} terminals x {order_count} orders")
+    if len(sys.argv) > 3:
+        print_result(sys.argv[3], run_load(sys.argv[3], terminal_count, order_count))
+        return
+
+    for label, max_batch in [("group commit (64)", order_server.MAX_BATCH), ("one commit per order", 1)]:
+        with temp_database():
+            server = order_server.OrderServer(("127.0.0.1", 0), max_batch=max_batch)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                result = run_load(f"http://127.0.0.1:{server.server_address[1]}", terminal_count, order_count)
+            finally:
+                server.stop()
+            orders = database.get_orders_page(status=0)
+            assert len(orders) == terminal_count * order_count, "orders lost"
+        print_result(label, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Time-to-interactive of the "Nuevo Pedido" window: building it from scratch
+# (what every open used to cost) versus reopening the kept-alive window.
+# Needs a display.
+#
+#   python benchmarks/bench_order_window.py
+import time
+
+from _common import database, populate, temp_database
+
+import customtkinter as ctk
+import main
+
+PRODUCTS = 120
+
+
+def timed(root, label, fn):
+    start = time.perf_counter()
+    fn()
+    root.update_idletasks()
+    print(f"{label:<45} {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+def main_benchmark():
+    with temp_database():
+        populate(0, product_count=PRODUCTS)
+        root = ctk.CTk()
+        root.withdraw()
+
+        window = None
+
+        def first_open():
+            nonlocal window
+            window = main.CreateOrderWindow(root)
+            window.open()
+
+        timed(root, f"first open, {PRODUCTS} products (builds grid)", first_open)
+        window.close_window()
+        timed(root, "reopen for a new order", window.open)
+        window.close_window()
+        database.add_order([(1, 2, 1000.0)], "Cliente", 0)
+        timed(root, "reopen after an order (stock changed)", window.open)
+        window.close_window()
+        database.add_product("Producto nuevo", 500.0, 10, "Bebidas")
+        timed(root, "reopen after a product was added", window.open)
+        window.close_window()
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,57 @@
+# Cost of the perf.py instrumentation on the database functions: the bare
+# function, the instrumented one with recording off (the default) and on
+# (histogram plus SQLite statement counting). Then records a small order
+# workload and prints what the "Rendimiento" tab would show.
+#
+#   python benchmarks/bench_perf.py
+import json
+import os
+import tempfile
+
+from _common import database, populate, report, temp_database, time_per_call
+
+import perf
+
+REPEAT = 20000
+
+
+def main():
+    with temp_database():
+        populate(1000, product_count=200, completed_ratio=0.5)
+        database.get_products() # Fill the product cache
+        calls = [
+            ("get_products(ids) (cached)", lambda fn: fn(ids=[1, 2, 3]), database.get_products),
+            ("get_product (one SELECT)", lambda fn: fn(1), database.get_product),
+        ]
+        for label, call, fn in calls:
+            report(f"{label}, bare", time_per_call(lambda: call(fn.__wrapped__), REPEAT))
+            report(f"{label}, perf off", time_per_call(lambda: call(fn), REPEAT))
+            perf.enable(tk=False)
+            report(f"{label}, perf on", time_per_call(lambda: call(fn), REPEAT))
+            perf.disable()
+
+        perf.reset()
+        perf.enable(tk=False)
+        product_ids = [row[0] for row in database.get_products()]
+        for i in range(500):
+            order_id = database.add_order([(product_ids[i % 200], 1, 100.0), (product_ids[(i * 7 + 1) % 200], 2, 100.0)], "Mesa", 0)
+            if i % 5 == 0:
+                database.update_order(order_id, [(product_ids[i % 200], 3, 100.0)], 0)
+            if i % 3 == 0:
+                database.update_order_status_and_payment_method(order_id, 1, "Efectivo")
+        database.get_orders_page(status=0)
+        perf.disable()
+
+        snapshot = perf.snapshot()
+        print(f"\n{'function':<45} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, timing in snapshot["timings"].items():
+            print(f"{name:<45} {timing['count']:>6} {timing['p50_ms']:>8.3f} {timing['p95_ms']:>8.3f} {timing['p99_ms']:>8.3f}")
+        print(f"statements: {snapshot['statements']}")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = perf.dump(os.path.join(tmp_dir, "rendimiento.json"))
+            with open(path, encoding="utf-8") as f:
+                print(f"JSON dump: {os.path.getsize(path)} bytes, {len(json.load(f)['buckets'])} histograms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Product search at order-window speed: builds the search index over a
+# synthetic catalogue, then types queries one keystroke at a time and times
+# what CreateOrderWindow.apply_search asks of it per keystroke (the matching
+# ids and the best match), against a plain scan of every name. Also times
+# the incremental update after one product is renamed. Runs headless; the
+# cards hidden and shown per keystroke are counted, not drawn.
+#
+#   python benchmarks/bench_product_search.py [products]
+import random
+import sys
+import time
+
+from _common import report
+
+from search_index import ProductSearchIndex, normalize
+
+DISHES = ["Pizza", "Empanada", "Milanesa", "Sándwich", "Tarta", "Hamburguesa", "Lomito", "Ensalada", "Papas", "Canelones",
+          "Ñoquis", "Ravioles", "Cerveza", "Gaseosa", "Agua", "Vino", "Jugo", "Café", "Flan", "Helado"]
+STYLES = ["Napolitana", "Muzzarella", "Jamón y Queso", "Fugazzeta", "Criolla", "Árabe", "Caprese", "Completa", "Especial",
+          "de Verdura", "de Pollo", "de Carne", "Roquefort", "Calabresa", "Provenzal", "al Champignon", "Rúcula", "Cuatro Quesos"]
+SIZES = ["Chica", "Mediana", "Grande", "Familiar", "Porción", "Media Docena", "Docena", "500 ml", "1 L", "1,5 L"]
+CATEGORIES = ["Pizzas", "Empanadas", "Bebidas", "Minutas", "Postres", "Pastas", "Sándwiches"]
+QUERIES = ["emp jam", "pizza napo", "cerv", "muzza gra", "flan", "rucula", "quesos fam", "lomito comp"]
+REPEAT = 20
+
+
+def catalogue(count, seed=1):
+    rng = random.Random(seed)
+    return [(product_id, f"{rng.choice(DISHES)} {rng.choice(STYLES)} {rng.choice(SIZES)} #{product_id}",
+             float(rng.randrange(1000, 20000, 500)), 100, rng.choice(CATEGORIES)) for product_id in range(1, count + 1)]
+
+
+def scan(products, query):
+    # No index: every term checked against every product
+    terms = normalize(query).split()
+    return {product_id for product_id, name, price, stock, category in products
+            if all(term in normalize(f"{name} {category}") for term in terms)}
+
+
+def timed(fn, repeat=REPEAT):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    products = catalogue(count)
+    index = ProductSearchIndex()
+    _, seconds = timed(lambda: index.update(products), repeat=1)
+    report(f"build index, {count} products", seconds)
+
+    worst = total = keystrokes = 0
+    toggled = []
+    for query in QUERIES:
+        shown = None
+        for length in range(1, len(query) + 1):
+            typed = query[:length]
+            (ids, best), seconds = timed(lambda: (lambda ids: (ids, index.best(typed, ids)))(index.search(typed)))
+            worst = max(worst, seconds)
+            total += seconds
+            keystrokes += 1
+            toggled.append(len((shown if shown is not None else set(range(1, count + 1))) ^ (ids or set())))
+            shown = ids
+        _, scan_seconds = timed(lambda: scan(products, query), repeat=3)
+        best_name = index.entries[best][0] if best is not None else "-"
+        print(f"{query!r:<14} {len(ids or ()):>6} matches  best {best_name!r:<42} scan {scan_seconds * 1000:7.2f} ms")
+    report("per keystroke, mean (search + best)", total / keystrokes)
+    report("per keystroke, worst", worst)
+    toggled.sort()
+    print(f"cards hidden or shown per keystroke: median {toggled[len(toggled) // 2]}, max {toggled[-1]}")
+
+    renamed = list(products)
+    product_id, name, price, stock, category = renamed[count // 2]
+    renamed[count // 2] = (product_id, "Pizza Especial de la Casa", price, stock, category)
+    _, seconds = timed(lambda: index.update(renamed), repeat=1)
+    report("update after renaming one product", seconds)
+    assert product_id in index.search("casa") and product_id not in index.search(name.split()[1])
+
+
+if __name__ == "__main__":
+    main()
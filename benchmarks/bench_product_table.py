@@ -0,0 +1,64 @@
+# Frame-budget check for the Productos table with a few hundred SKUs:
+# the old rebuild-everything load_products versus ProductTableView.
+# Needs a display.
+#
+#   python benchmarks/bench_product_table.py
+import time
+
+import customtkinter as ctk
+import main
+
+SKUS = 300
+FRAME_BUDGET_MS = 16.0
+
+
+def fake_products(count):
+    categories = ["Pizzas", "Empanadas", "Bebidas"]
+    return [(i, f"Producto {i}", 1000.0 + i, 100, categories[i % 3]) for i in range(1, count + 1)]
+
+
+def rebuild_like_before(frame, products):
+    for widget in frame.winfo_children():
+        widget.destroy()
+    for i, (product_id, name, price, stock, category) in enumerate(products):
+        ctk.CTkLabel(frame, text=product_id).grid(row=i + 1, column=0, padx=5, pady=2)
+        ctk.CTkLabel(frame, text=name).grid(row=i + 1, column=1, padx=5, pady=2)
+        ctk.CTkLabel(frame, text=category).grid(row=i + 1, column=2, padx=5, pady=2)
+        ctk.CTkLabel(frame, text=f"{price:.2f}").grid(row=i + 1, column=3, padx=5, pady=2)
+        ctk.CTkLabel(frame, text=stock).grid(row=i + 1, column=4, padx=5, pady=2)
+        ctk.CTkButton(frame, text="Editar").grid(row=i + 1, column=5, padx=5, pady=2)
+
+
+def timed(root, label, fn):
+    start = time.perf_counter()
+    fn()
+    root.update_idletasks()
+    elapsed = (time.perf_counter() - start) * 1000
+    verdict = "ok" if elapsed <= FRAME_BUDGET_MS else "OVER BUDGET"
+    print(f"{label:<40} {elapsed:8.1f} ms  {verdict}")
+
+
+def main_benchmark():
+    root = ctk.CTk()
+    root.geometry("1000x700")
+    old_frame = ctk.CTkScrollableFrame(root)
+    old_frame.pack(fill="both", expand=True)
+    table = main.ProductTableView(root, on_edit=lambda product: None)
+    table.pack(fill="both", expand=True)
+    root.update()
+
+    products = fake_products(SKUS)
+    after_order = [p if p[0] not in (3, 7) else (*p[:3], p[3] - 2, p[4]) for p in products]
+    with_new_product = after_order + [(SKUS + 1, "Producto nuevo", 500.0, 10, "Bebidas")]
+
+    timed(root, "old: initial build", lambda: rebuild_like_before(old_frame, products))
+    timed(root, "old: refresh after an order", lambda: rebuild_like_before(old_frame, after_order))
+    timed(root, "table: initial build (one-off)", lambda: table.set_products(products))
+    timed(root, "table: tab switch, nothing changed", lambda: table.set_products(products))
+    timed(root, "table: refresh after an order", lambda: table.set_products(after_order))
+    timed(root, "table: product added", lambda: table.set_products(with_new_product))
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main_benchmark()
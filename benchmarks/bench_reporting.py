@@ -0,0 +1,57 @@
+# The sales report computed in one pass over NumPy columns versus one SQL
+# aggregate per figure, on ~500k completed order lines.
+#
+#   python benchmarks/bench_reporting.py
+import time
+
+from _common import connection, populate, report, temp_database
+
+import reporting
+
+SQL_AGGREGATES = [
+    # total and cash sales
+    "SELECT SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END) FROM orders o JOIN order_items oi ON o.id = oi.order_id WHERE o.status = 1",
+    "SELECT SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END) FROM orders o JOIN order_items oi ON o.id = oi.order_id WHERE o.status = 1 AND o.metodo_pago = 'Efectivo'",
+    # order count (average ticket) and socio share
+    "SELECT COUNT(*), SUM(es_socio = 1) FROM orders WHERE status = 1",
+    "SELECT SUM(oi.quantity * oi.item_price * 0.85) FROM orders o JOIN order_items oi ON o.id = oi.order_id WHERE o.status = 1 AND o.es_socio = 1",
+    # per hour
+    "SELECT strftime('%H', o.order_date, 'localtime'), SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END) FROM orders o JOIN order_items oi ON o.id = oi.order_id WHERE o.status = 1 GROUP BY 1",
+    "SELECT strftime('%H', order_date, 'localtime'), COUNT(*) FROM orders WHERE status = 1 GROUP BY 1",
+    # top products
+    "SELECT p.name, SUM(oi.quantity), SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END) AS total FROM orders o JOIN order_items oi ON o.id = oi.order_id JOIN products p ON p.id = oi.product_id WHERE o.status = 1 GROUP BY oi.product_id ORDER BY total DESC LIMIT 10",
+]
+
+
+def sql_report(conn):
+    return [conn.execute(query).fetchall() for query in SQL_AGGREGATES]
+
+
+def best_of(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    with temp_database() as path:
+        populate(185_000, completed_ratio=0.9) # ~500k completed lines
+        conn = connection.get_connection(path)
+
+        seconds, sql_results = best_of(lambda: sql_report(conn))
+        report(f"{len(SQL_AGGREGATES)} SQL aggregates", seconds)
+        seconds, sales_report = best_of(reporting.build_sales_report)
+        report("NumPy batch report", seconds)
+        seconds, (orders, lines, line_order) = best_of(reporting.load_order_lines)
+        report("  of which loading the lines", seconds)
+
+        print(f"{len(lines)} lines: total {sales_report.total_sales:.2f} (SQL {sql_results[0][0][0]:.2f}), "
+              f"cash {sales_report.cash_sales:.2f} (SQL {sql_results[1][0][0]:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# load_sales_summary's two queries: full-scan SUM over the order rows (the
+# old get_total_sales) versus reading the maintained sales_totals aggregate.
+#
+#   python benchmarks/bench_sales_totals.py
+from _common import connection, database, populate, report, temp_database, time_per_call
+
+FULL_SCAN_QUERY = """
+    SELECT SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END)
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.order_id
+    WHERE o.status = 1
+"""
+
+
+def full_scan_summary(conn):
+    conn.execute(FULL_SCAN_QUERY).fetchone()
+    conn.execute(FULL_SCAN_QUERY + " AND o.metodo_pago = ?", ("Efectivo",)).fetchone()
+
+
+def aggregate_summary():
+    database.get_total_sales()
+    database.get_total_sales_by_payment_method("Efectivo")
+
+
+def main():
+    for orders in (1_000, 10_000, 100_000):
+        with temp_database() as path:
+            populate(orders)
+            database.rebuild_sales_totals()
+            conn = connection.get_connection(path)
+            report(f"full scan summary, {orders} orders", time_per_call(lambda: full_scan_summary(conn), 5))
+            report(f"sales_totals summary, {orders} orders", time_per_call(aggregate_summary, 200))
+
+            # Cost added to closing an order
+            order_ids = [row[0] for row in conn.execute("SELECT id FROM orders WHERE status = 0 LIMIT 200")]
+            it = iter(order_ids)
+            report(f"close order incl. aggregate, {orders} orders",
+                   time_per_call(lambda: database.update_order_status_and_payment_method(next(it), 1, "Efectivo"), len(order_ids)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# update_order on orders of growing size: SQL statements executed and time
+# per edit. Each edit changes every quantity, drops a tenth of the lines and
+# adds as many new products.
+#
+#   python benchmarks/bench_update_order.py
+from _common import connection, database, populate, report, temp_database, time_per_call
+
+
+def main():
+    for lines in (10, 100, 1000):
+        with temp_database() as path:
+            populate(0, product_count=2 * lines)
+            product_ids = [row[0] for row in database.get_products()]
+            order_id = database.add_order([(pid, 1, 100.0) for pid in product_ids[:lines]], "Cliente", 0)
+
+            edits = []
+            for n in range(2):
+                start = (n + 1) * lines // 10
+                edits.append([(pid, n + 2, 100.0) for pid in product_ids[start:start + lines]])
+            it = iter(edits * 50)
+
+            statements = []
+            conn = connection.get_connection(path)
+            conn.set_trace_callback(statements.append)
+            database.update_order(order_id, next(it), 0)
+            conn.set_trace_callback(None)
+
+            staged = sum("temp.order_edit (product_id" in sql for sql in statements)
+            print(f"{lines} lines: {len(statements) - staged} statements + {staged} executemany rows into the temp table")
+            report(f"update_order, {lines} lines", time_per_call(lambda: database.update_order(order_id, next(it), 0), 50))
+
+
+if __name__ == "__main__":
+    main()
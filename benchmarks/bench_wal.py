@@ -0,0 +1,50 @@
+# Commit latency and reader stalls under the "seguro" (rollback journal,
+# synchronous=FULL) and "rendimiento" (WAL, synchronous=NORMAL) profiles.
+#
+#   python benchmarks/bench_wal.py
+import threading
+import time
+
+from _common import connection, database, report, temp_database, time_per_call
+
+ORDERS = 300
+
+
+def reader_stalls(stop):
+    # Worst time a get_total_sales() call took while orders were being written.
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        database.get_total_sales()
+        worst = max(worst, time.perf_counter() - start)
+    connection.close_connection(database.DATABASE_NAME)
+    return worst
+
+
+def run_profile(profile):
+    with temp_database():
+        database.init_db(profile)
+        for i in range(20):
+            database.add_product(f"Producto {i}", 1000.0, 1_000_000, "Pizzas")
+
+        items = [(1, 2, 1000.0), (5, 1, 1000.0)]
+        report(f"add_order commit [{profile}]", time_per_call(lambda: database.add_order(items, "Cliente", 0), ORDERS))
+
+        stop = threading.Event()
+        result = {}
+        reader = threading.Thread(target=lambda: result.setdefault("worst", reader_stalls(stop)))
+        reader.start()
+        for _ in range(ORDERS):
+            database.add_order(items, "Cliente", 0)
+        stop.set()
+        reader.join()
+        report(f"worst concurrent read [{profile}]", result["worst"])
+
+
+def main():
+    for profile in ("seguro", "rendimiento"):
+        run_profile(profile)
+
+
+if __name__ == "__main__":
+    main()
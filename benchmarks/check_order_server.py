@@ -0,0 +1,58 @@
+# Client/server round trip: starts an order_server.py on a temporary
+# database and checks that a bulk import through OrderClient saves the same
+# orders, lines and stock as a local add_orders_bulk would, and that
+# functions the server doesn't offer aren't run locally instead.
+#
+#   python benchmarks/check_order_server.py
+import threading
+
+from _common import database, temp_database
+
+import order_client
+import order_server
+
+
+def main():
+    with temp_database():
+        server = order_server.OrderServer(("127.0.0.1", 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = order_client.OrderClient(f"http://127.0.0.1:{server.server_address[1]}")
+            client.database.add_product("Muzzarella", 9000.0, 50)
+            client.database.add_product("Empanada", 1500.0, 100)
+            (pizza, *_), (empanada, *_) = client.database.get_products()
+
+            orders = [
+                database.BulkOrder("Mesa 1", 0, [(pizza, 2, 9000.0), (empanada, 6, 1500.0)]),
+                database.BulkOrder("Mesa 2", 1, [(empanada, 12, 1500.0)], "2026-03-01 21:15:00", 1, "Efectivo"),
+            ]
+            order_ids = client.database.add_orders_bulk(orders)
+            assert order_ids is not None and len(order_ids) == 2, f"bulk import failed: {order_ids}"
+            order_ids = client.database.add_orders_bulk(orders=orders[:1], update_stock=False)
+            assert order_ids is not None and len(order_ids) == 1, "bulk import with keyword arguments failed"
+
+            saved = {order.id: order for order in client.database.get_orders_page()}
+            assert len(saved) == 3, f"expected 3 orders, found {len(saved)}"
+            for order_id, order in zip(order_ids, orders[:1]):
+                assert {(item.product_id, item.quantity) for item in saved[order_id].items} == {(pizza, 2), (empanada, 6)}
+            completed = [order for order in saved.values() if order.status == 1]
+            assert len(completed) == 1 and completed[0].metodo_pago == "Efectivo" and completed[0].order_date == "2026-03-01 21:15:00"
+            stock = {product_id: stock for product_id, name, price, stock, category in client.database.get_products()}
+            assert stock == {pizza: 48, empanada: 82}, f"stock not taken: {stock}"
+            # Only the completed order counts, with the socio discount
+            assert abs(client.database.get_total_sales() - 12 * 1500.0 * 0.85) < 0.005, "sales totals"
+
+            for name in ("update_product_stock", "rebuild_sales_totals", "archive_orders"):
+                try:
+                    getattr(client.database, name)
+                except AttributeError:
+                    continue
+                raise AssertionError(f"client.database.{name} would run against a local database")
+            assert client.database.BulkOrder is database.BulkOrder and client.database.StockShortageError is database.StockShortageError
+        finally:
+            server.stop()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
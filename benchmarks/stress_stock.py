@@ -0,0 +1,91 @@
+# Stress test for stock reservation: many threads, each with its own pooled
+# connection, order the same product until it runs out. The stock must end
+# at exactly zero, never below, with every unit accounted for by a saved
+# order. A second phase races update_product edits against orders on the
+# same product and checks that every stale edit is rejected. After each
+# phase the product cache must still match the table.
+#
+#   python benchmarks/stress_stock.py [threads] [initial stock]
+import sys
+import threading
+import time
+
+from _common import connection, database, temp_database
+
+
+def order_until_sold_out(product_id, results):
+    placed = shortages = 0
+    while True:
+        try:
+            order_id = database.add_order([(product_id, 1, 100.0)], "Stress", 0)
+        except database.StockShortageError:
+            shortages += 1
+            break
+        if order_id is not None:
+            placed += 1
+    results.append((placed, shortages))
+    connection.close_thread()
+
+
+def edit_while_ordering(product_id, rounds, results):
+    saved = stale = 0
+    for _ in range(rounds):
+        product_id, name, price, stock, category, version = database.get_product(product_id)
+        try:
+            database.update_product(product_id, name, price + 1, stock, category, expected_version=version)
+            saved += 1
+        except database.StaleProductError:
+            stale += 1
+    results.append((saved, stale))
+    connection.close_thread()
+
+
+def run_threads(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    initial_stock = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with temp_database():
+        database.add_product("SKU", 100.0, initial_stock)
+        product_id = database.get_products()[0][0]
+
+        results = []
+        elapsed = run_threads(order_until_sold_out, [(product_id, results)] * thread_count)
+        placed = sum(r[0] for r in results)
+        stock = database.get_product(product_id)[3]
+        print(f"{thread_count} threads: {placed} orders in {elapsed:.2f} s ({placed / elapsed:,.0f}/s), final stock {stock}")
+        assert placed == initial_stock and stock == 0, "oversold or lost units"
+        assert database.verify_catalogue() == [], "product cache out of step"
+
+        database.update_product_stock(product_id, 10 ** 6)
+        edit_results, order_results = [], []
+        threads = [threading.Thread(target=edit_while_ordering, args=(product_id, 200, edit_results)) for _ in range(thread_count // 2)]
+        threads += [threading.Thread(target=lambda: (
+            [database.add_order([(product_id, 1, 100.0)], "Stress", 0) for _ in range(200)], order_results.append(200), connection.close_thread()))
+            for _ in range(thread_count // 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        saved = sum(r[0] for r in edit_results)
+        stale = sum(r[1] for r in edit_results)
+        product_id, name, price, stock, category, version = database.get_product(product_id)
+        ordered = sum(order_results)
+        print(f"edits: {saved} saved, {stale} rejected as stale; price {price:.0f} (expected {100 + saved}), "
+              f"stock {stock} (expected {10 ** 6 - ordered})")
+        assert price == 100 + saved and stock == 10 ** 6 - ordered, "an edit overwrote a concurrent change"
+        assert database.verify_catalogue() == [], "product cache out of step"
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import threading
+
+# Process-wide copy of the products table, as (id, name, price, stock,
+# category) rows. database.get_products fills it on first use and serves
+# every read from it afterwards; the database functions that change products
+# update it write-through once their transaction commits (see
+# connection.after_commit), so a rolled back write never reaches it. Every
+# write-through carries the row's new products.version, and an older one
+# never replaces a newer one, so concurrent writers can't leave it behind.
+#
+# Only this process's writes are seen. Writes made by another process on the
+# same file (manage.py import-orders, a second local terminal) are not:
+# database.verify_catalogue() reports the differences and invalidate() drops
+# the copy so the next read reloads it.
+
+_lock = threading.RLock() # Shared by the database worker and the order server's threads
+_products = {} # id -> row
+_versions = {} # id -> products.version of the cached row
+_by_category = {} # category -> {id: row}
+_by_name = {} # name -> id
+_loaded = False
+_writes = 0 # Write-throughs so far, to spot a fill that raced with one
+
+# Bumped on every change; the UI compares it to skip redrawing an unchanged list
+version = 0
+stats = {"hits": 0, "misses": 0}
+
+
+def is_loaded():
+    with _lock:
+        return _loaded
+
+def begin_fill():
+    # Token for fill(): taken before the rows are read from the database
+    with _lock:
+        return _writes
+
+def fill(rows, token):
+    # Loads the (id, name, price, stock, category, version) rows read since
+    # begin_fill(). If a write-through happened in between, the rows may
+    # predate it, so they are not kept and the next read loads again.
+    global _loaded, version
+    with _lock:
+        stats["misses"] += 1
+        if token != _writes:
+            return False
+        _products.clear()
+        _versions.clear()
+        _by_category.clear()
+        _by_name.clear()
+        for row in rows:
+            _index(tuple(row[:5]), row[5])
+        _loaded = True
+        version += 1
+        return True
+
+def invalidate():
+    global _loaded, version
+    with _lock:
+        _loaded = False
+        version += 1
+
+def _index(row, row_version):
+    product_id, name, price, stock, category = row
+    _versions[product_id] = row_version
+    old = _products.get(product_id)
+    if old is not None:
+        _by_category.get(old[4], {}).pop(product_id, None)
+        if _by_name.get(old[1]) == product_id:
+            del _by_name[old[1]]
+    _products[product_id] = row
+    _by_category.setdefault(category, {})[product_id] = row
+    _by_name[name] = product_id
+
+# --- Reads: None when the cache isn't loaded yet ---
+
+def get_products(ids=None):
+    # Rows in id order, like SELECT ... FROM products; only `ids` if given
+    with _lock:
+        if not _loaded:
+            return None
+        stats["hits"] += 1
+        if ids is None:
+            # Ids only grow, so insertion order is id order
+            return list(_products.values())
+        return [_products[product_id] for product_id in sorted(set(ids)) if product_id in _products]
+
+def snapshot():
+    # (version, rows) taken together, or None when the cache isn't loaded
+    with _lock:
+        if not _loaded:
+            return None
+        stats["hits"] += 1
+        return version, list(_products.values())
+
+def is_current(since_version):
+    # True when the rows of version `since_version` are still the cache's
+    with _lock:
+        if _loaded and since_version == version:
+            stats["hits"] += 1
+            return True
+        return False
+
+def get_category(category):
+    with _lock:
+        if not _loaded:
+            return None
+        stats["hits"] += 1
+        return sorted(_by_category.get(category, {}).values())
+
+def find_by_name(name):
+    # The product's row, or None (also when the cache isn't loaded)
+    with _lock:
+        if not _loaded:
+            return None
+        stats["hits"] += 1
+        product_id = _by_name.get(name)
+        return _products[product_id] if product_id is not None else None
+
+# --- Write-through, called by the database functions after commit ---
+
+def put(row):
+    # A product added or edited: its (id, name, price, stock, category, version) row
+    global _writes, version
+    with _lock:
+        _writes += 1
+        if _loaded and row[5] > _versions.get(row[0], -1):
+            _index(tuple(row[:5]), row[5])
+            version += 1
+
+def set_stock(stocks):
+    # {product_id: (new stock, new version)}
+    global _writes, version
+    with _lock:
+        _writes += 1
+        if not _loaded:
+            return
+        for product_id, (stock, row_version) in stocks.items():
+            row = _products.get(product_id)
+            if row is not None and row_version > _versions[product_id]:
+                _index(row[:3] + (stock,) + row[4:], row_version)
+        version += 1
+
+def differences(rows):
+    # (product_id, cached row, database row) for every product where the
+    # cache and `rows` (id, name, price, stock, category, version) disagree
+    with _lock:
+        if not _loaded:
+            return []
+        cached_rows = {product_id: row + (_versions[product_id],) for product_id, row in _products.items()}
+        database_rows = {row[0]: tuple(row) for row in rows}
+        return [(product_id, cached_rows.get(product_id), database_rows.get(product_id))
+                for product_id in sorted(set(cached_rows) | set(database_rows))
+                if cached_rows.get(product_id) != database_rows.get(product_id)]
@@ -0,0 +1,210 @@
+import array
+import calendar
+import csv
+import os
+import struct
+import sys
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Compact columnar copy of an order export (.pcol), written next to each CSV.
+# Only the standard library is needed to read or write it.
+#
+# Layout (all integers little-endian):
+#
+#   header   b"PCOL" + uint16 format version
+#   columns  one block per column, in COLUMNS order. A block is a uint32 byte
+#            length followed by that many bytes of zlib-compressed data.
+#   footer   int64 min order_date, int64 max order_date, uint32 order count,
+#            uint32 line count, b"PCOL" (FOOTER_SIZE bytes, at the very end so
+#            the date range can be read without touching the columns)
+#
+# Order columns hold one value per order, line columns one per CSV line, so
+# customer, date, payment method and order total are stored once per order.
+# Dictionary columns are a uint32 count followed by uint32 length + UTF-8
+# bytes per entry; the matching *_index columns are uint32 positions in them.
+# Dates are whole seconds since 1970-01-01 of the naive timestamps the app
+# stores (no time zone conversion). A missing payment method is "".
+
+MAGIC = b"PCOL"
+VERSION = 1
+FOOTER = struct.Struct("<qqII4s")
+FOOTER_SIZE = FOOTER.size
+
+# (name, array typecode, or None for a dictionary)
+COLUMNS = [
+    ("customers", None),
+    ("metodos_pago", None),
+    ("products", None),
+    ("order_id", "q"),
+    ("order_date", "q"),
+    ("customer_index", "I"),
+    ("metodo_pago_index", "I"),
+    ("total_order_price", "d"),
+    ("line_order", "I"), # position of the line's order in the order columns
+    ("product_index", "I"),
+    ("quantity", "i"),
+    ("item_price", "d"),
+]
+
+Footer = namedtuple("Footer", "min_date max_date order_count line_count")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def date_to_seconds(text):
+    return calendar.timegm(datetime.fromisoformat(text).timetuple())
+
+def seconds_to_date(seconds):
+    return (_EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+def _pack_array(values):
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _unpack_array(typecode, data):
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def _pack_dictionary(entries):
+    parts = [struct.pack("<I", len(entries))]
+    for entry in entries:
+        encoded = entry.encode("utf-8")
+        parts.append(struct.pack("<I", len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+def _unpack_dictionary(data):
+    count, = struct.unpack_from("<I", data, 0)
+    offset = 4
+    entries = []
+    for _ in range(count):
+        length, = struct.unpack_from("<I", data, offset)
+        offset += 4
+        entries.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    return entries
+
+
+class ColumnarWriter:
+    # Collects order lines, in the CSV's column order, and writes them as a
+    # .pcol file. Lines of the same order must be consecutive, as they are in
+    # the exports.
+    def __init__(self):
+        self.dictionaries = {"customers": {}, "metodos_pago": {}, "products": {}}
+        self.columns = {name: array.array(typecode) for name, typecode in COLUMNS if typecode}
+        self.last_order_id = None
+        self.date_seconds = {}
+
+    def _lookup(self, dictionary, value):
+        entries = self.dictionaries[dictionary]
+        index = entries.get(value)
+        if index is None:
+            index = entries[value] = len(entries)
+        return index
+
+    def add_lines(self, lines):
+        # lines: (order_id, customer_name, order_date, metodo_pago, product_name,
+        # quantity, item_price, total_order_price) tuples, e.g. a batch from
+        # database.iter_order_lines
+        columns = self.columns
+        for order_id, customer_name, order_date, metodo_pago, product_name, quantity, item_price, total_order_price in lines:
+            if order_id != self.last_order_id:
+                self.last_order_id = order_id
+                seconds = self.date_seconds.get(order_date)
+                if seconds is None:
+                    seconds = self.date_seconds[order_date] = date_to_seconds(order_date)
+                columns["order_id"].append(int(order_id))
+                columns["order_date"].append(seconds)
+                columns["customer_index"].append(self._lookup("customers", customer_name or ""))
+                columns["metodo_pago_index"].append(self._lookup("metodos_pago", metodo_pago or ""))
+                columns["total_order_price"].append(float(total_order_price))
+            columns["line_order"].append(len(columns["order_id"]) - 1)
+            columns["product_index"].append(self._lookup("products", product_name))
+            columns["quantity"].append(int(quantity))
+            columns["item_price"].append(float(item_price))
+
+    def write(self, filename):
+        # Written under a .tmp name and renamed, like the CSV
+        dates = self.columns["order_date"]
+        footer = FOOTER.pack(min(dates, default=0), max(dates, default=0),
+                             len(self.columns["order_id"]), len(self.columns["line_order"]), MAGIC)
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, "wb") as f:
+            f.write(MAGIC + struct.pack("<H", VERSION))
+            for name, typecode in COLUMNS:
+                if typecode:
+                    data = _pack_array(self.columns[name])
+                else:
+                    data = _pack_dictionary(list(self.dictionaries[name]))
+                block = zlib.compress(data, 6)
+                f.write(struct.pack("<I", len(block)))
+                f.write(block)
+            f.write(footer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+
+
+def read_footer(filename):
+    with open(filename, "rb") as f:
+        f.seek(-FOOTER_SIZE, os.SEEK_END)
+        min_date, max_date, order_count, line_count, magic = FOOTER.unpack(f.read(FOOTER_SIZE))
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a .pcol file")
+    return Footer(min_date, max_date, order_count, line_count)
+
+def read_columns(filename):
+    # Returns {column name: array or list of strings}, see COLUMNS
+    with open(filename, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC or data[-4:] != MAGIC:
+        raise ValueError(f"{filename} is not a .pcol file")
+    version, = struct.unpack_from("<H", data, 4)
+    if version != VERSION:
+        raise ValueError(f"{filename} uses .pcol version {version}, expected {VERSION}")
+
+    columns = {}
+    offset = 6
+    for name, typecode in COLUMNS:
+        length, = struct.unpack_from("<I", data, offset)
+        offset += 4
+        block = zlib.decompress(data[offset:offset + length])
+        offset += length
+        columns[name] = _unpack_array(typecode, block) if typecode else _unpack_dictionary(block)
+    return columns
+
+def iter_lines(filename):
+    # Yields the file's lines as the same tuples the CSV export holds (dates
+    # as text, metodo_pago "" when missing)
+    columns = read_columns(filename)
+    customers, metodos, products = columns["customers"], columns["metodos_pago"], columns["products"]
+    order_id, order_date = columns["order_id"], columns["order_date"]
+    customer_index, metodo_index, total = columns["customer_index"], columns["metodo_pago_index"], columns["total_order_price"]
+    dates = {}
+    for order, product, quantity, item_price in zip(columns["line_order"], columns["product_index"], columns["quantity"], columns["item_price"]):
+        seconds = order_date[order]
+        date = dates.get(seconds)
+        if date is None:
+            date = dates[seconds] = seconds_to_date(seconds)
+        yield (order_id[order], customers[customer_index[order]], date, metodos[metodo_index[order]],
+               products[product], quantity, item_price, total[order])
+
+def convert_csv(csv_filename, pcol_filename=None):
+    # Writes the .pcol copy of an existing export. Older exports have no
+    # metodo_pago column. Returns the .pcol file name.
+    if pcol_filename is None:
+        pcol_filename = os.path.splitext(csv_filename)[0] + ".pcol"
+    writer = ColumnarWriter()
+    with open(csv_filename, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            writer.add_lines([(int(row["order_id"]), row["customer_name"], row["order_date"], row.get("metodo_pago", ""),
+                               row["product_name"], int(row["quantity"]), float(row["item_price"]), float(row["total_order_price"]))])
+    writer.write(pcol_filename)
+    return pcol_filename
@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Number of prepared statements sqlite3 keeps compiled per connection.
+# The whole app uses a few dozen distinct queries, so they all stay cached.
+STATEMENT_CACHE_SIZE = 256
+
+# One long-lived connection per (thread, database file). The Tk main loop and
+# any worker thread each get their own connection, so no locking is needed
+# around a connection itself; the registry below is only used to close them.
+_local = threading.local()
+_registry_lock = threading.Lock()
+_registry = []
+
+# Per-connection PRAGMAs to run whenever a connection to a path is opened,
+# set through configure().
+_pragmas = {}
+
+# Called with the text of every statement run on any pooled connection, set
+# through set_trace_callback() (perf.py counts statements with it)
+_trace_callback = None
+
+
+def _apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+class _PooledConnection:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        self.depth = 0 # Nesting level of transaction() blocks
+        self.after_commit = [] # Callbacks waiting for the outermost block to commit
+        self.closed = False
+        _apply_pragmas(self.conn, _pragmas.get(path, {}))
+        if _trace_callback is not None:
+            self.conn.set_trace_callback(_trace_callback)
+
+
+def _get(path):
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+
+    pooled = pool.get(path)
+    if pooled is None or pooled.closed:
+        pooled = _PooledConnection(path)
+        pool[path] = pooled
+        with _registry_lock:
+            _registry.append(pooled)
+    return pooled
+
+
+def get_connection(path):
+    return _get(path).conn
+
+
+def configure(path, pragmas):
+    # Sets the PRAGMAs applied to every new connection to `path`. The calling
+    # thread's open connection is updated right away; connections on other
+    # threads pick them up the next time they are opened.
+    _pragmas[path] = dict(pragmas)
+    pool = getattr(_local, "pool", None)
+    if pool and path in pool and not pool[path].closed:
+        _apply_pragmas(pool[path].conn, pragmas)
+
+
+def set_trace_callback(callback):
+    # Installs callback(statement) on every open connection, on every
+    # thread, and on the ones opened later; None removes it
+    global _trace_callback
+    _trace_callback = callback
+    with _registry_lock:
+        pooled_connections = list(_registry)
+    for pooled in pooled_connections:
+        if not pooled.closed:
+            pooled.conn.set_trace_callback(callback)
+
+
+@contextmanager
+def transaction(path, immediate=False):
+    # Yields a cursor on the thread's connection for `path`. The outermost
+    # block commits on success and rolls back on error; nested blocks join it.
+    # immediate=True starts the transaction with BEGIN IMMEDIATE, which takes
+    # the write lock up front and also covers DDL statements (sqlite3 only
+    # opens transactions implicitly before INSERT/UPDATE/DELETE).
+    pooled = _get(path)
+    cursor = pooled.conn.cursor()
+    pooled.depth += 1
+    committed = False
+    try:
+        if immediate and not pooled.conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        if pooled.depth == 1:
+            pooled.conn.commit()
+            committed = True
+    except BaseException:
+        if pooled.depth == 1:
+            pooled.conn.rollback()
+            pooled.after_commit.clear()
+        raise
+    finally:
+        pooled.depth -= 1
+        cursor.close()
+    if committed:
+        callbacks, pooled.after_commit = pooled.after_commit, []
+        for callback in callbacks:
+            callback()
+
+
+def after_commit(path, callback):
+    # Calls callback() once the calling thread's current transaction on
+    # `path` commits, or right away outside of one; it is dropped if the
+    # transaction rolls back.
+    pooled = _get(path)
+    if pooled.depth:
+        pooled.after_commit.append(callback)
+    else:
+        callback()
+
+
+@contextmanager
+def savepoint(path, name="savepoint"):
+    # Inside a transaction() block: if the block raises, only its own changes
+    # (and after_commit callbacks) are undone and the transaction goes on.
+    pooled = _get(path)
+    pending = len(pooled.after_commit)
+    pooled.conn.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except BaseException:
+        pooled.conn.execute(f"ROLLBACK TO {name}")
+        pooled.conn.execute(f"RELEASE {name}")
+        del pooled.after_commit[pending:]
+        raise
+    pooled.conn.execute(f"RELEASE {name}")
+
+
+def close_connection(path):
+    # Closes the calling thread's connection to `path`, if any.
+    pool = getattr(_local, "pool", None)
+    if not pool or path not in pool:
+        return
+    pooled = pool.pop(path)
+    with _registry_lock:
+        if pooled in _registry:
+            _registry.remove(pooled)
+    pooled.closed = True
+    pooled.conn.close()
+
+
+def close_thread():
+    # Closes the calling thread's connections; worker threads call this
+    # before exiting. Safe while other threads keep using theirs.
+    pool = getattr(_local, "pool", None)
+    if not pool:
+        return
+    for path in list(pool):
+        close_connection(path)
+
+
+def close_all():
+    # Closes every pooled connection on every thread (used on shutdown, once
+    # no other thread is using the database any more).
+    with _registry_lock:
+        pooled_connections = list(_registry)
+        _registry.clear()
+    for pooled in pooled_connections:
+        pooled.closed = True
+        try:
+            pooled.conn.close()
+        except sqlite3.Error:
+            pass
+    pool = getattr(_local, "pool", None)
+    if pool:
+        pool.clear()
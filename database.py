@@ -1,142 +1,387 @@
+import json
 import sqlite3
+from collections import namedtuple
+
+import catalogue
+import connection
+import events
+import migrations
+import perf
 
 DATABASE_NAME = "stock_control.db"
 
-def init_db():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-
-    # Create products table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            price REAL NOT NULL,
-            stock INTEGER NOT NULL,
-            category TEXT
-        )
-    """)
-
-    # Add category column to products table if it doesn't exist (for backward compatibility)
-    try:
-        c.execute("SELECT category FROM products LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE products ADD COLUMN category TEXT")
-
-    # Create orders table
-    # status: 0 for pending, 1 for completed, 2 for cancelled
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status INTEGER DEFAULT 0,
-            customer_name TEXT
-        )
-    """)
-
-    # Add customer_name column to orders table if it doesn't exist (for backward compatibility)
-    try:
-        c.execute("SELECT customer_name FROM orders LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE orders ADD COLUMN customer_name TEXT")
-    
-    # Add metodo_pago column to orders table if it doesn't exist
-    try:
-        c.execute("SELECT metodo_pago FROM orders LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE orders ADD COLUMN metodo_pago TEXT")
+# Performance profiles applied by init_db. "journal_mode" is stored in the
+# database file; the other settings are applied to every pooled connection.
+# WAL lets the order list and sales summary read while an order is being
+# written, and synchronous=NORMAL only fsyncs on checkpoints instead of on
+# every commit (a power cut can lose the last commits, never corrupt the file).
+PERFORMANCE_PROFILES = {
+    "rendimiento": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000, # Negative values are KiB, so ~16 MB
+        "mmap_size": 67108864, # 64 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        # Some SQLite builds zero every freed page; FAST only clears them when
+        # it costs no extra I/O, so dropping a table doesn't rewrite it
+        "secure_delete": "FAST",
+    },
+    "seguro": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+DEFAULT_PROFILE = "rendimiento"
+
+def apply_performance_profile(profile=DEFAULT_PROFILE):
+    # profile is either a key of PERFORMANCE_PROFILES or a dict of PRAGMAs
+    settings = dict(PERFORMANCE_PROFILES[profile] if isinstance(profile, str) else profile)
+    journal_mode = settings.pop("journal_mode", None)
+    connection.configure(DATABASE_NAME, settings)
+    if journal_mode:
+        connection.get_connection(DATABASE_NAME).execute(f"PRAGMA journal_mode = {journal_mode}")
 
-    # Add es_socio column to orders table if it doesn't exist
+def checkpoint():
+    # Copies the WAL back into the main database file and truncates it, so the
+    # .db file is self-contained (on shutdown and before exporting).
+    conn = connection.get_connection(DATABASE_NAME)
+    busy, wal_pages, checkpointed_pages = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return busy == 0
+
+def init_db(profile=DEFAULT_PROFILE):
+    # Only takes effect on a brand-new file, and has to come before the
+    # journal mode is written to it; existing databases switch over with a
+    # full VACUUM ('python manage.py vacuum')
+    connection.get_connection(DATABASE_NAME).execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    apply_performance_profile(profile)
+
+    # Create or upgrade the schema (see migrations.py)
+    with connection.transaction(DATABASE_NAME) as c:
+        migrations.migrate(c)
+    # A cache filled from another file (the benchmarks switch DATABASE_NAME)
+    catalogue.invalidate()
+
+def close_db():
     try:
-        c.execute("SELECT es_socio FROM orders LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE orders ADD COLUMN es_socio INTEGER DEFAULT 0")
-
-    # Create order_items table to link products to orders
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS order_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            order_id INTEGER NOT NULL,
-            product_id INTEGER NOT NULL,
-            quantity INTEGER NOT NULL,
-            item_price REAL NOT NULL,
-            FOREIGN KEY (order_id) REFERENCES orders (id),
-            FOREIGN KEY (product_id) REFERENCES products (id)
-        )
-    """)
-
-    conn.commit()
-    conn.close()
+        checkpoint()
+    except sqlite3.Error as e:
+        print(f"Error checkpointing database: {e}")
+    connection.close_all()
+
+class StockShortageError(Exception):
+    # Raised when an order asks for more than the stock left; nothing is
+    # saved. shortages holds (product_id, name, requested, available) for
+    # every product that is short, where available is the most the order
+    # can take.
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__("Not enough stock: " + ", ".join(
+            f"{name} (requested {requested}, available {available})" for product_id, name, requested, available in shortages))
+
+class StaleProductError(Exception):
+    # Raised by update_product when the product changed (an order, another
+    # terminal) since the version the edit started from
+    def __init__(self, product_id):
+        self.product_id = product_id
+        super().__init__(f"Product {product_id} was modified by someone else.")
+
+def _reserve_stock(c, quantities):
+    # Takes {product_id: quantity} from the stock. Each product is checked
+    # and decremented by the same statement, so two terminals can't both
+    # take the last units. Returns {product_id: (new stock, new version)}.
+    # Raises StockShortageError listing every product that is short; the
+    # caller's transaction then rolls back.
+    short = []
+    stocks = {}
+    for product_id, quantity in quantities.items():
+        c.execute("UPDATE products SET stock = stock - ?, version = version + 1 WHERE id = ? AND stock >= ? RETURNING stock, version", (quantity, product_id, quantity))
+        row = c.fetchone()
+        if row is None:
+            short.append(product_id)
+        else:
+            stocks[product_id] = tuple(row)
+    if short:
+        c.execute(f"SELECT id, name, stock FROM products WHERE id IN ({', '.join('?' * len(short))})", short)
+        found = {product_id: (name, stock) for product_id, name, stock in c.fetchall()}
+        shortages = []
+        for product_id in short:
+            name, stock = found.get(product_id, (f"#{product_id}", 0))
+            shortages.append((product_id, name, quantities[product_id], stock))
+        raise StockShortageError(shortages)
+    return stocks
+
+def _publish(kind, ids=()):
+    # Publishes the change once the current transaction commits (see events.py)
+    connection.after_commit(DATABASE_NAME, lambda: events.publish(kind, ids))
+
+# Write-through to the product cache once the current transaction commits
+# (see catalogue.py)
+def _cache_product(row):
+    connection.after_commit(DATABASE_NAME, lambda: catalogue.put(row))
+
+def _cache_stock(stocks):
+    if stocks:
+        connection.after_commit(DATABASE_NAME, lambda: catalogue.set_stock(stocks))
 
 def add_product(name, price, stock, category="Sin Categoría"):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
+    # Returns the new product's id, or False if the name is taken
     try:
-        c.execute("INSERT INTO products (name, price, stock, category) VALUES (?, ?, ?, ?)", (name, price, stock, category))
-        conn.commit()
-        return True
+        with connection.transaction(DATABASE_NAME) as c:
+            c.execute("INSERT INTO products (name, price, stock, category) VALUES (?, ?, ?, ?) RETURNING id, name, price, stock, category, version",
+                      (name, price, stock, category))
+            row = c.fetchone()
+            _cache_product(row)
+            _publish(events.PRODUCTS_CHANGED, (row[0],))
+        return row[0]
     except sqlite3.IntegrityError:
         print(f"Error: Product with name '{name}' already exists.")
         return False
-    finally:
-        conn.close()
 
-def get_products():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT id, name, price, stock, category FROM products")
-    products = c.fetchall()
-    conn.close()
-    return products
+def get_products(ids=None):
+    # ids: only these products (e.g. the ones in a PRODUCTS_CHANGED event).
+    # Served from the product cache, which the first call fills.
+    rows = catalogue.get_products(ids)
+    if rows is not None:
+        return rows
+    token = catalogue.begin_fill()
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT id, name, price, stock, category, version FROM products ORDER BY id")
+        rows = c.fetchall()
+    catalogue.fill(rows, token)
+    if ids is not None:
+        ids = set(ids)
+        rows = [row for row in rows if row[0] in ids]
+    return [row[:5] for row in rows]
+
+def get_catalogue(since_version=None):
+    # (cache version, products): products is None when the cache version is
+    # still since_version, so a view can skip redrawing an unchanged list.
+    # The version is None when the rows didn't come from the cache.
+    if catalogue.is_current(since_version):
+        return since_version, None
+    snapshot = catalogue.snapshot()
+    if snapshot is None:
+        rows = get_products()
+        snapshot = catalogue.snapshot()
+        if snapshot is None:
+            return None, rows
+    return snapshot
+
+def verify_catalogue():
+    # Compares the product cache with the products table; returns the
+    # differences as (product_id, cached row, database row), [] if none
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT id, name, price, stock, category, version FROM products")
+        rows = c.fetchall()
+    differences = catalogue.differences(rows)
+    for product_id, cached, current in differences:
+        print(f"Product cache mismatch for product {product_id}: cached {cached}, database {current}")
+    return differences
+
+def get_product(product_id):
+    # (id, name, price, stock, category, version), or None
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT id, name, price, stock, category, version FROM products WHERE id = ?", (product_id,))
+        return c.fetchone()
 
 def update_product_stock(product_id, new_stock):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE products SET stock = ? WHERE id = ?", (new_stock, product_id))
-    conn.commit()
-    conn.close()
-
-def update_product(product_id, name, price, stock, category="Sin Categoría"):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("UPDATE products SET stock = ?, version = version + 1 WHERE id = ? RETURNING stock, version", (new_stock, product_id))
+        row = c.fetchone()
+        if row is not None:
+            _cache_stock({product_id: tuple(row)})
+        _publish(events.PRODUCTS_CHANGED, (product_id,))
+
+def update_product(product_id, name, price, stock, category="Sin Categoría", expected_version=None):
+    # expected_version is the version read when the edit started (see
+    # get_product); if the product changed since, nothing is written and
+    # StaleProductError is raised
     try:
-        c.execute("UPDATE products SET name = ?, price = ?, stock = ?, category = ? WHERE id = ?", (name, price, stock, category, product_id))
-        conn.commit()
+        with connection.transaction(DATABASE_NAME) as c:
+            query = "UPDATE products SET name = ?, price = ?, stock = ?, category = ?, version = version + 1 WHERE id = ?"
+            params = (name, price, stock, category, product_id)
+            if expected_version is not None:
+                query += " AND version = ?"
+                params += (expected_version,)
+            c.execute(query + " RETURNING id, name, price, stock, category, version", params)
+            row = c.fetchone()
+            if row is None:
+                if expected_version is not None:
+                    raise StaleProductError(product_id)
+            else:
+                _cache_product(row)
+            _publish(events.PRODUCTS_CHANGED, (product_id,))
         return True
     except sqlite3.IntegrityError:
         print(f"Error: Product with name '{name}' already exists.")
         return False
-    finally:
-        conn.close()
 
 def add_order(product_items, customer_name, es_socio):
     # product_items is a list of tuples: (product_id, quantity, item_price_at_order)
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
+    # Raises StockShortageError if any product doesn't have enough stock.
     try:
-        c.execute("INSERT INTO orders (customer_name, es_socio) VALUES (?, ?)", (customer_name, es_socio))
-        order_id = c.lastrowid
-        
-        for product_id, quantity, item_price in product_items:
-            c.execute("INSERT INTO order_items (order_id, product_id, quantity, item_price) VALUES (?, ?, ?, ?)",
-                      (order_id, product_id, quantity, item_price))
-            
-            # Update product stock
-            c.execute("UPDATE products SET stock = stock - ? WHERE id = ?", (quantity, product_id))
-        
-        conn.commit()
+        with connection.transaction(DATABASE_NAME) as c:
+            quantities = {}
+            for product_id, quantity, item_price in product_items:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            _cache_stock(_reserve_stock(c, quantities))
+
+            c.execute("INSERT INTO orders (customer_name, es_socio) VALUES (?, ?)", (customer_name, es_socio))
+            order_id = c.lastrowid
+
+            for product_id, quantity, item_price in product_items:
+                c.execute("INSERT INTO order_items (order_id, product_id, quantity, item_price) VALUES (?, ?, ?, ?)",
+                          (order_id, product_id, quantity, item_price))
+
+            _publish(events.ORDERS_ADDED, (order_id,))
+            _publish(events.PRODUCTS_CHANGED, tuple(quantities))
         return order_id
+    except StockShortageError:
+        raise
     except Exception as e:
-        conn.rollback()
         print(f"Error adding order: {e}")
         return None
-    finally:
-        conn.close()
 
-def get_orders(status=None):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    query = """
+# An order for add_orders_bulk. items are (product_id, quantity, item_price)
+# tuples; order_date None means now.
+BulkOrder = namedtuple("BulkOrder", "customer_name es_socio items order_date status metodo_pago", defaults=(0, [], None, 0, None))
+
+def add_orders_bulk(orders, update_stock=True):
+    # Inserts many BulkOrders in one transaction: orders and items with one
+    # executemany each, and one stock update per distinct product with the
+    # summed quantities. update_stock=False leaves the stock alone (e.g. when
+    # loading old history). Returns the new order ids, in the same order, or
+    # None on error (nothing is inserted then). Raises StockShortageError if
+    # the orders together need more than the stock left.
+    try:
+        with connection.transaction(DATABASE_NAME, immediate=True) as c:
+            # The write lock is held from BEGIN IMMEDIATE, so the next ids
+            # can be assigned here; AUTOINCREMENT never reuses an id
+            c.execute("SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'orders'), 0), COALESCE((SELECT MAX(id) FROM orders), 0))")
+            first_id = c.fetchone()[0] + 1
+            order_ids = list(range(first_id, first_id + len(orders)))
+
+            order_rows = []
+            item_rows = []
+            stock_changes = {}
+            for order_id, order in zip(order_ids, orders):
+                order_rows.append((order_id, order.order_date, order.status, order.customer_name, order.metodo_pago, order.es_socio))
+                for product_id, quantity, item_price in order.items:
+                    item_rows.append((order_id, product_id, quantity, item_price))
+                    stock_changes[product_id] = stock_changes.get(product_id, 0) + quantity
+
+            c.executemany("INSERT INTO orders (id, order_date, status, customer_name, metodo_pago, es_socio) VALUES (?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)", order_rows)
+            c.executemany("INSERT INTO order_items (order_id, product_id, quantity, item_price) VALUES (?, ?, ?, ?)", item_rows)
+            if update_stock:
+                _cache_stock(_reserve_stock(c, stock_changes))
+                _publish(events.PRODUCTS_CHANGED, tuple(stock_changes))
+            if order_ids:
+                _apply_to_sales_totals(c, "AND o.id BETWEEN ? AND ?", (order_ids[0], order_ids[-1]), 1)
+                _publish(events.ORDERS_ADDED, order_ids)
+                _publish(events.SALES_CHANGED)
+        return order_ids
+    except StockShortageError:
+        raise
+    except Exception as e:
+        print(f"Error adding orders: {e}")
+        return None
+
+# Sales of completed orders, grouped the way sales_totals is keyed
+_SALES_TOTALS_QUERY = """
+    SELECT date(o.order_date), COALESCE(o.metodo_pago, ''), COALESCE(o.es_socio, 0),
+           SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END),
+           COUNT(DISTINCT o.id)
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.order_id
+    WHERE o.status = 1 {order_filter}
+    GROUP BY 1, 2, 3
+"""
+
+def _apply_to_sales_totals(c, order_filter, params, sign):
+    # Adds (sign=1) or removes (sign=-1) the contribution of the completed
+    # orders matching order_filter to sales_totals
+    c.execute(_SALES_TOTALS_QUERY.format(order_filter=order_filter), params)
+    rows = [(day, metodo_pago, es_socio, sign * total, sign * order_count)
+            for day, metodo_pago, es_socio, total, order_count in c.fetchall()]
+    if not rows:
+        return
+    c.executemany("""
+        INSERT INTO sales_totals (day, metodo_pago, es_socio, total, order_count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (day, metodo_pago, es_socio) DO UPDATE SET
+            total = total + excluded.total,
+            order_count = order_count + excluded.order_count
+    """, rows)
+    if sign < 0:
+        c.execute("DELETE FROM sales_totals WHERE order_count <= 0")
+
+def _apply_order_to_sales_totals(c, order_id, sign):
+    # Adds (sign=1) or removes (sign=-1) a completed order's contribution to
+    # sales_totals; orders that aren't completed contribute nothing. Callers
+    # remove the old contribution before changing an order and add the new one
+    # afterwards, in the same transaction.
+    _apply_to_sales_totals(c, "AND o.id = ?", (order_id,), sign)
+
+def rebuild_sales_totals():
+    # Recomputes sales_totals from the raw order rows
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("DELETE FROM sales_totals")
+        c.execute("INSERT INTO sales_totals (day, metodo_pago, es_socio, total, order_count) " + _SALES_TOTALS_QUERY.format(order_filter=""))
+        _publish(events.SALES_CHANGED)
+
+def verify_sales_totals(tolerance=0.005):
+    # Compares sales_totals with the raw order rows. Returns a list of
+    # (day, metodo_pago, es_socio, stored_total, actual_total) for every key
+    # that differs; an empty list means the aggregate is consistent.
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT day, metodo_pago, es_socio, total, order_count FROM sales_totals")
+        stored = {row[:3]: row[3:] for row in c.fetchall()}
+        c.execute(_SALES_TOTALS_QUERY.format(order_filter=""))
+        actual = {row[:3]: row[3:] for row in c.fetchall()}
+
+    mismatches = []
+    for key in sorted(set(stored) | set(actual)):
+        stored_total, stored_count = stored.get(key, (0, 0))
+        actual_total, actual_count = actual.get(key, (0, 0))
+        if abs(stored_total - actual_total) > tolerance or stored_count != actual_count:
+            mismatches.append((*key, stored_total, actual_total))
+    return mismatches
+
+# Compact order records returned by get_orders_page. total_price is the sum of
+# the lines; total_due applies the 15% socio discount.
+Order = namedtuple("Order", "id order_date status customer_name metodo_pago es_socio items total_price total_due")
+OrderItem = namedtuple("OrderItem", "product_id product_name quantity item_price")
+
+def get_orders_page(status=None, limit=None, offset=0, before=None, since=None, ids=None):
+    # Newest orders first, grouped and totalled by SQLite.
+    # - limit/offset: plain pagination
+    # - before: (order_date, id) of the last order of the previous page, for
+    #   keyset pagination that doesn't slow down on later pages
+    # - since: only orders placed on or after this date/timestamp string
+    # - ids: only these orders (e.g. the ones in an ORDERS_ADDED event)
+    conditions = []
+    params = []
+    if ids is not None:
+        conditions.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(ids)))
+    if status is not None:
+        # With ids, the unary + keeps SQLite on the primary key instead of
+        # scanning every order with that status
+        conditions.append("+status = ?" if ids is not None else "status = ?")
+        params.append(status)
+    if since is not None:
+        conditions.append("order_date >= ?")
+        params.append(since)
+    if before is not None:
+        conditions.append("(order_date, id) < (?, ?)")
+        params.extend(before)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.extend([-1 if limit is None else limit, offset])
+
+    query = f"""
         SELECT
             o.id,
             o.order_date,
@@ -144,147 +389,253 @@ def get_orders(status=None):
             o.customer_name,
             o.metodo_pago,
             o.es_socio,
-            p.id,
+            json_group_array(json_array(p.id, p.name, oi.quantity, oi.item_price)),
+            SUM(oi.quantity * oi.item_price),
+            SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END)
+        FROM (
+            SELECT id, order_date, status, customer_name, metodo_pago, es_socio
+            FROM orders
+            {where}
+            ORDER BY order_date DESC, id DESC
+            LIMIT ? OFFSET ?
+        ) o
+        JOIN order_items oi ON o.id = oi.order_id
+        JOIN products p ON oi.product_id = p.id
+        GROUP BY o.id
+        ORDER BY o.order_date DESC, o.id DESC
+    """
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute(query, params)
+        rows = c.fetchall()
+
+    return [
+        Order(order_id, order_date, order_status, customer_name, metodo_pago, es_socio,
+              tuple(OrderItem._make(item) for item in json.loads(items_json)), total_price, total_due)
+        for order_id, order_date, order_status, customer_name, metodo_pago, es_socio, items_json, total_price, total_due in rows
+    ]
+
+def _order_tables(c, archive_id):
+    # (orders table, order_items table) of the live orders or of an archive
+    if archive_id is None:
+        return "orders", "order_items"
+    c.execute("SELECT orders_table, items_table FROM archives WHERE id = ?", (archive_id,))
+    return c.fetchone()
+
+def count_order_lines(status=None, archive_id=None):
+    with connection.transaction(DATABASE_NAME) as c:
+        orders_table, items_table = _order_tables(c, archive_id)
+        if status is None:
+            c.execute(f"SELECT COUNT(*) FROM {items_table}")
+        else:
+            c.execute(f"SELECT COUNT(*) FROM {orders_table} o JOIN {items_table} oi ON o.id = oi.order_id WHERE o.status = ?", (status,))
+        return c.fetchone()[0]
+
+def iter_order_lines(status=None, batch_size=5000, archive_id=None):
+    # Streams one row per order line, newest orders first, in lists of up to
+    # batch_size rows: (order_id, customer_name, order_date, metodo_pago,
+    # product_name, quantity, item_price, total_order_price). Rows are read
+    # from the cursor with fetchmany, so memory stays flat however many orders
+    # there are. archive_id reads an archived night instead of the live orders.
+    query = """
+        SELECT
+            o.id,
+            o.customer_name,
+            o.order_date,
+            o.metodo_pago,
             p.name,
             oi.quantity,
-            oi.item_price
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
+            oi.item_price,
+            SUM(oi.quantity * oi.item_price) OVER (PARTITION BY o.id)
+        FROM {orders_table} o
+        JOIN {items_table} oi ON o.id = oi.order_id
         JOIN products p ON oi.product_id = p.id
     """
+    params = ()
     if status is not None:
-        query += f" WHERE o.status = {status}"
-    query += " ORDER BY o.order_date DESC"
-    c.execute(query)
-    orders_data = c.fetchall()
-    conn.close()
-
-    # Group order items by order ID
-    orders_grouped = {}
-    for order_id, order_date, order_status, customer_name, metodo_pago, es_socio, product_id, product_name, quantity, item_price in orders_data:
-        if order_id not in orders_grouped:
-            orders_grouped[order_id] = {
-                "id": order_id,
-                "order_date": order_date,
-                "status": order_status,
-                "customer_name": customer_name,
-                "metodo_pago": metodo_pago,
-                "es_socio": es_socio,
-                "items": [],
-                "total_price": 0
-            }
-        orders_grouped[order_id]["items"].append({
-            "product_id": product_id,
-            "product_name": product_name,
-            "quantity": quantity,
-            "item_price": item_price
-        })
-        orders_grouped[order_id]["total_price"] += (quantity * item_price)
-    
-    return list(orders_grouped.values())
+        query += " WHERE o.status = ?"
+        params = (status,)
+    query += " ORDER BY o.order_date DESC, o.id DESC"
+    with connection.transaction(DATABASE_NAME) as c:
+        orders_table, items_table = _order_tables(c, archive_id)
+        c.execute(query.format(orders_table=orders_table, items_table=items_table), params)
+        while True:
+            batch = c.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
 
 def update_order_status_and_payment_method(order_id, status, metodo_pago):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE orders SET status = ?, metodo_pago = ? WHERE id = ?", (status, metodo_pago, order_id))
-    conn.commit()
-    conn.close()
+    with connection.transaction(DATABASE_NAME) as c:
+        _apply_order_to_sales_totals(c, order_id, -1)
+        c.execute("UPDATE orders SET status = ?, metodo_pago = ? WHERE id = ?", (status, metodo_pago, order_id))
+        _apply_order_to_sales_totals(c, order_id, 1)
+        _publish(events.ORDERS_UPDATED if status == 0 else events.ORDERS_CLOSED, (order_id,))
+        _publish(events.SALES_CHANGED)
 
 def get_total_sales_by_payment_method(metodo_pago):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("""
-        SELECT SUM(
-            CASE 
-                WHEN o.es_socio = 1 THEN (oi.quantity * oi.item_price * 0.85)
-                ELSE (oi.quantity * oi.item_price)
-            END
-        )
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        WHERE o.status = 1 AND o.metodo_pago = ?
-    """, (metodo_pago,))
-    total_sales = c.fetchone()[0]
-    conn.close()
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT SUM(total) FROM sales_totals WHERE metodo_pago = ?", (metodo_pago,))
+        total_sales = c.fetchone()[0]
     return total_sales if total_sales else 0
 
 def get_total_sales():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("""
-        SELECT SUM(
-            CASE 
-                WHEN o.es_socio = 1 THEN (oi.quantity * oi.item_price * 0.85)
-                ELSE (oi.quantity * oi.item_price)
-            END
-        )
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        WHERE o.status = 1  -- Only completed orders
-    """)
-    total_sales = c.fetchone()[0]
-    conn.close()
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT SUM(total) FROM sales_totals")
+        total_sales = c.fetchone()[0]
     return total_sales if total_sales else 0
 
-def update_order(order_id, new_items, original_order_data, es_socio):
-    # new_items is a list of tuples: (product_id, quantity, item_price)
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
+def update_order(order_id, new_items, es_socio):
+    # new_items is a list of tuples: (product_id, quantity, item_price). The
+    # order's current lines are read from the database and reconciled with a
+    # fixed number of set-based statements, however many lines there are.
+    # Raises StockShortageError if the new quantities don't fit in the stock.
     try:
-        # --- 1. Update es_socio status ---
-        c.execute("UPDATE orders SET es_socio = ? WHERE id = ?", (es_socio, order_id))
-
-        # --- 2. Get original items and calculate stock changes ---
-        original_items = {item['product_id']: item['quantity'] for item in original_order_data['items']}
-        new_items_dict = {pid: qty for pid, qty, price in new_items}
-
-        all_pids = set(original_items.keys()) | set(new_items_dict.keys())
-        
-        for pid in all_pids:
-            original_qty = original_items.get(pid, 0)
-            new_qty = new_items_dict.get(pid, 0)
-            stock_change = original_qty - new_qty
-            
-            if stock_change != 0:
-                c.execute("UPDATE products SET stock = stock + ? WHERE id = ?", (stock_change, pid))
-
-        # --- 3. Update order items ---
-        # Delete items that are no longer in the order
-        pids_to_delete = set(original_items.keys()) - set(new_items_dict.keys())
-        if pids_to_delete:
-            c.executemany("DELETE FROM order_items WHERE order_id = ? AND product_id = ?", 
-                          [(order_id, pid) for pid in pids_to_delete])
-
-        # Update existing items and insert new ones
-        for product_id, quantity, item_price in new_items:
+        with connection.transaction(DATABASE_NAME, immediate=True) as c:
+            _apply_order_to_sales_totals(c, order_id, -1)
+
+            c.execute("UPDATE orders SET es_socio = ? WHERE id = ? RETURNING status", (es_socio, order_id))
+            row = c.fetchone()
+            completed = row is not None and row[0] == 1
+
+            c.execute("CREATE TEMP TABLE IF NOT EXISTS order_edit (product_id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL, item_price REAL NOT NULL)")
+            c.execute("DELETE FROM temp.order_edit")
+            c.executemany("""
+                INSERT INTO temp.order_edit (product_id, quantity, item_price) VALUES (?, ?, ?)
+                ON CONFLICT (product_id) DO UPDATE SET quantity = quantity + excluded.quantity
+            """, new_items)
+
+            # The write lock is held since BEGIN IMMEDIATE, so this check
+            # can't go stale before the update below
             c.execute("""
-                INSERT OR REPLACE INTO order_items (id, order_id, product_id, quantity, item_price)
-                VALUES (
-                    (SELECT id FROM order_items WHERE order_id = ? AND product_id = ?),
-                    ?, ?, ?, ?
-                )
-            """, (order_id, product_id, order_id, product_id, quantity, item_price))
-
-        conn.commit()
+                SELECT p.id, p.name, e.quantity, p.stock + COALESCE(oi.quantity, 0)
+                FROM temp.order_edit e
+                JOIN products p ON p.id = e.product_id
+                LEFT JOIN order_items oi ON oi.order_id = ? AND oi.product_id = e.product_id
+                WHERE e.quantity > p.stock + COALESCE(oi.quantity, 0)
+            """, (order_id,))
+            shortages = c.fetchall()
+            if shortages:
+                raise StockShortageError(shortages)
+
+            # Stock gets back the old quantities and gives up the new ones
+            c.execute("""
+                UPDATE products SET stock = stock + diff.change, version = version + 1
+                FROM (
+                    SELECT product_id, SUM(change) AS change
+                    FROM (
+                        SELECT product_id, quantity AS change FROM order_items WHERE order_id = ?
+                        UNION ALL
+                        SELECT product_id, -quantity FROM temp.order_edit
+                    )
+                    GROUP BY product_id
+                    HAVING SUM(change) != 0
+                ) AS diff
+                WHERE products.id = diff.product_id
+                RETURNING products.id, products.stock, products.version
+            """, (order_id,))
+            stocks = {product_id: (stock, version) for product_id, stock, version in c.fetchall()}
+            changed_products = list(stocks)
+            _cache_stock(stocks)
+
+            c.execute("DELETE FROM order_items WHERE order_id = ? AND product_id NOT IN (SELECT product_id FROM temp.order_edit)", (order_id,))
+            # WHERE true keeps ON CONFLICT from being parsed as part of the SELECT
+            c.execute("""
+                INSERT INTO order_items (order_id, product_id, quantity, item_price)
+                SELECT ?, product_id, quantity, item_price FROM temp.order_edit WHERE true
+                ON CONFLICT (order_id, product_id) DO UPDATE SET
+                    quantity = excluded.quantity,
+                    item_price = excluded.item_price
+            """, (order_id,))
+            c.execute("DELETE FROM temp.order_edit")
+
+            _apply_order_to_sales_totals(c, order_id, 1)
+
+            _publish(events.ORDERS_UPDATED, (order_id,))
+            if changed_products:
+                _publish(events.PRODUCTS_CHANGED, changed_products)
+            if completed:
+                _publish(events.SALES_CHANGED)
         return True
+    except StockShortageError:
+        raise
     except Exception as e:
-        conn.rollback()
         print(f"Error updating order: {e}")
         return False
-    finally:
-        conn.close()
 
-def clear_all_orders():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    try:
-        c.execute("DELETE FROM order_items")
-        c.execute("DELETE FROM orders")
-        conn.commit()
-        return True
-    except Exception as e:
-        conn.rollback()
-        print(f"Error clearing orders: {e}")
-        return False
-    finally:
-        conn.close()
+# How many exported nights are kept inside the database (the CSVs are kept
+# forever in csv_exports)
+ARCHIVE_RETENTION = 14
+
+def archive_orders():
+    # Moves every order into a new pair of archive tables in one transaction
+    # and leaves empty orders/order_items tables behind. The tables are renamed
+    # rather than copied, so this takes the same few milliseconds however big
+    # the night was. Returns the archive id, or None if orders are still
+    # pending or there are no completed orders to archive.
+    with connection.transaction(DATABASE_NAME, immediate=True) as c:
+        c.execute("SELECT EXISTS (SELECT 1 FROM orders WHERE status = 0), EXISTS (SELECT 1 FROM orders WHERE status = 1), COUNT(*) FROM orders")
+        has_pending, has_completed, order_count = c.fetchone()
+        if has_pending or not has_completed:
+            return None
+
+        c.execute("INSERT INTO archives (orders_table, items_table, order_count) VALUES ('', '', ?)", (order_count,))
+        archive_id = c.lastrowid
+        orders_table, items_table = f"archive_{archive_id}_orders", f"archive_{archive_id}_order_items"
+        c.execute("UPDATE archives SET orders_table = ?, items_table = ? WHERE id = ?", (orders_table, items_table, archive_id))
+
+        # Current definitions of the live tables and their indexes, to recreate them empty
+        c.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name IN ('orders', 'order_items') AND sql IS NOT NULL ORDER BY type DESC")
+        schema = c.fetchall()
+        c.execute("SELECT name, seq FROM sqlite_sequence WHERE name IN ('orders', 'order_items')")
+        sequences = c.fetchall()
+
+        # Index names must stay free for the new tables; archives are only read sequentially
+        for object_type, name, sql in schema:
+            if object_type == "index":
+                c.execute(f"DROP INDEX {name}")
+        c.execute(f"ALTER TABLE orders RENAME TO {orders_table}")
+        c.execute(f"ALTER TABLE order_items RENAME TO {items_table}")
+        for object_type, name, sql in schema:
+            c.execute(sql)
+        # Keep order ids growing across nights, like the old DELETE did
+        c.executemany("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", sequences)
+
+        c.execute("DELETE FROM sales_totals")
+        _publish(events.ORDERS_CLEARED)
+        _publish(events.SALES_CHANGED)
+    return archive_id
+
+def get_unexported_archives():
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("SELECT id FROM archives WHERE exported_at IS NULL ORDER BY id")
+        return [row[0] for row in c.fetchall()]
+
+def mark_archive_exported(archive_id, export_path):
+    with connection.transaction(DATABASE_NAME) as c:
+        c.execute("UPDATE archives SET export_path = ?, exported_at = CURRENT_TIMESTAMP WHERE id = ?", (export_path, archive_id))
+
+def drop_old_archives(keep=ARCHIVE_RETENTION, vacuum_pages=2000):
+    # Drops the tables of exported archives beyond the newest `keep`, then
+    # returns up to vacuum_pages free pages to the file system, so the file
+    # shrinks a little on every export instead of in one long VACUUM.
+    with connection.transaction(DATABASE_NAME, immediate=True) as c:
+        c.execute("SELECT id, orders_table, items_table FROM archives WHERE exported_at IS NOT NULL AND orders_table != '' ORDER BY id DESC LIMIT -1 OFFSET ?", (keep,))
+        for archive_id, orders_table, items_table in c.fetchall():
+            c.execute(f"DROP TABLE IF EXISTS {items_table}")
+            c.execute(f"DROP TABLE IF EXISTS {orders_table}")
+            c.execute("UPDATE archives SET orders_table = '', items_table = '' WHERE id = ?", (archive_id,))
+    # execute() steps a statement that returns no rows only once, which frees
+    # a single page; executescript() runs it to the end. It commits first, so
+    # only outside a transaction (the one above has committed by now).
+    conn = connection.get_connection(DATABASE_NAME)
+    if not conn.in_transaction:
+        conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+
+def vacuum():
+    # Full rebuild of the file; also switches older databases to incremental auto_vacuum
+    conn = connection.get_connection(DATABASE_NAME)
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+# Latency histograms for every function above (see perf.py)
+perf.instrument(globals(), "database")
@@ -0,0 +1,83 @@
+import queue
+import threading
+import traceback
+
+import connection
+
+class DatabaseWorker:
+    # Runs database calls on one background thread, in submission order, and
+    # delivers their results back on the Tk main loop through after() polling,
+    # so a slow disk or a locked database never freezes the window.
+    # Tk isn't thread-safe: callbacks only ever run on the main thread.
+    POLL_INTERVAL_MS = 15
+
+    def __init__(self, root):
+        self.root = root
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.in_flight = 0
+        self.busy_listeners = [] # Called with True when work starts, False when all of it is done
+        self.polling = False
+
+        self.thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        # Runs fn(*args, **kwargs) on the worker thread. on_done(result) or
+        # on_error(exception) is then called on the main loop.
+        self.in_flight += 1
+        if self.in_flight == 1:
+            self._notify_busy(True)
+        self.requests.put((fn, args, kwargs, on_done, on_error))
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def post(self, fn, *args):
+        # Thread-safe: schedules fn(*args) on the main loop, e.g. to report
+        # progress from inside a submitted call
+        self.results.put((fn, args, False))
+
+    def shutdown(self):
+        # Finishes the queued work and stops the thread
+        self.requests.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            fn, args, kwargs, on_done, on_error = request
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                self.results.put((on_error, (e,), True))
+            else:
+                self.results.put((on_done, (result,), True))
+        connection.close_thread()
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args, finished = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if finished:
+                self.in_flight -= 1
+            try:
+                if callback is not None:
+                    callback(*args)
+            except Exception:
+                traceback.print_exc()
+
+        if self.in_flight:
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        else:
+            self.polling = False
+            self._notify_busy(False)
+
+    def _notify_busy(self, busy):
+        for listener in self.busy_listeners:
+            listener(busy)
@@ -0,0 +1,48 @@
+import threading
+import traceback
+from collections import namedtuple
+
+# In-process change notifications. The database functions publish an Event
+# for each change once its transaction has committed (see
+# connection.after_commit), and the views subscribe and patch only what
+# changed instead of reloading everything after every write.
+#
+# Subscribers run on the thread that committed, usually the DatabaseWorker's;
+# Tk code has to hand the event over to the main loop (DatabaseWorker.post).
+
+Event = namedtuple("Event", "kind ids") # ids: tuple of order or product ids, may be empty
+
+ORDERS_ADDED = "orders_added"
+ORDERS_UPDATED = "orders_updated" # Lines, socio or payment method changed
+ORDERS_CLOSED = "orders_closed" # No longer pending: completed or cancelled
+ORDERS_CLEARED = "orders_cleared" # Every order is gone (archived or deleted)
+PRODUCTS_CHANGED = "products_changed" # Added, edited or stock moved
+SALES_CHANGED = "sales_changed" # sales_totals changed
+RESYNC = "resync" # Anything may have changed: reload everything
+
+_subscribers_lock = threading.Lock()
+_subscribers = []
+
+
+def subscribe(callback):
+    # callback(event) is called for every event published from now on
+    with _subscribers_lock:
+        _subscribers.append(callback)
+    return callback
+
+def unsubscribe(callback):
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+def publish(kind, ids=()):
+    event = Event(kind, tuple(ids))
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    # The change is already committed: a failing subscriber must not look
+    # like a failed write to the caller
+    for callback in subscribers:
+        try:
+            callback(event)
+        except Exception:
+            traceback.print_exc()
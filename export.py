@@ -0,0 +1,87 @@
+import csv
+import os
+from datetime import datetime
+
+import columnar
+import database
+
+CSV_DIR = "csv_exports"
+CSV_FIELDS = ['order_id', 'customer_name', 'order_date', 'metodo_pago', 'product_name', 'quantity', 'item_price', 'total_order_price']
+WRITE_BUFFER_SIZE = 1 << 20 # 1 MiB
+WRITE_COLUMNAR = True # Also write the compact .pcol copy (see columnar.py)
+
+def write_orders_csv(filename, status=1, progress=None, archive_id=None, columnar_filename=None):
+    # Streams the order lines straight from the database cursor into the CSV
+    # file, one batch at a time. progress(lines_written, total_lines) is called
+    # after every batch. archive_id exports an archived night instead of the
+    # live orders; columnar_filename also writes the same lines as a .pcol
+    # file. Returns the number of lines written.
+    total_lines = database.count_order_lines(status, archive_id) if progress else None
+    columnar_writer = columnar.ColumnarWriter() if columnar_filename else None
+    lines_written = 0
+    with open(filename, 'w', newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_FIELDS)
+        for batch in database.iter_order_lines(status, archive_id=archive_id):
+            writer.writerows(batch)
+            if columnar_writer:
+                columnar_writer.add_lines(batch)
+            lines_written += len(batch)
+            if progress:
+                progress(lines_written, total_lines)
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+    if columnar_writer:
+        columnar_writer.write(columnar_filename)
+    return lines_written
+
+def export_archive(archive_id, csv_dir=CSV_DIR, progress=None, columnar_copy=WRITE_COLUMNAR):
+    # Writes the completed orders of an archived night to
+    # csv_exports/pedidos_<timestamp>.csv (and .pcol). The file is written
+    # under a .tmp name and renamed when complete, so a crash never leaves a
+    # half-written CSV behind; the archive is only marked as exported after
+    # the rename.
+    os.makedirs(csv_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    filename = os.path.join(csv_dir, f"pedidos_{timestamp}.csv")
+    if os.path.exists(filename):
+        filename = os.path.join(csv_dir, f"pedidos_{timestamp}_{archive_id}.csv")
+
+    temp_filename = filename + ".tmp"
+    columnar_filename = os.path.splitext(filename)[0] + ".pcol" if columnar_copy else None
+    write_orders_csv(temp_filename, status=1, progress=progress, archive_id=archive_id, columnar_filename=columnar_filename)
+    os.replace(temp_filename, filename)
+    database.mark_archive_exported(archive_id, filename)
+    return filename
+
+def export_and_clear_orders(csv_dir=CSV_DIR, progress=None):
+    # Archives the orders in a single transaction (see database.archive_orders)
+    # and then exports the archive. Archives left unexported by an earlier
+    # crash are exported first. Returns the file name of tonight's export, or
+    # None when there was nothing to export (or orders are still pending).
+    for archive_id in database.get_unexported_archives():
+        export_archive(archive_id, csv_dir)
+
+    archive_id = database.archive_orders()
+    if archive_id is None:
+        return None
+    filename = export_archive(archive_id, csv_dir, progress)
+
+    database.drop_old_archives()
+    database.checkpoint()
+    return filename
+
+def read_orders_csv(filename):
+    # Reads an export back as (order_id, customer_name, order_date,
+    # metodo_pago, [(product_name, quantity, item_price)]) per order. Older
+    # exports have no metodo_pago column; it is None for them.
+    orders = {}
+    with open(filename, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            order_id = int(row['order_id'])
+            order = orders.get(order_id)
+            if order is None:
+                order = orders[order_id] = (order_id, row['customer_name'], row['order_date'], row.get('metodo_pago') or None, [])
+            order[4].append((row['product_name'], int(row['quantity']), float(row['item_price'])))
+    return list(orders.values())
@@ -0,0 +1,167 @@
+import csv
+import glob
+import os
+
+import columnar
+import connection
+import export
+
+# Sales history built from the exports in csv_exports. Once the orders are
+# archived the exports are the long-term record, so they are ingested into a
+# separate indexed database. ingest() only reads files that are new or
+# changed since the last run (by name and mtime), so reports stay fast after
+# years of exports. Amounts are before the socio discount, like the
+# total_order_price column of the exports.
+
+HISTORY_DATABASE_NAME = "history.db"
+
+
+def init_history():
+    connection.configure(HISTORY_DATABASE_NAME, {"synchronous": "NORMAL", "temp_store": "MEMORY", "busy_timeout": 5000})
+    connection.get_connection(HISTORY_DATABASE_NAME).execute("PRAGMA journal_mode = WAL")
+    with connection.transaction(HISTORY_DATABASE_NAME, immediate=True) as c:
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                name TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                line_count INTEGER NOT NULL,
+                ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Daily rollups per export file. An order has a single day, payment
+        # method and customer, so summing order counts across rows of
+        # order_sales is exact; product_sales counts each order once per
+        # product.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS order_sales (
+                file_name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                metodo_pago TEXT NOT NULL,
+                customer_name TEXT NOT NULL,
+                total REAL NOT NULL,
+                units INTEGER NOT NULL,
+                orders INTEGER NOT NULL,
+                PRIMARY KEY (file_name, day, metodo_pago, customer_name)
+            )
+        """)
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS product_sales (
+                file_name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                product_name TEXT NOT NULL,
+                total REAL NOT NULL,
+                units INTEGER NOT NULL,
+                orders INTEGER NOT NULL,
+                PRIMARY KEY (file_name, day, product_name)
+            )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_order_sales_day ON order_sales (day)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_product_sales_day ON product_sales (day)")
+
+def _read_export(csv_filename):
+    # Yields (order_id, customer_name, order_date, metodo_pago, product_name,
+    # quantity, item_price) from the export's .pcol copy when it is up to date,
+    # else from the CSV. Older CSVs have no metodo_pago column.
+    pcol_filename = os.path.splitext(csv_filename)[0] + ".pcol"
+    if os.path.exists(pcol_filename) and os.path.getmtime(pcol_filename) >= os.path.getmtime(csv_filename):
+        for line in columnar.iter_lines(pcol_filename):
+            yield line[:7]
+        return
+
+    with open(csv_filename, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield (int(row["order_id"]), row["customer_name"], row["order_date"], row.get("metodo_pago") or "",
+                   row["product_name"], int(row["quantity"]), float(row["item_price"]))
+
+def _rollup(name, lines):
+    # Returns (order_sales rows, product_sales rows, line count) for one file
+    order_sales = {}
+    product_sales = {}
+    seen_orders = set()
+    seen_order_products = set()
+    line_count = 0
+    for order_id, customer_name, order_date, metodo_pago, product_name, quantity, item_price in lines:
+        line_count += 1
+        day = order_date[:10]
+        amount = quantity * item_price
+
+        key = (day, metodo_pago or "", customer_name or "")
+        row = order_sales.get(key)
+        if row is None:
+            row = order_sales[key] = [0.0, 0, 0]
+        row[0] += amount
+        row[1] += quantity
+        if order_id not in seen_orders:
+            seen_orders.add(order_id)
+            row[2] += 1
+
+        key = (day, product_name)
+        row = product_sales.get(key)
+        if row is None:
+            row = product_sales[key] = [0.0, 0, 0]
+        row[0] += amount
+        row[1] += quantity
+        if (order_id, product_name) not in seen_order_products:
+            seen_order_products.add((order_id, product_name))
+            row[2] += 1
+
+    return ([(name, *key, *row) for key, row in order_sales.items()],
+            [(name, *key, *row) for key, row in product_sales.items()],
+            line_count)
+
+def ingest(csv_dir=export.CSV_DIR):
+    # Loads the exports that are new or were modified since they were last
+    # ingested; each file is replaced as a whole in its own transaction.
+    # Returns the names of the files ingested.
+    with connection.transaction(HISTORY_DATABASE_NAME) as c:
+        c.execute("SELECT name, mtime FROM ingested_files")
+        known = dict(c.fetchall())
+
+    ingested = []
+    for csv_filename in sorted(glob.glob(os.path.join(csv_dir, "pedidos_*.csv"))):
+        name = os.path.basename(csv_filename)
+        mtime = os.path.getmtime(csv_filename)
+        if known.get(name) == mtime:
+            continue
+
+        order_rows, product_rows, line_count = _rollup(name, _read_export(csv_filename))
+        with connection.transaction(HISTORY_DATABASE_NAME, immediate=True) as c:
+            c.execute("DELETE FROM order_sales WHERE file_name = ?", (name,))
+            c.execute("DELETE FROM product_sales WHERE file_name = ?", (name,))
+            c.executemany("INSERT INTO order_sales VALUES (?, ?, ?, ?, ?, ?, ?)", order_rows)
+            c.executemany("INSERT INTO product_sales VALUES (?, ?, ?, ?, ?, ?)", product_rows)
+            c.execute("INSERT OR REPLACE INTO ingested_files (name, mtime, line_count) VALUES (?, ?, ?)", (name, mtime, line_count))
+        ingested.append(name)
+    return ingested
+
+def _sales_by(table, column, start=None, end=None, limit=None):
+    # (key, total, units, orders) per value of `column`, for days between
+    # start and end ('YYYY-MM-DD', both inclusive), largest total first
+    # except by day, which is in date order
+    query = f"""
+        SELECT {column}, SUM(total), SUM(units), SUM(orders)
+        FROM {table}
+        WHERE day BETWEEN ? AND ?
+        GROUP BY {column}
+    """
+    query += " ORDER BY 1" if column == "day" else " ORDER BY 2 DESC"
+    params = [start or "0000-00-00", end or "9999-99-99"]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    with connection.transaction(HISTORY_DATABASE_NAME) as c:
+        c.execute(query, params)
+        return c.fetchall()
+
+def sales_by_day(start=None, end=None):
+    return _sales_by("order_sales", "day", start, end)
+
+def sales_by_product(start=None, end=None, limit=None):
+    return _sales_by("product_sales", "product_name", start, end, limit)
+
+def sales_by_payment_method(start=None, end=None):
+    # Exports from before metodo_pago existed report it as ''
+    return _sales_by("order_sales", "metodo_pago", start, end)
+
+def sales_by_customer(start=None, end=None, limit=None):
+    return _sales_by("order_sales", "customer_name", start, end, limit)
@@ -1,12 +1,43 @@
+import time
+_START = time.perf_counter() # Start of the imports, for --profile-startup
+
+import assets
 import customtkinter as ctk
 import database
+import events
+import perf
+from db_worker import DatabaseWorker
+from order_draft import OrderDraft
+from search_index import ProductSearchIndex
 
+import argparse
 import os
-import csv
-from datetime import datetime
-import platform
-import subprocess
-from PIL import Image
+import queue
+
+# Not imported here, to keep them off the startup path: export and reporting
+# (csv, zlib, NumPy) on first use, see App.export / App.reporting;
+# order_client only in client mode; platform/subprocess in open_csv_folder.
+
+# How often client mode picks up changes pushed by the order server
+SERVER_POLL_MS = 250
+
+class StartupProfile:
+    # main.py --profile-startup: time spent in each startup phase, printed
+    # once the first data is on screen
+    def __init__(self, start):
+        self.start = start
+        self.last = start
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - self.start))
+        self.last = now
+
+    def report(self):
+        print(f"{'phase':<40} {'ms':>8} {'total ms':>9}")
+        for phase, seconds, total in self.phases:
+            print(f"{phase:<40} {seconds * 1000:8.1f} {total * 1000:9.1f}")
 
 class PaymentMethodDialog(ctk.CTkToplevel):
     def __init__(self, master):
@@ -46,45 +77,356 @@ class PaymentMethodDialog(ctk.CTkToplevel):
     def get_input(self):
         return self.result
 
+class _OrderRow:
+    # One reusable row of OrderListView. It shows whatever order it is given
+    # and only reconfigures the labels whose text actually changed.
+    def __init__(self, view):
+        self.order = None
+        self.texts = (None, None, None)
+        self.visible = False
+
+        self.frame = ctk.CTkFrame(view.body, height=view.ROW_HEIGHT)
+        self.frame.grid_propagate(False)
+        view.configure_columns(self.frame)
+
+        self.customer_label = ctk.CTkLabel(self.frame, text="", anchor="w")
+        self.customer_label.grid(row=0, column=0, padx=5, pady=2, sticky="w")
+        self.items_label = ctk.CTkLabel(self.frame, text="", wraplength=250, justify="left", anchor="w")
+        self.items_label.grid(row=0, column=1, padx=5, pady=2, sticky="w")
+        self.total_label = ctk.CTkLabel(self.frame, text="", anchor="w")
+        self.total_label.grid(row=0, column=2, padx=5, pady=2, sticky="w")
+
+        actions_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        actions_frame.grid(row=0, column=3, padx=5, pady=2, sticky="ew")
+        ctk.CTkButton(actions_frame, text="Editar", width=70, command=lambda: view.on_edit(self.order)).pack(side="left", padx=2)
+        ctk.CTkButton(actions_frame, text="Cerrar", width=70, command=lambda: view.on_close(self.order.id)).pack(side="left", padx=2)
+
+        self.slot = len(view.rows)
+        self.frame.grid(row=self.slot, column=0, padx=0, pady=1, sticky="ew")
+        self.visible = True
+
+    def show(self, order):
+        if not self.visible:
+            self.frame.grid()
+            self.visible = True
+        if order == self.order:
+            return
+        self.order = order
+
+        items_str = ", ".join([f"{item.product_name} (x{item.quantity})" for item in order.items])
+        if len(items_str) > OrderListView.ITEMS_TEXT_LIMIT:
+            items_str = items_str[:OrderListView.ITEMS_TEXT_LIMIT - 1] + "…"
+        texts = (order.customer_name or "N/A", items_str, f"${order.total_due:.2f}")
+        for label, old_text, new_text in zip((self.customer_label, self.items_label, self.total_label), self.texts, texts):
+            if old_text != new_text:
+                label.configure(text=new_text)
+        self.texts = texts
+
+    def hide(self):
+        if self.visible:
+            self.frame.grid_remove()
+            self.visible = False
+
+class OrderListView(ctk.CTkFrame):
+    # Virtualized list of pending orders. Only the rows that fit in the view
+    # exist as widgets; they are created once and reused while scrolling and on
+    # every refresh, so refreshing costs the same with 10 or 1000 orders.
+    ROW_HEIGHT = 52 # Room for two lines of wrapped item text
+    ITEMS_TEXT_LIMIT = 80
+    COLUMN_WIDTHS = (150, 260, 90, 170)
+
+    def __init__(self, master, on_edit, on_close, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_edit = on_edit
+        self.on_close = on_close
+
+        self.orders = [] # Display order: newest first
+        self.positions = {} # order id -> index in self.orders
+        self.first = 0 # Index of the first visible order
+        self.rows = [] # Pool of row widgets, one per visible slot
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        ctk.CTkLabel(self, text="Pedidos Pendientes").grid(row=0, column=0, columnspan=2, pady=(5, 0))
+
+        header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        header_frame.grid(row=1, column=0, padx=5, sticky="ew")
+        self.configure_columns(header_frame)
+        for column, text in enumerate(["Cliente", "Items", "Total", "Acciones"]):
+            ctk.CTkLabel(header_frame, text=text, font=ctk.CTkFont(weight="bold")).grid(row=0, column=column, padx=5, pady=2, sticky="w")
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=2, column=0, padx=5, pady=(0, 5), sticky="nsew")
+        self.body.grid_columnconfigure(0, weight=1)
+        self.body.grid_propagate(False) # The body's size comes from the window, not from its rows
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self.scrollbar.grid(row=2, column=1, padx=(0, 5), pady=(0, 5), sticky="ns")
+
+        self.empty_label = ctk.CTkLabel(self.body, text="No hay pedidos pendientes.")
+
+        self.body.bind("<Configure>", lambda event: self.render())
+        # CTk widgets refuse bind_all, so register the wheel on the toplevel
+        toplevel = self.winfo_toplevel()
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            toplevel.bind_all(sequence, self._on_mouse_wheel, add="+")
+
+    def configure_columns(self, frame):
+        for column, width in enumerate(self.COLUMN_WIDTHS):
+            frame.grid_columnconfigure(column, minsize=width, weight=1 if column == 1 else 0)
+
+    def capacity(self):
+        slot_height = (self.ROW_HEIGHT + 2) * ctk.ScalingTracker.get_widget_scaling(self)
+        return max(1, int(self.body.winfo_height() // slot_height))
+
+    # --- Data: keyed by order id ---
+
+    def set_orders(self, orders):
+        self.orders = list(orders)
+        self.positions = {order.id: index for index, order in enumerate(self.orders)}
+        self.render()
+
+    def upsert(self, order):
+        self._upsert(order)
+        self.render()
+
+    def remove(self, order_id):
+        self._remove(order_id)
+        self.render()
+
+    def patch(self, changed, removed_ids=()):
+        # Applies a set of changes (see App.apply_database_events) with one render
+        for order in changed:
+            self._upsert(order)
+        for order_id in removed_ids:
+            self._remove(order_id)
+        self.render()
+
+    def _upsert(self, order):
+        index = self.positions.get(order.id)
+        if index is not None:
+            self.orders[index] = order
+        else:
+            key = (order.order_date, order.id)
+            index = next((i for i, other in enumerate(self.orders) if (other.order_date, other.id) < key), len(self.orders))
+            self.orders.insert(index, order)
+            self._reindex(index)
+
+    def _remove(self, order_id):
+        index = self.positions.pop(order_id, None)
+        if index is None:
+            return
+        del self.orders[index]
+        self._reindex(index)
+
+    def _reindex(self, start):
+        for index in range(start, len(self.orders)):
+            self.positions[self.orders[index].id] = index
+
+    # --- Widgets: only the visible window ---
+
+    def render(self):
+        capacity = self.capacity()
+        self.first = max(0, min(self.first, len(self.orders) - capacity))
+        visible = self.orders[self.first:self.first + capacity]
+
+        while len(self.rows) < len(visible):
+            self.rows.append(_OrderRow(self))
+        for slot, row in enumerate(self.rows):
+            if slot < len(visible):
+                row.show(visible[slot])
+            else:
+                row.hide()
+
+        if self.orders:
+            self.empty_label.place_forget()
+            total = len(self.orders)
+            self.scrollbar.set(self.first / total, (self.first + len(visible)) / total)
+        else:
+            self.empty_label.place(relx=0.5, y=20, anchor="n")
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.orders))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.first += step * self.capacity() if args[2] == "pages" else step
+        self.render()
+
+    def _on_mouse_wheel(self, event):
+        # bind_all sees every wheel event in the app; only react inside the rows
+        widget = event.widget
+        while widget is not None and widget is not self.body:
+            widget = getattr(widget, "master", None)
+        if widget is None:
+            return
+        scroll_up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.yview("scroll", -1 if scroll_up else 1, "units")
+
+class _ProductRow:
+    # One row of ProductTableView, kept for as long as the product exists
+    def __init__(self, table, row_index):
+        self.product = None
+        self.row_index = row_index
+        self.cells = []
+        for column in range(5):
+            label = ctk.CTkLabel(table, text="")
+            label.grid(row=row_index, column=column, padx=5, pady=2)
+            self.cells.append(label)
+        self.edit_button = ctk.CTkButton(table, text="Editar", command=lambda: table.on_edit(self.product))
+        self.edit_button.grid(row=row_index, column=5, padx=5, pady=2)
+
+    @staticmethod
+    def texts(product):
+        product_id, name, price, stock, category = product
+        return (product_id, name, category if category else "Sin Categoría", f"{price:.2f}", stock)
+
+    def show(self, product):
+        if product == self.product:
+            return
+        old_texts = self.texts(self.product) if self.product else (None,) * 5
+        for label, old_text, new_text in zip(self.cells, old_texts, self.texts(product)):
+            if old_text != new_text:
+                label.configure(text=new_text)
+        self.product = product
+
+    def move(self, row_index):
+        if row_index != self.row_index:
+            self.row_index = row_index
+            for widget in self.cells + [self.edit_button]:
+                widget.grid(row=row_index)
+
+    def destroy(self):
+        for widget in self.cells + [self.edit_button]:
+            widget.destroy()
+
+class ProductTableView(ctk.CTkScrollableFrame):
+    # Product list with one cached row per product id. Refreshing only patches
+    # the cells that changed (usually a stock value after an order), creates
+    # rows for new products and drops rows for products that disappeared.
+    def __init__(self, master, on_edit, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_edit = on_edit
+        self.rows = {} # product id -> _ProductRow
+
+        for column, text in enumerate(["ID", "Nombre", "Categoría", "Precio", "Stock", "Acciones"]):
+            ctk.CTkLabel(self, text=text, font=ctk.CTkFont(weight="bold")).grid(row=0, column=column, padx=5, pady=2)
+
+    def set_products(self, products):
+        seen = set()
+        for i, product in enumerate(products):
+            product_id = product[0]
+            seen.add(product_id)
+            row = self.rows.get(product_id)
+            if row is None:
+                row = self.rows[product_id] = _ProductRow(self, i + 1)
+            else:
+                row.move(i + 1)
+            row.show(product)
+
+        for product_id in set(self.rows) - seen:
+            self.rows.pop(product_id).destroy()
+
+    def update_products(self, products):
+        # Patches only the given rows; new products go at the end, as in get_products
+        for product in products:
+            row = self.rows.get(product[0])
+            if row is None:
+                row = self.rows[product[0]] = _ProductRow(self, len(self.rows) + 1)
+            row.show(product)
+
+class SalesReportPanel(ctk.CTkFrame):
+    # Ticket, socio share, sales per hour and top products of the completed
+    # orders, from a reporting.SalesReport
+    BAR_WIDTH = 30
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.grid_columnconfigure((0, 1), weight=1)
+        mono = ctk.CTkFont(family="Courier", size=13)
+
+        self.summary_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=16))
+        self.summary_label.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 5))
+
+        ctk.CTkLabel(self, text="Ventas por Hora", font=ctk.CTkFont(weight="bold")).grid(row=1, column=0, padx=10, pady=(5, 0))
+        ctk.CTkLabel(self, text="Productos Más Vendidos", font=ctk.CTkFont(weight="bold")).grid(row=1, column=1, padx=10, pady=(5, 0))
+        self.hourly_label = ctk.CTkLabel(self, text="", font=mono, justify="left", anchor="nw")
+        self.hourly_label.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="n")
+        self.top_products_label = ctk.CTkLabel(self, text="", font=mono, justify="left", anchor="nw")
+        self.top_products_label.grid(row=2, column=1, padx=10, pady=(0, 10), sticky="n")
+
+    def show(self, report):
+        if not report.order_count:
+            self.summary_label.configure(text="Sin pedidos completados")
+            self.hourly_label.configure(text="")
+            self.top_products_label.configure(text="")
+            return
+
+        self.summary_label.configure(text=(
+            f"Pedidos: {report.order_count}    Ticket promedio: ${report.average_ticket:.2f}    "
+            f"Socios: {report.socio_order_share:.0%} de los pedidos, {report.socio_sales_share:.0%} de las ventas"))
+
+        # Only the hours that had orders, with a bar scaled to the busiest hour
+        busiest = max(report.hourly_sales) or 1
+        lines = []
+        for hour, (sales, orders) in enumerate(zip(report.hourly_sales, report.hourly_orders)):
+            if orders:
+                bar = "#" * max(1, round(self.BAR_WIDTH * sales / busiest))
+                lines.append(f"{hour:02d}h {bar:<{self.BAR_WIDTH}} {orders:>5} ${sales:,.0f}")
+        self.hourly_label.configure(text="\n".join(lines))
+
+        self.top_products_label.configure(text="\n".join(
+            f"{name[:22]:<22} {units:>6} u. ${total:,.0f}" for name, units, total in report.top_products))
+
 class CreateOrderWindow(ctk.CTkToplevel):
-    def __init__(self, master, order_data=None):
+    # Created once and reused for every new or edited order: closing only hides
+    # the window, and the product grid is rebuilt only when the catalogue
+    # (names, prices, categories) changes, not on every open. The search box
+    # filters the grid by hiding and showing its cards (see apply_search).
+    def __init__(self, master):
         super().__init__(master)
+        self.withdraw()
 
         self.master = master
-        self.order_data = order_data
-        self.is_edit_mode = order_data is not None
-        
-        # Initialize order items
-        self.order_items = {}
-        if self.is_edit_mode:
-            for item in order_data['items']:
-                self.order_items[item['product_id']] = {
-                    "name": item['product_name'],
-                    "quantity": item['quantity'],
-                    "price": item['item_price']
-                }
-        
-        # --- Window Setup ---
-        title = f"Editar Pedido #{order_data['id']}" if self.is_edit_mode else "Crear Nuevo Pedido"
-        self.title(title)
+        self.order_data = None
+        self.is_edit_mode = False
+        self.draft = None # OrderDraft of the order being built
+        self.product_labels = {} # To update quantity labels
+        self.product_cards = {} # product id -> card frame
+        self.card_slots = {} # product id -> (row, column) in its category grid, None when hidden
+        self.category_sections = {} # category -> [section frame, shown, product ids in grid order]
+        self.search_index = ProductSearchIndex()
+        self.search_best = None # Product Enter adds
+        self.search_pending = None # after_idle id of the next apply_search
+        self.catalogue_signature = None # Catalogue the product grid was built from
+        self.opening = False # Waiting for the catalogue to open the window
+
         self.geometry("800x600")
 
         # --- Frames ---
         top_frame = ctk.CTkFrame(self)
         top_frame.pack(fill="x", padx=10, pady=(10,0))
-        
-        if not self.is_edit_mode:
-            ctk.CTkLabel(top_frame, text="Nombre del Cliente:").pack(side="left", padx=(10,0))
-            self.customer_name_entry = ctk.CTkEntry(top_frame, placeholder_text="Nombre")
-            self.customer_name_entry.pack(side="left", fill="x", expand=True, padx=10)
-            self.es_socio_var = ctk.IntVar()
-            self.socio_checkbox = ctk.CTkCheckBox(top_frame, text="Socio", variable=self.es_socio_var, command=self.update_order_summary)
-            self.socio_checkbox.pack(side="left", padx=10)
-        else:
-            ctk.CTkLabel(top_frame, text=f"Cliente: {self.order_data.get('customer_name', 'N/A')}", font=ctk.CTkFont(weight="bold")).pack(side="left", padx=10)
-            self.es_socio_var = ctk.IntVar(value=self.order_data.get('es_socio', 0))
-            self.socio_checkbox = ctk.CTkCheckBox(top_frame, text="Socio", variable=self.es_socio_var, command=self.update_order_summary)
-            self.socio_checkbox.pack(side="left", padx=10)
+
+        # New orders ask for the customer's name, edited orders just show it
+        self.customer_prompt_label = ctk.CTkLabel(top_frame, text="Nombre del Cliente:")
+        self.customer_name_entry = ctk.CTkEntry(top_frame, placeholder_text="Nombre")
+        self.customer_title_label = ctk.CTkLabel(top_frame, text="", font=ctk.CTkFont(weight="bold"))
+        self.es_socio_var = ctk.IntVar()
+        self.socio_checkbox = ctk.CTkCheckBox(top_frame, text="Socio", variable=self.es_socio_var, command=self.update_summary_totals)
+
+        # Typing filters the products; Enter adds the best match, Escape clears
+        search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        search_frame.pack(fill="x", padx=10, pady=(10,0))
+        ctk.CTkLabel(search_frame, text="Buscar producto:").pack(side="left", padx=(10,0))
+        self.search_var = ctk.StringVar()
+        self.search_entry = ctk.CTkEntry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=10)
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        self.search_entry.bind("<Return>", self.add_search_match)
+        self.search_entry.bind("<Escape>", lambda event: self.search_var.set(""))
 
         main_frame = ctk.CTkFrame(self)
         main_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -92,8 +434,9 @@ class CreateOrderWindow(ctk.CTkToplevel):
         main_frame.grid_columnconfigure(1, weight=1) # Summary is narrower
         main_frame.grid_rowconfigure(0, weight=1)
 
-        product_list_frame = ctk.CTkScrollableFrame(main_frame, label_text="Productos Disponibles")
-        product_list_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.product_list_frame = ctk.CTkScrollableFrame(main_frame, label_text="Productos Disponibles")
+        self.product_list_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.product_list_frame.grid_columnconfigure(0, weight=1)
 
         order_summary_frame = ctk.CTkFrame(main_frame, width=250) # Reduced width
         order_summary_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
@@ -103,10 +446,93 @@ class CreateOrderWindow(ctk.CTkToplevel):
         buttons_frame = ctk.CTkFrame(self)
         buttons_frame.pack(fill="x", padx=10, pady=(0, 10))
 
-        # --- Product List ---
-        products = database.get_products()
-        self.product_labels = {} # To update quantity labels
-        
+        # --- Order Summary ---
+        ctk.CTkLabel(order_summary_frame, text="Resumen del Pedido", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=10, pady=10)
+        self.summary_text = ctk.CTkTextbox(order_summary_frame, wrap="word", state="disabled")
+        self.summary_text.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+
+        self.total_price_label = ctk.CTkLabel(order_summary_frame, text="Total: $0.00", font=ctk.CTkFont(weight="bold"))
+        self.total_price_label.grid(row=2, column=0, padx=10, pady=10, sticky="e")
+
+        # --- Buttons ---
+        self.confirm_button = ctk.CTkButton(buttons_frame, text="Confirmar Pedido", command=self.confirm_action)
+        self.confirm_button.pack(side="right", padx=5)
+        ctk.CTkButton(buttons_frame, text="Cancelar", command=self.close_window).pack(side="right", padx=5)
+        self.error_label = ctk.CTkLabel(buttons_frame, text="", text_color="red", justify="left", wraplength=600)
+        self.error_label.pack(side="left", padx=10)
+
+        self.protocol("WM_DELETE_WINDOW", self.close_window)
+
+    def open(self, order_data=None):
+        # The catalogue is read on the database worker; the window shows up once it arrives
+        if self.opening:
+            return
+        self.opening = True
+        self.master.db_worker.submit(self.master.database.get_products,
+                                     on_done=perf.refresh("CreateOrderWindow.open", lambda products: self.show_order(order_data, products)),
+                                     on_error=lambda error: setattr(self, "opening", False))
+
+    def show_order(self, order_data, products):
+        self.opening = False
+        self.order_data = order_data
+        self.is_edit_mode = order_data is not None
+
+        self.draft = OrderDraft(products, order_data)
+        self.build_product_grid(products)
+        self.search_var.set("") # Every order starts with the whole grid
+
+        # Reset the quantity labels in place
+        for product_id, quantity_label in self.product_labels.items():
+            quantity = str(self.draft.quantity(product_id))
+            if quantity_label.cget("text") != quantity:
+                quantity_label.configure(text=quantity)
+
+        # --- Window Setup ---
+        title = f"Editar Pedido #{order_data.id}" if self.is_edit_mode else "Crear Nuevo Pedido"
+        self.title(title)
+
+        for widget in (self.customer_prompt_label, self.customer_name_entry, self.customer_title_label, self.socio_checkbox):
+            widget.pack_forget()
+        if not self.is_edit_mode:
+            self.customer_name_entry.delete(0, ctk.END)
+            self.customer_name_entry.configure(border_color=["#979DA2", "#565B5E"]) # Default colors
+            self.customer_prompt_label.pack(side="left", padx=(10,0))
+            self.customer_name_entry.pack(side="left", fill="x", expand=True, padx=10)
+            self.es_socio_var.set(0)
+        else:
+            self.customer_title_label.configure(text=f"Cliente: {self.order_data.customer_name or 'N/A'}")
+            self.customer_title_label.pack(side="left", padx=10)
+            self.es_socio_var.set(self.order_data.es_socio or 0)
+        self.socio_checkbox.pack(side="left", padx=10)
+
+        self.confirm_button.configure(text=self.confirm_text(), state="normal")
+        self.error_label.configure(text="")
+
+        self.render_order_summary()
+
+        self.deiconify()
+        self.lift()
+        self.focus()
+        self.grab_set()
+
+    def build_product_grid(self, products):
+        # Rebuilds the product cards only if the catalogue changed since the
+        # last build; stock limits live in the OrderDraft of each order.
+        signature = tuple((product_id, name, price, category) for product_id, name, price, stock, category in products)
+        if signature == self.catalogue_signature:
+            return
+        self.catalogue_signature = signature
+
+        for widget in self.product_list_frame.winfo_children():
+            widget.destroy()
+        self.product_labels = {}
+        self.product_cards = {}
+        self.card_slots = {}
+        self.category_sections = {}
+        self.search_best = None
+        self.search_index.update(products)
+        scaling = ctk.ScalingTracker.get_widget_scaling(self.product_list_frame)
+
         # Group products by category
         categories = {}
         for product in products:
@@ -115,68 +541,49 @@ class CreateOrderWindow(ctk.CTkToplevel):
                 categories[category] = []
             categories[category].append(product)
 
-        for category_name, category_products in categories.items():
+        for section_row, (category_name, category_products) in enumerate(categories.items()):
+            # Header and grid of a category, hidden together when the search leaves it empty
+            section_frame = ctk.CTkFrame(self.product_list_frame, fg_color="transparent")
+            section_frame.grid(row=section_row, column=0, sticky="ew")
+            self.category_sections[category_name] = [section_frame, True, [product[0] for product in category_products]]
+
             # Category Header
-            category_label = ctk.CTkLabel(product_list_frame, text=category_name, font=ctk.CTkFont(size=13, weight="bold"), anchor="w")
+            category_label = ctk.CTkLabel(section_frame, text=category_name, font=ctk.CTkFont(size=13, weight="bold"), anchor="w")
             category_label.pack(fill="x", padx=10, pady=(8, 2))
-            
+
             # Grid frame for products in this category (3 columns)
-            cat_grid_frame = ctk.CTkFrame(product_list_frame, fg_color="transparent")
+            cat_grid_frame = ctk.CTkFrame(section_frame, fg_color="transparent")
             cat_grid_frame.pack(fill="x", padx=5, pady=2)
             cat_grid_frame.grid_columnconfigure((0, 1, 2), weight=1)
 
             for idx, product in enumerate(category_products):
                 product_id, name, price, stock, category = product
-                
+
                 # Use grid for 3 columns
                 row_idx = idx // 3
                 col_idx = idx % 3
-                
+
                 product_frame = ctk.CTkFrame(cat_grid_frame)
                 product_frame.grid(row=row_idx, column=col_idx, padx=2, pady=1, sticky="nsew")
                 product_frame.grid_columnconfigure(0, weight=1)
-                
-                # Only show the name, very compact
-                name_label = ctk.CTkLabel(product_frame, text=name, font=ctk.CTkFont(size=11, weight="bold"), anchor="w")
+                self.product_cards[product_id] = product_frame
+                self.card_slots[product_id] = (row_idx, col_idx)
+
+                # Only show the name (and the product's picture, if it has one), very compact
+                name_label = ctk.CTkLabel(product_frame, text=name, font=ctk.CTkFont(size=11, weight="bold"), anchor="w",
+                                          image=assets.product_thumbnail(product_id, scaling), compound="left")
                 name_label.grid(row=0, column=0, sticky="w", padx=4, pady=2)
-                
-                initial_quantity = self.order_items.get(product_id, {}).get("quantity", 0)
-                available_stock = stock + initial_quantity
 
                 quantity_frame = ctk.CTkFrame(product_frame, fg_color="transparent")
                 quantity_frame.grid(row=0, column=1, sticky="e", padx=2)
 
-                def create_callbacks(pid, pname, pprice, pstock, qlabel):
-                    def increment(event=None):
-                        current_quantity = self.order_items.get(pid, {}).get("quantity", 0)
-                        
-                        adjusted_stock = pstock
-                        if self.is_edit_mode:
-                            for item in self.order_data['items']:
-                                if item['product_id'] == pid:
-                                    adjusted_stock += item['quantity']
-                                    break
-                        
-                        if current_quantity < adjusted_stock:
-                            if pid not in self.order_items:
-                                self.order_items[pid] = {"name": pname, "quantity": 0, "price": pprice}
-                            self.order_items[pid]["quantity"] += 1
-                            qlabel.configure(text=str(self.order_items[pid]["quantity"]))
-                            self.update_order_summary()
-
-                    def decrement(event=None):
-                        if pid in self.order_items and self.order_items[pid]["quantity"] > 0:
-                            self.order_items[pid]["quantity"] -= 1
-                            qlabel.configure(text=str(self.order_items[pid]["quantity"]))
-                            if self.order_items[pid]["quantity"] == 0:
-                                del self.order_items[pid]
-                            self.update_order_summary()
-                    return increment, decrement
-
-                quantity_label = ctk.CTkLabel(quantity_frame, text=str(initial_quantity), width=20, font=ctk.CTkFont(size=11, weight="bold"))
+                def create_callbacks(pid):
+                    return lambda event=None: self.increment(pid), lambda event=None: self.decrement(pid)
+
+                quantity_label = ctk.CTkLabel(quantity_frame, text="0", width=20, font=ctk.CTkFont(size=11, weight="bold"))
                 self.product_labels[product_id] = quantity_label
-                
-                increment_callback, decrement_callback = create_callbacks(product_id, name, price, stock, quantity_label)
+
+                increment_callback, decrement_callback = create_callbacks(product_id)
 
                 # Bind events to every part of the card
                 for widget in [product_frame, name_label, quantity_frame, quantity_label]:
@@ -186,54 +593,120 @@ class CreateOrderWindow(ctk.CTkToplevel):
 
                 quantity_label.pack(padx=2)
 
-        # --- Order Summary ---
-        ctk.CTkLabel(order_summary_frame, text="Resumen del Pedido", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=10, pady=10)
-        self.summary_text = ctk.CTkTextbox(order_summary_frame, wrap="word", state="disabled")
-        self.summary_text.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
-        
-        self.total_price_label = ctk.CTkLabel(order_summary_frame, text="Total: $0.00", font=ctk.CTkFont(weight="bold"))
-        self.total_price_label.grid(row=2, column=0, padx=10, pady=10, sticky="e")
+        if self.search_var.get():
+            self.apply_search()
+
+    def schedule_search(self):
+        # Keystrokes that arrive together are filtered once
+        if self.search_pending is None:
+            self.search_pending = self.after_idle(self.apply_search)
+
+    def apply_search(self):
+        # Hides the cards that don't match and packs the rest to the front of
+        # their category's grid. Only cards whose slot changes are touched, so
+        # a keystroke costs the cards it hides or shows, not the whole grid.
+        if self.search_pending is not None:
+            self.after_cancel(self.search_pending)
+            self.search_pending = None
+        query = self.search_var.get()
+        ids = self.search_index.search(query)
+
+        for section in self.category_sections.values():
+            section_frame, shown, product_ids = section
+            visible = 0
+            for product_id in product_ids:
+                if ids is None or product_id in ids:
+                    slot = divmod(visible, 3)
+                    if self.card_slots[product_id] != slot:
+                        self.product_cards[product_id].grid(row=slot[0], column=slot[1])
+                        self.card_slots[product_id] = slot
+                    visible += 1
+                elif self.card_slots[product_id] is not None:
+                    self.product_cards[product_id].grid_remove()
+                    self.card_slots[product_id] = None
+            if bool(visible) != shown:
+                if visible:
+                    section_frame.grid()
+                else:
+                    section_frame.grid_remove()
+                section[1] = bool(visible)
+
+        # Outline the card Enter would add
+        best = self.search_index.best(query, ids) if ids is not None else None
+        if best != self.search_best:
+            if self.search_best in self.product_cards:
+                self.product_cards[self.search_best].configure(border_width=0)
+            if best is not None:
+                self.product_cards[best].configure(border_width=2, border_color=("#3B8ED0", "#1F6AA5"))
+            self.search_best = best
+
+    def add_search_match(self, event=None):
+        if self.search_pending is not None:
+            self.apply_search() # Enter pressed before the last keystroke was filtered
+        if self.search_best is not None:
+            self.increment(self.search_best)
+        # Typing again replaces the query; Enter again adds another one
+        self.search_entry.select_range(0, ctk.END)
+        return "break"
+
+    def increment(self, product_id):
+        if self.draft.increment(product_id):
+            self.product_labels[product_id].configure(text=str(self.draft.quantity(product_id)))
+            self.update_summary_line(product_id)
+
+    def decrement(self, product_id):
+        if self.draft.decrement(product_id):
+            self.product_labels[product_id].configure(text=str(self.draft.quantity(product_id)))
+            self.update_summary_line(product_id)
+
+    # The summary textbox has one line per product, tagged "line-<id>", plus
+    # footer text tagged "footer" (empty-order message or socio discount), so a
+    # click only rewrites its own line and the footer.
+
+    def render_order_summary(self):
+        self.summary_text.configure(state="normal")
+        self.summary_text.delete("1.0", "end")
+        for product_id in self.draft.items:
+            self.summary_text.insert("end", self.draft.line_text(product_id), f"line-{product_id}")
+        self.summary_text.configure(state="disabled")
+        self.update_summary_totals()
 
-        # --- Buttons ---
-        confirm_text = "Confirmar Cambios" if self.is_edit_mode else "Confirmar Pedido"
-        ctk.CTkButton(buttons_frame, text=confirm_text, command=self.confirm_action).pack(side="right", padx=5)
-        ctk.CTkButton(buttons_frame, text="Cancelar", command=self.close_window).pack(side="right", padx=5)
+    def update_summary_line(self, product_id):
+        tag = f"line-{product_id}"
+        self.summary_text.configure(state="normal")
+        ranges = self.summary_text.tag_ranges(tag)
+        if ranges:
+            index = ranges[0]
+            self.summary_text.delete(ranges[0], ranges[1])
+        else:
+            footer = self.summary_text.tag_ranges("footer")
+            index = footer[0] if footer else "end"
+        if product_id in self.draft.items:
+            self.summary_text.insert(index, self.draft.line_text(product_id), tag)
+        self.summary_text.configure(state="disabled")
+        self.update_summary_totals()
 
-        self.update_order_summary()
-        
-        self.grab_set()
-        self.protocol("WM_DELETE_WINDOW", self.close_window)
-        self.wait_window(self)
+    def update_summary_totals(self):
+        total_price, discount = self.draft.totals(self.es_socio_var.get())
 
-    def update_order_summary(self):
         self.summary_text.configure(state="normal")
-        self.summary_text.delete("1.0", "end")
-        
-        total_price = 0
-        if not self.order_items:
-            self.summary_text.insert("1.0", "El pedido está vacío.")
-        else:
-            for pid, item in self.order_items.items():
-                if item['quantity'] > 0:
-                    line_total = item["quantity"] * item["price"]
-                    total_price += line_total
-                    self.summary_text.insert("end", f"{item['name']} x{item['quantity']} - ${line_total:.2f}\n")
-        
-        if self.es_socio_var.get() == 1:
-            discount = total_price * 0.15
-            total_price *= 0.85
-            self.summary_text.insert("end", f"\nDescuento Socio (15%): -${discount:.2f}\n")
+        footer = self.summary_text.tag_ranges("footer")
+        if footer:
+            self.summary_text.delete(footer[0], footer[1])
+        if not self.draft.items:
+            self.summary_text.insert("end", "El pedido está vacío.", "footer")
+        elif discount:
+            self.summary_text.insert("end", f"\nDescuento Socio (15%): -${discount:.2f}\n", "footer")
+        self.summary_text.configure(state="disabled")
 
         self.total_price_label.configure(text=f"Total: ${total_price:.2f}")
-        self.summary_text.configure(state="disabled")
+
+    def confirm_text(self):
+        return "Confirmar Cambios" if self.is_edit_mode else "Confirmar Pedido"
 
     def confirm_action(self):
-        product_items_for_db = []
-        for pid, item in self.order_items.items():
-            if item["quantity"] > 0:
-                product_items_for_db.append((pid, item["quantity"], item["price"]))
+        product_items_for_db = self.draft.lines_for_db()
         
-        success = False
         es_socio = self.es_socio_var.get()
         
         # Reset visual feedback
@@ -242,10 +715,11 @@ class CreateOrderWindow(ctk.CTkToplevel):
 
         if self.is_edit_mode:
             if not product_items_for_db:
-                database.update_order_status_and_payment_method(self.order_data['id'], 2, None) # 2 = cancelled
-                success = True
+                # Returns nothing; a failure arrives as an exception
+                self.save_order(self.master.database.update_order_status_and_payment_method, self.order_data.id, 2, None, # 2 = cancelled
+                                succeeded=lambda result: True)
             else:
-                success = database.update_order(self.order_data['id'], product_items_for_db, self.order_data, es_socio)
+                self.save_order(self.master.database.update_order, self.order_data.id, product_items_for_db, es_socio)
         else:
             customer_name = self.customer_name_entry.get()
             
@@ -261,25 +735,61 @@ class CreateOrderWindow(ctk.CTkToplevel):
                 valid = False
 
             if valid:
-                order_id = database.add_order(product_items_for_db, customer_name, es_socio)
-                if order_id is not None:
-                    success = True
-        
-        if success:
-            self.master.load_orders()
-            self.master.load_products()
-            self.close_window()
-        
+                self.save_order(self.master.database.add_order, product_items_for_db, customer_name, es_socio)
+
+    def save_order(self, fn, *args, succeeded=bool):
+        # Saves on the database worker. The window stays open with the confirm
+        # button disabled until the result arrives, and closes only on success;
+        # any failure is shown in the error label.
+        self.confirm_button.configure(state="disabled", text="Guardando...")
+        self.error_label.configure(text="")
+
+        def finished(result):
+            self.confirm_button.configure(state="normal", text=self.confirm_text())
+            if succeeded(result):
+                self.close_window() # The lists update from the change events
+            else:
+                self.error_label.configure(text="No se pudo guardar el pedido.")
+
+        def failed(error):
+            self.confirm_button.configure(state="normal", text=self.confirm_text())
+            if isinstance(error, database.StockShortageError):
+                # Another terminal took the stock since the window opened:
+                # cap the draft at what is left and say what to change
+                lines = []
+                for product_id, name, requested, available in error.shortages:
+                    self.draft.available[product_id] = available
+                    lines.append(f"{name}: pedido {requested}, disponible {available}")
+                self.error_label.configure(text="Stock insuficiente. " + "; ".join(lines))
+                self.master.load_products()
+            else:
+                # RemoteError, sqlite3 errors, ...
+                self.error_label.configure(text=f"No se pudo guardar el pedido: {error}")
+
+        self.master.db_worker.submit(fn, *args, on_done=perf.refresh("CreateOrderWindow.save_order", finished), on_error=failed)
+
     def close_window(self):
+        # Hide rather than destroy, so the next order reuses the window
         self.grab_release()
-        self.destroy()
+        self.withdraw()
+
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, client=None, profile=None):
         super().__init__()
         self.title("Control de Stock")
         self.geometry("1000x700") # Increased size for better layout
+        self.profile = profile
+        self.mark_startup("Tk window")
+
+        # Local mode uses the database modules directly; with an OrderClient
+        # (main.py --server) the same calls go to the order server
+        self.client = client
+        self.database = client.database if client else database
 
-        database.init_db() # Initialize the database
+        # All database calls run on this worker, off the Tk main loop
+        self.db_worker = DatabaseWorker(self)
+        self.db_worker.busy_listeners.append(self.set_busy)
+        self.db_worker.submit(self.database.init_db) # Initialize the database (the server does it in client mode)
 
         # Configure grid layout (4x4)
         self.grid_columnconfigure(1, weight=1)
@@ -300,13 +810,19 @@ class App(ctk.CTk):
         self.sidebar_button_3 = ctk.CTkButton(self.sidebar_frame, text="Resumen de Ventas", command=lambda: self.change_tab("Resumen de Ventas"))
         self.sidebar_button_3.grid(row=3, column=0, padx=20, pady=10)
 
-        # Add image to sidebar
-        self.sidebar_image = ctk.CTkImage(Image.open("icon.png"), size=(160, 200))
+        # Add image to sidebar (pre-scaled and cached on disk, see assets.py)
+        self.sidebar_image = assets.get_image("icon.png", (160, 200), ctk.ScalingTracker.get_widget_scaling(self.sidebar_frame))
         self.sidebar_image_label = ctk.CTkLabel(self.sidebar_frame, text="", image=self.sidebar_image)
         self.sidebar_image_label.grid(row=4, column=0, pady=(30, 0), sticky="n") # Adjust row and pady as needed
 
-        # Create tabview
-        self.tabview = ctk.CTkTabview(self)
+        # Shown while the database worker has work in flight
+        self.status_label = ctk.CTkLabel(self.sidebar_frame, text="", text_color="gray")
+        self.status_label.grid(row=5, column=0, padx=20, pady=(0, 10))
+        self.mark_startup("sidebar")
+
+        # Create tabview. Only the visible tab is built at startup; the others
+        # on their first change_tab
+        self.tabview = ctk.CTkTabview(self, command=lambda: self.change_tab(self.tabview.get()))
         self.tabview.grid(row=0, column=1, padx=(20, 0), pady=(20, 0), sticky="nsew")
         self.tabview.add("Productos")
         self.tabview.add("Pedidos")
@@ -314,10 +830,76 @@ class App(ctk.CTk):
         self.tabview.tab("Productos").grid_columnconfigure(0, weight=1)  # configure grid of individual tabs
         self.tabview.tab("Pedidos").grid_columnconfigure(0, weight=1)
         self.tabview.tab("Resumen de Ventas").grid_columnconfigure(0, weight=1)
+        self.tab_builders = {"Productos": self.build_products_tab, "Pedidos": self.build_orders_tab, "Resumen de Ventas": self.build_sales_tab}
+        self.built_tabs = set()
+        # Hidden "Rendimiento" tab: added by main.py --perf or Ctrl+Shift+P (see perf.py)
+        self.bind("<Control-P>", lambda event: self.show_perf_tab())
+        if perf.is_enabled():
+            self.add_perf_tab()
 
-        # =========================================================================================================
-        # Productos Tab
-        # =========================================================================================================
+        self.selected_product_id = None
+        self.selected_product = None # Row (with version) the edit started from, see database.get_product
+        self.products_version = None # Product cache version the list shows, see database.get_catalogue
+
+        self.order_window = None
+        self.after(500, self.prepare_order_window)
+
+        # The views follow the database's change events (see events.py): this
+        # process's own writes locally, every terminal's through the server
+        self.pending_events = []
+        self.event_listener = None
+        if client:
+            from order_client import EventListener
+            self.server_changes = queue.Queue()
+            self.event_listener = EventListener(client, self.server_changes)
+            self.after(SERVER_POLL_MS, self.apply_server_changes)
+        else:
+            events.subscribe(self.on_database_event)
+
+        self.change_tab(self.tabview.get()) # Builds and loads the visible tab
+        if profile:
+            self.db_worker.busy_listeners.append(self.finish_startup_profile)
+
+    @property
+    def export(self):
+        if self.client:
+            return self.client.export
+        import export
+        return export
+
+    @property
+    def reporting(self):
+        if self.client:
+            return self.client.reporting
+        import reporting
+        return reporting
+
+    def mark_startup(self, phase):
+        if self.profile:
+            self.profile.mark(phase)
+
+    def finish_startup_profile(self, busy):
+        # The database is initialized and the visible tab shows its data:
+        # report, timing the tabs startup no longer builds, and quit
+        if busy or self.profile is None:
+            return
+        self.mark_startup("database ready, first data shown")
+        for tab_name in self.tab_builders:
+            if tab_name not in self.built_tabs:
+                self.ensure_tab(tab_name, f"(deferred) tab {tab_name}")
+        self.profile.report()
+        self.profile = None
+        self.after(0, self.destroy)
+
+    # Each tab's widgets are built the first time it is shown (see ensure_tab)
+
+    def ensure_tab(self, tab_name, phase=None):
+        if tab_name not in self.built_tabs:
+            self.built_tabs.add(tab_name)
+            self.tab_builders[tab_name]()
+            self.mark_startup(phase or f"tab {tab_name}")
+
+    def build_products_tab(self):
         self.products_frame = ctk.CTkFrame(self.tabview.tab("Productos"))
         self.products_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
@@ -356,17 +938,13 @@ class App(ctk.CTk):
         self.cancel_edit_button = ctk.CTkButton(buttons_frame, text="Cancelar", command=self.cancel_edit_event, state="disabled")
         self.cancel_edit_button.pack(side="left", expand=True, padx=5)
 
-        self.selected_product_id = None
-
         # Frame for product list
-        self.product_list_frame = ctk.CTkScrollableFrame(self.products_frame, label_text="Lista de Productos")
+        self.product_list_frame = ProductTableView(self.products_frame, on_edit=self.select_product_for_edit, label_text="Lista de Productos")
         self.product_list_frame.grid(row=5, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
         self.products_frame.grid_rowconfigure(5, weight=1) # Make the product list frame expand
         self.products_frame.grid_columnconfigure(1, weight=1) # Make the entry fields expand
 
-        # =========================================================================================================
-        # Pedidos Tab
-        # =========================================================================================================
+    def build_orders_tab(self):
         self.orders_frame = ctk.CTkFrame(self.tabview.tab("Pedidos"))
         self.orders_frame.pack(fill="both", expand=True, padx=10, pady=10)
         self.orders_frame.grid_rowconfigure(1, weight=1) # Make the product list frame expand
@@ -375,12 +953,63 @@ class App(ctk.CTk):
         self.create_order_button = ctk.CTkButton(self.orders_frame, text="Crear Nuevo Pedido", command=self.create_new_order_event)
         self.create_order_button.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
 
-        self.order_list_frame = ctk.CTkScrollableFrame(self.orders_frame, label_text="Pedidos Pendientes")
-        self.order_list_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+        self.order_list = OrderListView(self.orders_frame, on_edit=self.edit_order_event, on_close=self.close_order)
+        self.order_list.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+
+    def add_perf_tab(self):
+        if "Rendimiento" not in self.tab_builders:
+            self.tabview.add("Rendimiento")
+            self.tab_builders["Rendimiento"] = self.build_perf_tab
+
+    def show_perf_tab(self):
+        perf.enable() # Records from now on if it wasn't already
+        self.add_perf_tab()
+        self.change_tab("Rendimiento")
+
+    def build_perf_tab(self):
+        self.perf_frame = ctk.CTkFrame(self.tabview.tab("Rendimiento"))
+        self.perf_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        buttons_frame = ctk.CTkFrame(self.perf_frame, fg_color="transparent")
+        buttons_frame.pack(fill="x", padx=10, pady=(10, 0))
+        ctk.CTkButton(buttons_frame, text="Actualizar", command=self.show_perf_report).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="Reiniciar", command=lambda: (perf.reset(), self.show_perf_report())).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="Guardar JSON", command=self.dump_perf_report).pack(side="left", padx=5)
+        self.perf_status_label = ctk.CTkLabel(buttons_frame, text="", text_color="gray")
+        self.perf_status_label.pack(side="left", padx=10)
+
+        self.perf_text = ctk.CTkTextbox(self.perf_frame, wrap="none", font=ctk.CTkFont(family="Courier", size=12))
+        self.perf_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def show_perf_report(self):
+        report = perf.snapshot()
+        lines = [f"{'Operación':<45} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}"]
+        for name, timing in report["timings"].items():
+            lines.append(f"{name:<45} {timing['count']:>7} {timing['p50_ms']:>9.2f} {timing['p95_ms']:>9.2f} {timing['p99_ms']:>9.2f} {timing['max_ms']:>9.2f}")
+        lines.append("")
+        lines.append(f"{'Sentencias SQL':<45} {'n':>7}")
+        for keyword, count in report["statements"].items():
+            lines.append(f"{keyword:<45} {count:>7}")
+        lines.append("")
+        lines.append(f"{'Widgets Tk':<45} {'creados':>9} {'destruidos':>11} {'vivos':>7}")
+        for name, counts in sorted(report["widgets"].items(), key=lambda item: -item[1]["alive"]):
+            lines.append(f"{name:<45} {counts['created']:>9} {counts['destroyed']:>11} {counts['alive']:>7}")
+
+        self.perf_text.configure(state="normal")
+        self.perf_text.delete("1.0", "end")
+        self.perf_text.insert("end", "\n".join(lines))
+        self.perf_text.configure(state="disabled")
+
+    def dump_perf_report(self):
+        try:
+            path = perf.dump()
+        except OSError as e:
+            print(f"Error writing performance data: {e}")
+            self.perf_status_label.configure(text="No se pudo guardar.")
+            return
+        self.perf_status_label.configure(text=f"Guardado en {path}")
 
-        # =========================================================================================================
-        # Resumen de Ventas Tab
-        # =========================================================================================================
+    def build_sales_tab(self):
         self.sales_frame = ctk.CTkFrame(self.tabview.tab("Resumen de Ventas"))
         self.sales_frame.pack(fill="both", expand=True, padx=10, pady=10)
         self.sales_label = ctk.CTkLabel(self.sales_frame, text="Contenido de Resumen de Ventas")
@@ -392,16 +1021,19 @@ class App(ctk.CTk):
         self.total_cash_sales_label = ctk.CTkLabel(self.sales_frame, text="Total en Efectivo: $0.00", font=ctk.CTkFont(size=20))
         self.total_cash_sales_label.pack(pady=10)
 
+        self.sales_report_panel = SalesReportPanel(self.sales_frame)
+        self.sales_report_panel.pack(fill="x", padx=20, pady=10)
+
         self.export_button = ctk.CTkButton(self.sales_frame, text="Exportar y Limpiar Pedidos", command=self.export_and_clear_orders_event)
         self.export_button.pack(pady=10)
 
         self.open_csv_folder_button = ctk.CTkButton(self.sales_frame, text="Abrir Carpeta de CSVs", command=self.open_csv_folder)
         self.open_csv_folder_button.pack(pady=10)
+        if self.client:
+            # The CSVs are written on the order server's machine, not here
+            self.open_csv_folder_button.configure(state="disabled", text="CSVs guardados en el servidor")
+
 
-        self.load_products() # Load products when app starts
-        self.load_orders() # Load orders when app starts
-        self.load_sales_summary() # Load sales summary when app starts
-    
     def add_product_event(self):
         name = self.product_name_entry.get()
         price_str = self.product_price_entry.get()
@@ -439,12 +1071,17 @@ class App(ctk.CTk):
         if not valid:
             return
 
-        if database.add_product(name, price, stock, category):
-            self.product_name_entry.delete(0, ctk.END)
-            self.product_price_entry.delete(0, ctk.END)
-            self.product_stock_entry.delete(0, ctk.END)
-            self.product_category_option.set("Pizzas") # Reset to default
-            self.load_products() # Refresh the list
+        def finished(success):
+            self.add_product_button.configure(state="normal")
+            if success:
+                self.product_name_entry.delete(0, ctk.END)
+                self.product_price_entry.delete(0, ctk.END)
+                self.product_stock_entry.delete(0, ctk.END)
+                self.product_category_option.set("Pizzas") # Reset to default
+
+        self.add_product_button.configure(state="disabled")
+        self.db_worker.submit(self.database.add_product, name, price, stock, category, on_done=finished,
+                              on_error=lambda error: finished(False))
 
     def update_product_event(self):
         if self.selected_product_id is None:
@@ -486,12 +1123,23 @@ class App(ctk.CTk):
         if not valid:
             return
 
-        if database.update_product(self.selected_product_id, name, price, stock, category):
-            self.cancel_edit_event() # Reset the form
-            self.load_products() # Refresh the list
+        def finished(success):
+            self.save_product_button.configure(state="normal")
+            if success:
+                self.cancel_edit_event() # Reset the form
+
+        def failed(error):
+            finished(False)
+            if isinstance(error, database.StaleProductError):
+                self.db_worker.submit(self.database.get_product, error.product_id, on_done=self.refresh_stale_product)
+
+        self.save_product_button.configure(state="disabled")
+        self.db_worker.submit(self.database.update_product, self.selected_product_id, name, price, stock, category,
+                              expected_version=self.selected_product[5], on_done=finished, on_error=failed)
 
     def cancel_edit_event(self):
         self.selected_product_id = None
+        self.selected_product = None
         
         self.product_name_entry.delete(0, ctk.END)
         self.product_price_entry.delete(0, ctk.END)
@@ -503,7 +1151,15 @@ class App(ctk.CTk):
         self.cancel_edit_button.configure(state="disabled")
 
     def select_product_for_edit(self, product):
-        product_id, name, price, stock, category = product
+        # The list may be behind the database: edit from a fresh read, whose
+        # version update_product checks on save
+        self.db_worker.submit(self.database.get_product, product[0], on_done=self.fill_product_form)
+
+    def fill_product_form(self, product):
+        if product is None:
+            self.load_products()
+            return
+        product_id, name, price, stock, category, version = product
         
         self.product_name_entry.delete(0, ctk.END)
         self.product_name_entry.insert(0, name)
@@ -522,102 +1178,89 @@ class App(ctk.CTk):
         
         # Store the id of the product being edited
         self.selected_product_id = product_id
+        self.selected_product = product
         
         # Update buttons
         self.add_product_button.configure(state="disabled")
         self.save_product_button.configure(state="normal")
         self.cancel_edit_button.configure(state="normal")
         
-    def load_products(self):
-        # Clear existing widgets in the product list frame
-        for widget in self.product_list_frame.winfo_children():
-            widget.destroy()
-
-        # Add headers to the product list
-        ctk.CTkLabel(self.product_list_frame, text="ID", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=5, pady=2)
-        ctk.CTkLabel(self.product_list_frame, text="Nombre", font=ctk.CTkFont(weight="bold")).grid(row=0, column=1, padx=5, pady=2)
-        ctk.CTkLabel(self.product_list_frame, text="Categoría", font=ctk.CTkFont(weight="bold")).grid(row=0, column=2, padx=5, pady=2)
-        ctk.CTkLabel(self.product_list_frame, text="Precio", font=ctk.CTkFont(weight="bold")).grid(row=0, column=3, padx=5, pady=2)
-        ctk.CTkLabel(self.product_list_frame, text="Stock", font=ctk.CTkFont(weight="bold")).grid(row=0, column=4, padx=5, pady=2)
-        ctk.CTkLabel(self.product_list_frame, text="Acciones", font=ctk.CTkFont(weight="bold")).grid(row=0, column=5, padx=5, pady=2)
-        
-        products = database.get_products()
-        for i, product in enumerate(products):
-            product_id, name, price, stock, category = product
-            ctk.CTkLabel(self.product_list_frame, text=product_id).grid(row=i+1, column=0, padx=5, pady=2)
-            ctk.CTkLabel(self.product_list_frame, text=name).grid(row=i+1, column=1, padx=5, pady=2)
-            ctk.CTkLabel(self.product_list_frame, text=category if category else "Sin Categoría").grid(row=i+1, column=2, padx=5, pady=2)
-            ctk.CTkLabel(self.product_list_frame, text=f"{price:.2f}").grid(row=i+1, column=3, padx=5, pady=2)
-            ctk.CTkLabel(self.product_list_frame, text=stock).grid(row=i+1, column=4, padx=5, pady=2)
-
-            edit_button = ctk.CTkButton(self.product_list_frame, text="Editar", command=lambda p=product: self.select_product_for_edit(p))
-            edit_button.grid(row=i+1, column=5, padx=5, pady=2)
-    
-    def edit_order_event(self, order_data):
-        # Open a new window for editing an order
-        if hasattr(self, 'order_window') and self.order_window.winfo_exists():
-            self.order_window.focus() # If it exists, focus it
-            return
-            
-        self.order_window = CreateOrderWindow(self, order_data)
-
-    def create_new_order_event(self):
-        # Check if a window is already open
-        if hasattr(self, 'order_window') and self.order_window.winfo_exists():
-            self.order_window.focus() # If it exists, focus it
+    def refresh_stale_product(self, product):
+        # Someone else saved the product while it was being edited: load
+        # the values that changed, in red, and keep the rest of the edit
+        if product is None or self.selected_product is None or product[0] != self.selected_product_id:
+            self.cancel_edit_event()
+            self.load_products()
             return
+        old_id, old_name, old_price, old_stock, old_category, old_version = self.selected_product
+        product_id, name, price, stock, category, version = product
+        for entry, old, new, text in ((self.product_name_entry, old_name, name, name),
+                                      (self.product_price_entry, old_price, price, f"{price:.2f}"),
+                                      (self.product_stock_entry, old_stock, stock, str(stock))):
+            if old != new:
+                entry.delete(0, ctk.END)
+                entry.insert(0, text)
+                entry.configure(border_color="red")
+        self.selected_product = product
+        self.load_products()
 
-        # Open a new window for creating an order
-        self.order_window = CreateOrderWindow(self)
-
-    def load_orders(self):
-        # This method will be implemented later to load and display pending orders
-        # Clear existing widgets in the order list frame
-        for widget in self.order_list_frame.winfo_children():
-            widget.destroy()
-
-        ctk.CTkLabel(self.order_list_frame, text="Cliente", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=5, pady=2)
-        ctk.CTkLabel(self.order_list_frame, text="Items", font=ctk.CTkFont(weight="bold")).grid(row=0, column=1, padx=5, pady=2)
-        ctk.CTkLabel(self.order_list_frame, text="Total", font=ctk.CTkFont(weight="bold")).grid(row=0, column=2, padx=5, pady=2)
-        ctk.CTkLabel(self.order_list_frame, text="Acciones", font=ctk.CTkFont(weight="bold")).grid(row=0, column=3, padx=5, pady=2)
-
-        orders = database.get_orders(status=0) # Get pending orders
-        if not orders:
-            ctk.CTkLabel(self.order_list_frame, text="No hay pedidos pendientes.").grid(row=1, column=0, columnspan=4, padx=10, pady=10)
+    def load_products(self):
+        # Patches the cached product rows (see ProductTableView); nothing to
+        # do when the product cache hasn't changed since the last load
+        if "Productos" not in self.built_tabs:
+            return # Loaded when the tab is first shown
+        def loaded(result):
+            version, products = result
+            if products is not None:
+                self.products_version = version
+                self.product_list_frame.set_products(products)
+        self.db_worker.submit(self.database.get_catalogue, self.products_version, on_done=perf.refresh("App.load_products", loaded))
+
+    def show_order_window(self, order_data=None):
+        if self.order_window is None or not self.order_window.winfo_exists():
+            self.order_window = CreateOrderWindow(self)
+        elif self.order_window.winfo_viewable():
+            self.order_window.focus() # If it is already open, focus it
             return
 
-        for i, order in enumerate(orders):
-            order_id = order["id"]
-            total_price = order["total_price"]
-            if order.get("es_socio") == 1:
-                total_price *= 0.85
+        self.order_window.open(order_data)
 
-            items_str = ", ".join([f"{item['product_name']} (x{item['quantity']})" for item in order["items"]])
+    def prepare_order_window(self):
+        # Builds the (hidden) order window and its product grid ahead of the
+        # first "Crear Nuevo Pedido" click
+        if self.order_window is None:
+            self.order_window = CreateOrderWindow(self)
+            self.db_worker.submit(self.database.get_products, on_done=self.order_window.build_product_grid)
 
-            ctk.CTkLabel(self.order_list_frame, text=order.get("customer_name", "N/A")).grid(row=i+1, column=0, padx=5, pady=2, sticky="w")
-            ctk.CTkLabel(self.order_list_frame, text=items_str, wraplength=200, justify="left").grid(row=i+1, column=1, padx=5, pady=2, sticky="w")
-            ctk.CTkLabel(self.order_list_frame, text=f"${total_price:.2f}").grid(row=i+1, column=2, padx=5, pady=2, sticky="w")
-            
-            actions_frame = ctk.CTkFrame(self.order_list_frame)
-            actions_frame.grid(row=i+1, column=3, padx=5, pady=2, sticky="ew")
+    def edit_order_event(self, order_data):
+        # Open the order window for editing an order
+        self.show_order_window(order_data)
 
-            edit_button = ctk.CTkButton(actions_frame, text="Editar", command=lambda order_data=order: self.edit_order_event(order_data))
-            edit_button.pack(side="left", padx=2)
+    def create_new_order_event(self):
+        # Open the order window for creating an order
+        self.show_order_window()
 
-            close_button = ctk.CTkButton(actions_frame, text="Cerrar", command=lambda oid=order_id: self.close_order(oid))
-            close_button.pack(side="left", padx=2)
+    def load_orders(self):
+        # Pending orders, applied to the virtualized list (see OrderListView)
+        if "Pedidos" not in self.built_tabs:
+            return # Loaded when the tab is first shown
+        self.db_worker.submit(self.database.get_orders_page, status=0, on_done=perf.refresh("App.load_orders", self.order_list.set_orders))
 
     def close_order(self, order_id):
         dialog = PaymentMethodDialog(self)
         payment_method = dialog.get_input()
         
         if payment_method:
-            database.update_order_status_and_payment_method(order_id, 1, payment_method) # Set status to completed
-            self.load_orders() # Refresh pending orders
-            self.load_sales_summary() # Refresh sales summary
+            # The order leaves the list through its ORDERS_CLOSED event
+            self.db_worker.submit(self.database.update_order_status_and_payment_method, order_id, 1, payment_method) # Set status to completed
 
     def open_csv_folder(self):
-        csv_dir = "csv_exports"
+        import platform
+        import subprocess
+
+        if self.client:
+            return # Exports run on the order server; there is no local folder to open
+        csv_dir = self.export.CSV_DIR
         # Create directory if it doesn't exist
         os.makedirs(csv_dir, exist_ok=True)
         
@@ -630,66 +1273,157 @@ class App(ctk.CTk):
             subprocess.run(["xdg-open", csv_dir])
 
     def export_and_clear_orders_event(self):
-        pending_orders = database.get_orders(status=0)
-        if pending_orders:
-            return
+        # Runs on the database worker; the button stays disabled meanwhile
+        def finished(filename):
+            self.export_button.configure(state="normal", text="Exportar y Limpiar Pedidos")
 
-        completed_orders = database.get_orders(status=1)
-        if not completed_orders:
-            return
+        def failed(error):
+            print(f"Error: {error}")
+            finished(None)
 
-        # Create csv directory if it doesn't exist
-        csv_dir = "csv_exports"
-        os.makedirs(csv_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = os.path.join(csv_dir, f"pedidos_{timestamp}.csv")
+        def show_progress(lines_written, total_lines):
+            self.export_button.configure(text=f"Exportando... {lines_written * 100 // max(total_lines, 1)}%")
 
-        try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['order_id', 'customer_name', 'order_date', 'metodo_pago', 'product_name', 'quantity', 'item_price', 'total_order_price']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-                writer.writeheader()
-                for order in completed_orders:
-                    for item in order['items']:
-                        writer.writerow({
-                            'order_id': order['id'],
-                            'customer_name': order.get('customer_name', 'N/A'),
-                            'order_date': order['order_date'],
-                            'metodo_pago': order.get('metodo_pago', 'N/A'),
-                            'product_name': item['product_name'],
-                            'quantity': item['quantity'],
-                            'item_price': item['item_price'],
-                            'total_order_price': order['total_price']
-                        })
-            
-            # If CSV generation is successful, clear the orders
-            if database.clear_all_orders():
-                self.load_orders()
-                self.load_sales_summary()
-
-        except Exception as e:
-            print(f"Error: {e}")
+        def progress(lines_written, total_lines):
+            # Called on the worker thread
+            self.db_worker.post(show_progress, lines_written, total_lines)
 
+        self.export_button.configure(state="disabled", text="Exportando...")
+        self.db_worker.submit(self.export.export_and_clear_orders, progress=progress, on_done=finished, on_error=failed)
 
     def load_sales_summary(self):
-        total_sales = database.get_total_sales()
-        total_cash_sales = database.get_total_sales_by_payment_method("Efectivo")
-        self.total_sales_label.configure(text=f"Total de Ventas: ${total_sales:.2f}")
-        self.total_cash_sales_label.configure(text=f"Total en Efectivo: ${total_cash_sales:.2f}")
+        if "Resumen de Ventas" not in self.built_tabs:
+            return # Loaded when the tab is first shown
+
+        def show(totals):
+            total_sales, total_cash_sales = totals
+            self.total_sales_label.configure(text=f"Total de Ventas: ${total_sales:.2f}")
+            self.total_cash_sales_label.configure(text=f"Total en Efectivo: ${total_cash_sales:.2f}")
+
+        self.db_worker.submit(lambda: (self.database.get_total_sales(), self.database.get_total_sales_by_payment_method("Efectivo")),
+                              on_done=perf.refresh("App.load_sales_summary", show))
+        # The full report reads every order line; only build it while the tab is visible
+        # (reporting, and NumPy with it, is imported on the worker the first time)
+        if self.tabview.get() == "Resumen de Ventas":
+            self.db_worker.submit(lambda: self.reporting.build_sales_report(), on_done=perf.refresh("App.load_sales_report", self.sales_report_panel.show))
+
+    def set_busy(self, busy):
+        # Only show the indicator for work that takes long enough to notice
+        self.busy = busy
+        if busy:
+            self.after(150, lambda: self.busy and self.status_label.configure(text="Procesando..."))
+        else:
+            self.status_label.configure(text="")
+
+    def on_database_event(self, event):
+        # Called on the thread that committed, usually the database worker
+        self.db_worker.post(self.queue_database_event, event)
+
+    def apply_server_changes(self):
+        # Events from the order server (see order_client.EventListener)
+        while not self.server_changes.empty():
+            for event in self.server_changes.get_nowait():
+                self.queue_database_event(event)
+        self.after(SERVER_POLL_MS, self.apply_server_changes)
+
+    def queue_database_event(self, event):
+        # Events arrive in bursts (an order brings ORDERS_ADDED and
+        # PRODUCTS_CHANGED); they are applied together once the loop is idle
+        if not self.pending_events:
+            self.after_idle(self.apply_database_events)
+        self.pending_events.append(event)
+
+    def apply_database_events(self):
+        # At most one small query per view, for just the ids that changed
+        changes, self.pending_events = self.pending_events, []
+        order_ids = set()
+        closed_ids = set()
+        product_ids = set()
+        sales_changed = False
+        for event in changes:
+            if event.kind == events.RESYNC:
+                self.products_version = None # The server may have restarted with a new cache
+                self.load_orders()
+                self.load_products()
+                self.load_sales_summary()
+                return
+            if event.kind in (events.ORDERS_ADDED, events.ORDERS_UPDATED):
+                order_ids.update(event.ids)
+            elif event.kind == events.ORDERS_CLOSED:
+                closed_ids.update(event.ids)
+            elif event.kind == events.ORDERS_CLEARED:
+                if "Pedidos" in self.built_tabs:
+                    self.order_list.set_orders([])
+                order_ids.clear()
+                closed_ids.clear()
+            elif event.kind == events.PRODUCTS_CHANGED:
+                product_ids.update(event.ids)
+            elif event.kind == events.SALES_CHANGED:
+                sales_changed = True
+
+        # Tabs not built yet load everything when first shown
+        if "Pedidos" not in self.built_tabs:
+            order_ids.clear()
+            closed_ids.clear()
+        if "Productos" not in self.built_tabs:
+            product_ids.clear()
+
+        order_ids -= closed_ids
+        if order_ids:
+            def patch_orders(orders):
+                # Orders that came back no longer pending leave the list
+                self.order_list.patch(orders, order_ids - {order.id for order in orders})
+            self.db_worker.submit(self.database.get_orders_page, status=0, ids=sorted(order_ids), on_done=perf.refresh("App.patch_orders", patch_orders))
+        if closed_ids:
+            self.order_list.patch([], closed_ids)
+        if product_ids:
+            self.db_worker.submit(self.database.get_products, ids=sorted(product_ids),
+                                  on_done=perf.refresh("App.patch_products", self.product_list_frame.update_products))
+        if sales_changed:
+            self.load_sales_summary()
 
     def change_tab(self, tab_name):
         self.tabview.set(tab_name)
+        self.ensure_tab(tab_name)
         if tab_name == "Productos":
             self.load_products()
         elif tab_name == "Pedidos":
             self.load_orders()
         elif tab_name == "Resumen de Ventas":
             self.load_sales_summary()
+        elif tab_name == "Rendimiento":
+            self.show_perf_report()
 
 
 if __name__ == "__main__":
-    app = App()
+    parser = argparse.ArgumentParser(description="Control de Stock")
+    parser.add_argument("--server", help="URL of an order_server.py to use instead of the local database, e.g. http://192.168.1.10:8765")
+    parser.add_argument("--profile-startup", action="store_true", help="print the time of each startup phase and quit")
+    parser.add_argument("--perf", action="store_true", help="record latencies, SQL statements and widget counts from the start; "
+                                                           "shows the Rendimiento tab and writes the data as JSON on exit")
+    args = parser.parse_args()
+
+    if args.perf:
+        perf.enable() # Before the first widget, so every one is counted
+    profile = None
+    if args.profile_startup:
+        profile = StartupProfile(_START)
+        profile.mark("imports")
+    client = None
+    if args.server:
+        from order_client import OrderClient
+        client = OrderClient(args.server)
+
+    app = App(client, profile)
+    if profile:
+        app.update() # Draw the window now, to time the first paint
+        app.mark_startup("first paint")
     app.mainloop()
+    if app.event_listener:
+        app.event_listener.stop()
+    events.unsubscribe(app.on_database_event)
+    app.db_worker.shutdown()
+    if not args.server:
+        database.close_db()
+    if args.perf:
+        print(f"Performance data written to {perf.dump()}")
@@ -0,0 +1,164 @@
+import argparse
+import glob
+import os
+import sys
+
+import columnar
+import connection
+import database
+import export
+import history
+
+# Maintenance commands for the stock control database.
+#
+#   python manage.py verify-sales
+#   python manage.py rebuild-sales
+#   python manage.py checkpoint
+#   python manage.py vacuum
+#   python manage.py to-columnar [csv files...]
+#   python manage.py import-orders [--sin-stock] [--crear-productos] <csv files...>
+#   python manage.py history [--por dia|producto|metodo|cliente] [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+
+def verify_sales_command(args):
+    mismatches = database.verify_sales_totals()
+    if not mismatches:
+        print("sales_totals is consistent with the orders.")
+        return 0
+    for day, metodo_pago, es_socio, stored_total, actual_total in mismatches:
+        print(f"{day} {metodo_pago or '-'} socio={es_socio}: stored {stored_total:.2f}, actual {actual_total:.2f}")
+    print(f"{len(mismatches)} mismatched rows; run 'python manage.py rebuild-sales' to fix them.")
+    return 1
+
+def rebuild_sales_command(args):
+    database.rebuild_sales_totals()
+    print("sales_totals rebuilt from the orders.")
+    return 0
+
+def checkpoint_command(args):
+    if database.checkpoint():
+        print("WAL checkpoint completed.")
+        return 0
+    print("WAL checkpoint could not complete; the database is in use.")
+    return 1
+
+def vacuum_command(args):
+    database.vacuum()
+    print("Database file rebuilt.")
+    return 0
+
+def to_columnar_command(args):
+    # Defaults to every export that has no .pcol copy yet
+    files = args.files or [f for f in sorted(glob.glob(os.path.join(export.CSV_DIR, "pedidos_*.csv")))
+                           if not os.path.exists(os.path.splitext(f)[0] + ".pcol")]
+    for csv_filename in files:
+        print(columnar.convert_csv(csv_filename))
+    print(f"{len(files)} files converted.")
+    return 0
+
+class _ImportFailed(Exception):
+    # Rolls back a file's import (and the products created for it)
+    pass
+
+def import_orders_command(args):
+    # Imports exports (csv_exports layout) as completed orders, one
+    # transaction per file. Products are matched by name; with
+    # --crear-productos the unknown ones are created in the same transaction,
+    # with just the stock the file takes, so they end the import at 0.
+    status = 0
+    for filename in args.files:
+        orders = export.read_orders_csv(filename)
+        product_ids = {name: product_id for product_id, name, price, stock, category in database.get_products()}
+        missing = {} # name -> (price, units in the file)
+        for order_id, customer_name, order_date, metodo_pago, lines in orders:
+            for product_name, quantity, item_price in lines:
+                if product_name not in product_ids:
+                    price, units = missing.get(product_name, (item_price, 0))
+                    missing[product_name] = (price, units + quantity)
+        if missing and not args.crear_productos:
+            print(f"{filename}: unknown products {', '.join(sorted(missing))}; use --crear-productos to add them.")
+            status = 1
+            continue
+
+        try:
+            with connection.transaction(database.DATABASE_NAME, immediate=True):
+                for product_name, (price, units) in missing.items():
+                    product_id = database.add_product(product_name, price, 0 if args.sin_stock else units)
+                    if not product_id:
+                        raise _ImportFailed()
+                    product_ids[product_name] = product_id
+
+                bulk_orders = [
+                    database.BulkOrder(customer_name=customer_name, order_date=order_date, status=1, metodo_pago=metodo_pago,
+                                       items=[(product_ids[product_name], quantity, item_price) for product_name, quantity, item_price in lines])
+                    for order_id, customer_name, order_date, metodo_pago, lines in orders
+                ]
+                order_ids = database.add_orders_bulk(bulk_orders, update_stock=not args.sin_stock)
+                if order_ids is None:
+                    raise _ImportFailed()
+        except database.StockShortageError as e:
+            print(f"{filename}: {e}; use --sin-stock to import without touching the stock.")
+            status = 1
+            continue
+        except _ImportFailed:
+            print(f"{filename}: not imported.")
+            status = 1
+            continue
+        print(f"{filename}: {len(order_ids)} orders imported" + (f", {len(missing)} products created." if missing else "."))
+    return status
+
+HISTORY_REPORTS = {
+    "dia": history.sales_by_day,
+    "producto": history.sales_by_product,
+    "metodo": history.sales_by_payment_method,
+    "cliente": history.sales_by_customer,
+}
+
+def history_command(args):
+    history.HISTORY_DATABASE_NAME = args.history_db
+    history.init_history()
+    ingested = history.ingest(args.csv_dir)
+    print(f"{len(ingested)} new or changed exports ingested.")
+    for key, total, units, orders in HISTORY_REPORTS[args.por](args.desde, args.hasta):
+        print(f"{key or '-':<30} ${total:>14,.2f} {units:>8} u. {orders:>7} pedidos")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Herramientas de mantenimiento de Control de Stock")
+    parser.add_argument("--db", default=database.DATABASE_NAME, help="database file (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("verify-sales", help="compare sales_totals with the raw orders").set_defaults(func=verify_sales_command)
+    subparsers.add_parser("rebuild-sales", help="recompute sales_totals from the raw orders").set_defaults(func=rebuild_sales_command)
+    subparsers.add_parser("checkpoint", help="fold the WAL back into the database file").set_defaults(func=checkpoint_command)
+    subparsers.add_parser("vacuum", help="rebuild the database file and return free space to the disk").set_defaults(func=vacuum_command)
+    to_columnar = subparsers.add_parser("to-columnar", help="write .pcol copies of existing CSV exports")
+    to_columnar.add_argument("files", nargs="*", help="CSV files (default: exports without a .pcol copy)")
+    to_columnar.set_defaults(func=to_columnar_command)
+
+    import_orders = subparsers.add_parser("import-orders", help="import orders from CSV exports as completed orders")
+    import_orders.add_argument("files", nargs="+", help="CSV files in the csv_exports layout")
+    import_orders.add_argument("--sin-stock", action="store_true", help="don't take the quantities from the stock")
+    import_orders.add_argument("--crear-productos", action="store_true",
+                               help="add unknown products, in the same transaction; their stock is set to what the file takes, so they end at 0")
+    import_orders.set_defaults(func=import_orders_command)
+
+    history_parser = subparsers.add_parser("history", help="ingest new exports and report historical sales")
+    history_parser.add_argument("--por", choices=sorted(HISTORY_REPORTS), default="dia", help="group sales by (default: %(default)s)")
+    history_parser.add_argument("--desde", help="first day, AAAA-MM-DD")
+    history_parser.add_argument("--hasta", help="last day, AAAA-MM-DD")
+    history_parser.add_argument("--csv-dir", default=export.CSV_DIR, help="exports directory (default: %(default)s)")
+    history_parser.add_argument("--history-db", default=history.HISTORY_DATABASE_NAME, help="history database (default: %(default)s)")
+    history_parser.set_defaults(func=history_command)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    database.DATABASE_NAME = args.db
+    database.init_db()
+    try:
+        return args.func(args)
+    finally:
+        database.close_db()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import sqlite3
+
+# Schema migrations, applied in order by migrate(). The database's
+# PRAGMA user_version holds the number of the last migration applied, so each
+# one runs exactly once and a normal startup costs a single PRAGMA read.
+# Never edit or reorder an existing migration; append a new one instead.
+
+def _add_missing_columns(c, table, columns):
+    existing = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns:
+        if name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+def _001_base_schema(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL,
+            stock INTEGER NOT NULL,
+            category TEXT
+        )
+    """)
+
+    # status: 0 for pending, 1 for completed, 2 for cancelled
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status INTEGER DEFAULT 0,
+            customer_name TEXT,
+            metodo_pago TEXT,
+            es_socio INTEGER DEFAULT 0
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            item_price REAL NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders (id),
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    """)
+
+    # Databases created by older versions of the app may lack these columns
+    _add_missing_columns(c, "products", [("category", "TEXT")])
+    _add_missing_columns(c, "orders", [
+        ("customer_name", "TEXT"),
+        ("metodo_pago", "TEXT"),
+        ("es_socio", "INTEGER DEFAULT 0"),
+    ])
+
+def _002_order_items_order_product_index(c):
+    # Serves get_orders_page's join on order_id (as the index prefix) and the
+    # (order_id, product_id) lookup in update_order.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_product ON order_items (order_id, product_id)")
+
+def _003_orders_status_date_index(c):
+    # Serves the status filters of get_orders_page and the sales totals, and
+    # the ORDER BY order_date of get_orders_page.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders (status, order_date)")
+
+def _004_sales_totals(c):
+    # Running sales totals of completed orders, kept up to date by the order
+    # functions in database.py. metodo_pago is '' rather than NULL so that it
+    # takes part in the primary key.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sales_totals (
+            day TEXT NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            es_socio INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, metodo_pago, es_socio)
+        )
+    """)
+    c.execute("DELETE FROM sales_totals")
+    c.execute("""
+        INSERT INTO sales_totals (day, metodo_pago, es_socio, total, order_count)
+        SELECT date(o.order_date), COALESCE(o.metodo_pago, ''), COALESCE(o.es_socio, 0),
+               SUM(CASE WHEN o.es_socio = 1 THEN oi.quantity * oi.item_price * 0.85 ELSE oi.quantity * oi.item_price END),
+               COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN order_items oi ON o.id = oi.order_id
+        WHERE o.status = 1
+        GROUP BY 1, 2, 3
+    """)
+
+def _005_archives(c):
+    # One row per archived night. The orders themselves live in the tables
+    # named here (see database.archive_orders).
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS archives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            orders_table TEXT NOT NULL,
+            items_table TEXT NOT NULL,
+            order_count INTEGER NOT NULL,
+            export_path TEXT,
+            exported_at TIMESTAMP
+        )
+    """)
+
+def _006_order_items_unique_product(c):
+    # One line per product and order, so update_order can UPSERT on it. Older
+    # databases could hold duplicate lines: they are merged into the first
+    # one, with the summed quantity at the average price, so totals and stock
+    # don't change. A group whose quantities add up to 0 keeps one line of
+    # quantity 0 at the first line's price.
+    c.execute("""
+        UPDATE order_items SET
+            quantity = merged.quantity,
+            item_price = COALESCE(merged.amount / NULLIF(merged.quantity, 0), order_items.item_price)
+        FROM (
+            SELECT MIN(id) AS id, SUM(quantity) AS quantity, SUM(quantity * item_price) AS amount
+            FROM order_items
+            GROUP BY order_id, product_id
+            HAVING COUNT(*) > 1
+        ) AS merged
+        WHERE order_items.id = merged.id
+    """)
+    c.execute("DELETE FROM order_items WHERE id NOT IN (SELECT MIN(id) FROM order_items GROUP BY order_id, product_id)")
+    c.execute("DROP INDEX IF EXISTS idx_order_items_order_product")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_order_items_order_product_unique ON order_items (order_id, product_id)")
+
+def _007_products_version(c):
+    # Bumped by every write to a product, so update_product can tell when an
+    # edit started from stale values
+    _add_missing_columns(c, "products", [("version", "INTEGER NOT NULL DEFAULT 0")])
+
+MIGRATIONS = [
+    _001_base_schema,
+    _002_order_items_order_product_index,
+    _003_orders_status_date_index,
+    _004_sales_totals,
+    _005_archives,
+    _006_order_items_unique_product,
+    _007_products_version,
+]
+
+def get_version(c):
+    return c.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(c, target=None):
+    # Applies every pending migration up to `target` (default: all of them)
+    # inside the caller's transaction. Returns the resulting schema version.
+    if target is None:
+        target = len(MIGRATIONS)
+    version = get_version(c)
+    if version > len(MIGRATIONS):
+        raise sqlite3.DatabaseError(f"Database schema version {version} is newer than this application ({len(MIGRATIONS)}).")
+    if version >= target:
+        return version
+
+    # sqlite3 doesn't open a transaction before DDL on its own; start one so
+    # that a failed migration leaves the schema untouched.
+    if not c.connection.in_transaction:
+        c.execute("BEGIN")
+    for number in range(version + 1, target + 1):
+        MIGRATIONS[number - 1](c)
+        c.execute(f"PRAGMA user_version = {number}")
+    return target
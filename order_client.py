@@ -0,0 +1,146 @@
+import functools
+import http.client
+import json
+import threading
+from urllib.parse import urlparse
+
+import database
+import events
+import export
+import reporting
+from order_server import READS, WRITES
+
+# Client side of order_server.py. OrderClient.database, .export and
+# .reporting stand in for the local modules: the functions the server
+# offers are called over HTTP, with their results rebuilt into the same
+# tuples and namedtuples, and StockShortageError / StaleProductError raised
+# again on this side. Classes (exceptions, namedtuples such as BulkOrder) and
+# constants come from the local module; any other function raises
+# AttributeError rather than run against a local database file.
+
+# Schema setup and shutdown belong to the server
+_LOCAL_NOOPS = {"database.init_db", "database.close_db"}
+
+
+def _decode_order(row):
+    order_id, order_date, status, customer_name, metodo_pago, es_socio, items, total_price, total_due = row
+    return database.Order(order_id, order_date, status, customer_name, metodo_pago, es_socio,
+                          tuple(database.OrderItem(*item) for item in items), total_price, total_due)
+
+def _decode_rows(rows):
+    return [tuple(row) for row in rows]
+
+_DECODERS = {
+    "database.get_products": _decode_rows,
+    "database.get_product": lambda row: tuple(row) if row is not None else None,
+    "database.get_catalogue": lambda result: (result[0], _decode_rows(result[1]) if result[1] is not None else None),
+    "database.verify_catalogue": lambda differences: [(product_id, tuple(cached) if cached else None, tuple(current) if current else None)
+                                                      for product_id, cached, current in differences],
+    "database.get_orders_page": lambda rows: [_decode_order(row) for row in rows],
+    "reporting.build_sales_report": lambda report: reporting.SalesReport(*report),
+}
+
+
+class RemoteError(Exception):
+    # Any other failure reported by the server
+    def __init__(self, error_type, message):
+        self.error_type = error_type
+        super().__init__(f"{error_type}: {message}")
+
+
+class _RemoteModule:
+    def __init__(self, client, prefix, local_module):
+        self._client = client
+        self._prefix = prefix
+        self._local_module = local_module
+
+    def __getattr__(self, name):
+        full_name = f"{self._prefix}.{name}"
+        if full_name in READS or full_name in WRITES:
+            return functools.partial(self._client.call, full_name)
+        if full_name in _LOCAL_NOOPS:
+            return lambda *args, **kwargs: None
+        value = getattr(self._local_module, name)
+        if callable(value) and not isinstance(value, type):
+            raise AttributeError(f"{full_name} is not available through the order server")
+        return value
+
+
+class OrderClient:
+    def __init__(self, url, timeout=30):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 8765
+        self.timeout = timeout
+        self._local = threading.local() # One keep-alive connection per thread
+
+        self.database = _RemoteModule(self, "database", database)
+        self.export = _RemoteModule(self, "export", export)
+        self.reporting = _RemoteModule(self, "reporting", reporting)
+
+    def _request(self, method, path, body=None, timeout=None):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout or self.timeout)
+        conn.timeout = timeout or self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = json.loads(response.read())
+        except (http.client.HTTPException, OSError):
+            # Stale keep-alive connection: reconnect on the next call
+            conn.close()
+            self._local.conn = None
+            raise
+        return response.status, payload
+
+    def call(self, name, *args, **kwargs):
+        # Callbacks such as export's progress can't cross the process boundary
+        kwargs = {key: value for key, value in kwargs.items() if not callable(value)}
+        status, payload = self._request("POST", "/rpc", json.dumps({"name": name, "args": args, "kwargs": kwargs}))
+        error = payload.get("error")
+        if error is None:
+            decode = _DECODERS.get(name)
+            return decode(payload["result"]) if decode else payload["result"]
+        if error["type"] == "StockShortageError":
+            raise database.StockShortageError([tuple(shortage) for shortage in error["shortages"]])
+        if error["type"] == "StaleProductError":
+            raise database.StaleProductError(error["product_id"])
+        raise RemoteError(error["type"], error["message"])
+
+    def wait_events(self, since, timeout=25):
+        # Blocks until something changes after event `since` (or the
+        # timeout). Returns (latest seq, [events.Event]); since=-1 returns the
+        # current seq right away.
+        status, payload = self._request("GET", f"/events?since={since}&timeout={timeout}", timeout=timeout + 10)
+        return payload["seq"], [events.Event(kind, tuple(ids)) for kind, ids in payload["events"]]
+
+
+class EventListener:
+    # Background thread long-polling the server's events; each batch of
+    # events.Event is put on `changes` for the Tk loop to pick up
+    def __init__(self, client, changes):
+        self.client = client
+        self.changes = changes
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="order-events", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        # Start from the server's current position: the views load everything on start
+        since = -1
+        while not self.stopped.is_set():
+            try:
+                seq, changes = self.client.wait_events(since)
+            except (http.client.HTTPException, OSError, ValueError):
+                self.stopped.wait(2) # Server unreachable: retry
+                continue
+            if changes:
+                self.changes.put(changes)
+            since = seq
@@ -0,0 +1,70 @@
+SOCIO_DISCOUNT = 0.15
+
+class OrderDraft:
+    # State of the order being built in CreateOrderWindow. Every click is O(1):
+    # the stock limit per product is precomputed when the window opens (stock
+    # plus what the edited order already holds), and the subtotal is kept as
+    # a running sum of integer cents so it never drifts.
+    def __init__(self, products, original_order=None):
+        # products: rows as returned by database.get_products()
+        # original_order: the database.Order being edited, if any
+        self.items = {} # product id -> {"name", "quantity", "price"}
+        self.original_quantities = {}
+        self.subtotal_cents = 0
+
+        if original_order is not None:
+            for item in original_order.items:
+                self.items[item.product_id] = {"name": item.product_name, "quantity": item.quantity, "price": item.item_price}
+                self.original_quantities[item.product_id] = item.quantity
+                self.subtotal_cents += item.quantity * self._cents(item.item_price)
+
+        self.catalogue = {}
+        self.available = {}
+        for product_id, name, price, stock, category in products:
+            self.catalogue[product_id] = (name, price)
+            self.available[product_id] = stock + self.original_quantities.get(product_id, 0)
+
+    @staticmethod
+    def _cents(price):
+        return round(price * 100)
+
+    def quantity(self, product_id):
+        item = self.items.get(product_id)
+        return item["quantity"] if item else 0
+
+    def increment(self, product_id):
+        # Returns False when there is no more stock for the product
+        if self.quantity(product_id) >= self.available.get(product_id, 0):
+            return False
+        item = self.items.get(product_id)
+        if item is None:
+            name, price = self.catalogue[product_id]
+            item = self.items[product_id] = {"name": name, "quantity": 0, "price": price}
+        item["quantity"] += 1
+        self.subtotal_cents += self._cents(item["price"])
+        return True
+
+    def decrement(self, product_id):
+        # Returns False when the product isn't in the order
+        item = self.items.get(product_id)
+        if item is None:
+            return False
+        item["quantity"] -= 1
+        self.subtotal_cents -= self._cents(item["price"])
+        if item["quantity"] == 0:
+            del self.items[product_id]
+        return True
+
+    def line_text(self, product_id):
+        item = self.items[product_id]
+        return f"{item['name']} x{item['quantity']} - ${item['quantity'] * item['price']:.2f}\n"
+
+    def totals(self, es_socio):
+        # (total to charge, socio discount)
+        subtotal = self.subtotal_cents / 100
+        discount = subtotal * SOCIO_DISCOUNT if es_socio == 1 else 0
+        return subtotal - discount, discount
+
+    def lines_for_db(self):
+        # (product_id, quantity, item_price) tuples for add_order/update_order
+        return [(pid, item["quantity"], item["price"]) for pid, item in self.items.items()]
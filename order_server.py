@@ -0,0 +1,323 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import traceback
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import connection
+import database
+import events
+import export
+import perf
+import reporting
+
+# Local order service, so several terminals can share one database: each
+# runs main.py --server http://<host>:<port> (see order_client.py) and this
+# process is the only one that opens stock_control.db.
+#
+#   python order_server.py [--db stock_control.db] [--host 127.0.0.1] [--port 8765]
+#
+# POST /rpc {"name": "database.add_order", "args": [...], "kwargs": {...}}
+#   calls one of the functions below and answers {"result": ...}, or
+#   {"error": {"type": ..., "message": ...}} (plus "shortages" or
+#   "product_id" for StockShortageError / StaleProductError).
+# GET /events?since=<seq>&timeout=<seconds>
+#   long poll: answers {"seq": ..., "events": [[kind, [ids]], ...]} with the
+#   events.Event published after event `since`, as soon as there is one or
+#   when the timeout runs out. since=-1 answers the current seq right away.
+#
+# Reads run on the request threads (WAL lets them run next to the writer).
+# Writes are queued to a single writer thread that commits them in groups:
+# everything queued by the time it gets to run goes into one transaction,
+# each request inside its own SAVEPOINT, so one failed request doesn't undo
+# the others. Under load that's one commit per batch instead of per order,
+# and the terminals never contend for the file lock. The events the
+# database functions publish (see events.py) are logged as each batch
+# commits and handed to every terminal through /events.
+
+DEFAULT_PORT = 8765
+MAX_BATCH = 64
+EVENT_HISTORY = 1000
+MAX_EVENT_WAIT = 60
+
+READS = {
+    "database.get_products": database.get_products,
+    "database.get_product": database.get_product,
+    "database.get_catalogue": database.get_catalogue,
+    "database.verify_catalogue": database.verify_catalogue,
+    "database.get_orders_page": database.get_orders_page,
+    "database.get_total_sales": database.get_total_sales,
+    "database.get_total_sales_by_payment_method": database.get_total_sales_by_payment_method,
+    "reporting.build_sales_report": reporting.build_sales_report,
+}
+
+# name -> (function, results that mean it failed)
+WRITES = {
+    "database.add_order": (database.add_order, (None,)),
+    "database.add_orders_bulk": (database.add_orders_bulk, (None,)),
+    "database.update_order": (database.update_order, (False,)),
+    "database.update_order_status_and_payment_method": (database.update_order_status_and_payment_method, ()),
+    "database.add_product": (database.add_product, (False,)),
+    "database.update_product": (database.update_product, (False,)),
+    "export.export_and_clear_orders": (export.export_and_clear_orders, ()),
+}
+# Writes that manage their own transactions and run alone
+UNBATCHED = {"export.export_and_clear_orders"}
+
+def _decode_bulk_orders(args, kwargs):
+    # The BulkOrders arrive as plain JSON lists
+    if args:
+        args = [[database.BulkOrder._make(order) for order in args[0]]] + list(args[1:])
+    if "orders" in kwargs:
+        kwargs = dict(kwargs, orders=[database.BulkOrder._make(order) for order in kwargs["orders"]])
+    return args, kwargs
+
+# name -> decode(args, kwargs): rebuilds the arguments JSON flattened
+# (the counterpart of order_client._DECODERS for results)
+_ARGUMENT_DECODERS = {
+    "database.add_orders_bulk": _decode_bulk_orders,
+}
+
+
+class EventLog:
+    # Numbered events.Event, kept for the long polls of /events
+    def __init__(self, history=EVENT_HISTORY):
+        self.seq = 0
+        self.events = deque(maxlen=history) # (seq, event)
+        self.changed = threading.Condition()
+
+    def publish(self, event):
+        with self.changed:
+            self.seq += 1
+            self.events.append((self.seq, event))
+            self.changed.notify_all()
+
+    def wait(self, since, timeout):
+        # (latest seq, events after `since`). A client too far behind the
+        # history, or from before a restart, gets a single RESYNC, so it
+        # reloads everything.
+        with self.changed:
+            if since < 0:
+                return self.seq, []
+            if since > self.seq:
+                # The server restarted since the client last asked
+                return self.seq, [events.Event(events.RESYNC, ())]
+            self.changed.wait_for(lambda: self.seq > since, timeout)
+            if self.seq <= since:
+                return self.seq, []
+            if not self.events or self.events[0][0] > since + 1:
+                return self.seq, [events.Event(events.RESYNC, ())]
+            return self.seq, [event for seq, event in self.events if seq > since]
+
+
+class _RequestFailed(Exception):
+    # A write returned one of its failure results: undo its savepoint
+    pass
+
+
+class _WriteRequest:
+    def __init__(self, name, args, kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+def _error_payload(error):
+    payload = {"type": type(error).__name__, "message": str(error)}
+    if isinstance(error, database.StockShortageError):
+        payload["shortages"] = error.shortages
+    elif isinstance(error, database.StaleProductError):
+        payload["product_id"] = error.product_id
+    return payload
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive: one connection per terminal thread
+    # Headers and body go out in separate writes; without TCP_NODELAY each
+    # answer waits on the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def finish(self):
+        super().finish()
+        # Each client connection gets its own handler thread and database connection
+        connection.close_thread()
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/rpc":
+            self.send_json(404, {"error": {"type": "NotFound", "message": self.path}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            name = request["name"]
+            args = request.get("args", [])
+            kwargs = request.get("kwargs", {})
+        except (ValueError, KeyError) as e:
+            self.send_json(400, {"error": {"type": "BadRequest", "message": str(e)}})
+            return
+
+        if name not in READS and name not in WRITES:
+            self.send_json(400, {"error": {"type": "BadRequest", "message": f"unknown function {name}"}})
+            return
+        try:
+            result = self.server.call(name, args, kwargs)
+        except (database.StockShortageError, database.StaleProductError) as e:
+            self.send_json(409, {"error": _error_payload(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self.send_json(500, {"error": _error_payload(e)})
+        else:
+            self.send_json(200, {"result": result})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/events":
+            self.send_json(404, {"error": {"type": "NotFound", "message": url.path}})
+            return
+        query = parse_qs(url.query)
+        try:
+            since = int(query.get("since", ["0"])[0])
+            timeout = min(float(query.get("timeout", ["25"])[0]), MAX_EVENT_WAIT)
+        except ValueError as e:
+            self.send_json(400, {"error": {"type": "BadRequest", "message": str(e)}})
+            return
+        seq, changes = self.server.events.wait(since, timeout)
+        self.send_json(200, {"seq": seq, "events": changes})
+
+
+class OrderServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128 # Many terminals may (re)connect at once
+
+    def __init__(self, address, max_batch=MAX_BATCH):
+        super().__init__(address, _Handler)
+        self.max_batch = max_batch
+        self.events = EventLog()
+        # Database events fire on the writer thread as each batch commits
+        events.subscribe(self.events.publish)
+        self.writes = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="order-writer", daemon=True)
+        self.writer.start()
+
+    def call(self, name, args, kwargs):
+        decode = _ARGUMENT_DECODERS.get(name)
+        if decode:
+            args, kwargs = decode(args, kwargs)
+        if name in READS:
+            return READS[name](*args, **kwargs)
+        request = _WriteRequest(name, args, kwargs)
+        self.writes.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def stop(self):
+        self.shutdown()
+        self.close()
+
+    def close(self):
+        self.server_close()
+        self.writes.put(None)
+        self.writer.join()
+        events.unsubscribe(self.events.publish)
+
+    def _write_loop(self):
+        while True:
+            request = self.writes.get()
+            if request is None:
+                break
+            batch = [request]
+            while len(batch) < self.max_batch and batch[-1].name not in UNBATCHED:
+                try:
+                    request = self.writes.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None or request.name in UNBATCHED:
+                    self.writes.put(request) # Runs after this batch
+                    break
+                batch.append(request)
+
+            if batch[0].name in UNBATCHED:
+                self._run_alone(batch[0])
+            else:
+                self._run_batch(batch)
+        connection.close_thread()
+
+    def _run_alone(self, request):
+        function, failures = WRITES[request.name]
+        try:
+            request.result = function(*request.args, **request.kwargs)
+        except Exception as e:
+            request.error = e
+        request.done.set()
+
+    def _run_batch(self, batch):
+        try:
+            with connection.transaction(database.DATABASE_NAME, immediate=True):
+                for request in batch:
+                    function, failures = WRITES[request.name]
+                    try:
+                        with connection.savepoint(database.DATABASE_NAME, "request"):
+                            request.result = function(*request.args, **request.kwargs)
+                            if request.result in failures:
+                                raise _RequestFailed()
+                    except _RequestFailed:
+                        pass
+                    except Exception as e:
+                        request.error = e
+        except Exception as e:
+            # The commit itself failed: none of the batch was saved
+            traceback.print_exc()
+            for request in batch:
+                request.error = request.error or e
+
+        # Answer only once the batch is committed (and its events published)
+        for request in batch:
+            request.done.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de pedidos de Control de Stock")
+    parser.add_argument("--db", default=database.DATABASE_NAME, help="database file (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port (default: %(default)s)")
+    parser.add_argument("--perf", action="store_true", help="record database latencies and statement counts, written as JSON on exit")
+    args = parser.parse_args(argv)
+
+    if args.perf:
+        perf.enable(tk=False)
+    database.DATABASE_NAME = args.db
+    database.init_db()
+    server = OrderServer((args.host, args.port))
+    print(f"Serving {args.db} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        database.close_db()
+        if args.perf:
+            print(f"Performance data written to {perf.dump()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
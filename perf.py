@@ -0,0 +1,233 @@
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+
+import connection
+
+# Hot-path instrumentation, off unless enable() is called (main.py --perf,
+# order_server.py --perf, or Ctrl+Shift+P in the app). While off, an
+# instrumented function costs one flag check on top of its own call; the
+# SQLite trace callback and the Tk widget hooks aren't installed at all.
+#
+# Latencies go into log-scale histograms (BUCKETS_PER_DOUBLING buckets per
+# power of two, so percentiles are within ~9%), which stay the same size
+# however many calls they record. snapshot() summarizes them for the
+# "Rendimiento" tab and dump() writes them out as JSON.
+
+BUCKETS_PER_DOUBLING = 8
+
+_enabled = False
+_lock = threading.Lock()
+_histograms = {} # name -> Histogram
+_statements = {} # first keyword of the SQL statement -> count
+_widgets = {} # widget class -> [created, destroyed]
+_since = None # time.time() of the last enable() or reset()
+# Bumped by enable() and reset(): a widget's destroy is only counted if its
+# creation was, in the same generation, so the alive counts never go negative
+_generation = 0
+_tk_hooks = None # The original tkinter.BaseWidget methods, while patched
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {} # bucket -> count; bucket b holds up to 2 ** (b / BUCKETS_PER_DOUBLING) us
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = seconds * 1e6
+        bucket = math.ceil(math.log2(micros) * BUCKETS_PER_DOUBLING) if micros > 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding that fraction of the calls, in seconds
+        target = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(2 ** (bucket / BUCKETS_PER_DOUBLING) / 1e6, self.max)
+        return self.max
+
+
+def is_enabled():
+    return _enabled
+
+def enable(tk=True):
+    # tk=False leaves tkinter alone (the order server)
+    global _enabled, _since, _generation
+    if _enabled:
+        return
+    _since = time.time()
+    _generation += 1
+    connection.set_trace_callback(_count_statement)
+    if tk:
+        _hook_tk()
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+    connection.set_trace_callback(None)
+    _unhook_tk()
+
+def reset():
+    global _since, _generation
+    with _lock:
+        _histograms.clear()
+        _statements.clear()
+        _widgets.clear()
+        _since = time.time()
+        _generation += 1
+
+def record(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(seconds)
+
+def timed(name):
+    # Decorator: records each call of the function under `name`. For a
+    # generator function that is the time spent producing all of its items,
+    # not just creating the generator.
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            return _timed_generator(name, fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def _timed_generator(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return (yield from fn(*args, **kwargs))
+        generator = fn(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                # Only the time inside the generator, not the consumer's
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            generator.close()
+            record(name, elapsed)
+    return wrapper
+
+def instrument(namespace, prefix):
+    # Wraps every public function defined in a module with timed(), called
+    # at the end of the module as instrument(globals(), "database"). Done at
+    # import, so references taken later (order_server.READS) are covered too.
+    for name, value in list(namespace.items()):
+        if (not name.startswith("_") and callable(value) and not isinstance(value, type)
+                and getattr(value, "__module__", None) == namespace["__name__"]):
+            namespace[name] = timed(f"{prefix}.{name}")(value)
+
+def refresh(name, callback):
+    # For a view refresh that runs on the database worker: returns the
+    # on_done callback, recording from now until the callback has drawn the
+    # result (queueing, query and redraw)
+    if not _enabled:
+        return callback
+    start = time.perf_counter()
+    def done(*args):
+        try:
+            return callback(*args)
+        finally:
+            record(name, time.perf_counter() - start)
+    return done
+
+def _count_statement(statement):
+    # Called by sqlite3 for every statement run, on the thread that ran it
+    parts = statement.split(None, 1)
+    keyword = parts[0].upper() if parts else "?"
+    with _lock:
+        _statements[keyword] = _statements.get(keyword, 0) + 1
+
+def _hook_tk():
+    global _tk_hooks
+    import tkinter
+    if _tk_hooks is not None:
+        return
+    original_init, original_destroy = tkinter.BaseWidget.__init__, tkinter.BaseWidget.destroy
+
+    def count(widget, index):
+        with _lock:
+            counts = _widgets.setdefault(type(widget).__name__, [0, 0])
+            counts[index] += 1
+
+    def __init__(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self._perf_generation = _generation
+        count(self, 0)
+
+    def destroy(self):
+        # Widgets created before recording started (or before a reset) aren't counted
+        if getattr(self, "_perf_generation", None) == _generation:
+            count(self, 1)
+        original_destroy(self)
+
+    tkinter.BaseWidget.__init__, tkinter.BaseWidget.destroy = __init__, destroy
+    _tk_hooks = (original_init, original_destroy)
+
+def _unhook_tk():
+    global _tk_hooks
+    if _tk_hooks is None:
+        return
+    import tkinter
+    tkinter.BaseWidget.__init__, tkinter.BaseWidget.destroy = _tk_hooks
+    _tk_hooks = None
+
+def snapshot():
+    # {"timings": {name: {count, mean/p50/p95/p99/max in ms}}, "statements":
+    # {keyword: count}, "widgets": {class: {created, destroyed, alive}}}
+    with _lock:
+        timings = {name: {
+            "count": histogram.count,
+            "mean_ms": histogram.total / histogram.count * 1000,
+            "p50_ms": histogram.percentile(0.50) * 1000,
+            "p95_ms": histogram.percentile(0.95) * 1000,
+            "p99_ms": histogram.percentile(0.99) * 1000,
+            "max_ms": histogram.max * 1000,
+        } for name, histogram in sorted(_histograms.items())}
+        statements = dict(sorted(_statements.items(), key=lambda item: -item[1]))
+        widgets = {name: {"created": created, "destroyed": destroyed, "alive": created - destroyed}
+                   for name, (created, destroyed) in sorted(_widgets.items())}
+    return {"since": _since, "timings": timings, "statements": statements, "widgets": widgets}
+
+def dump(path=None):
+    # Writes snapshot() plus the raw histogram buckets (upper bound in ms ->
+    # count) as JSON, for offline analysis. Returns the path written.
+    if path is None:
+        path = time.strftime("rendimiento_%Y%m%d_%H%M%S.json")
+    data = snapshot()
+    with _lock:
+        data["buckets"] = {name: {f"{2 ** (bucket / BUCKETS_PER_DOUBLING) / 1000:.4f}": count for bucket, count in sorted(histogram.buckets.items())}
+                           for name, histogram in sorted(_histograms.items())}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
@@ -0,0 +1,106 @@
+import unicodedata
+
+# Product search for the order window. Every word of a product's name and
+# category is indexed twice: by its first one and two letters (short
+# queries match the start of a word, "em" -> "Empanada") and by its
+# trigrams (longer queries match anywhere in a word, "zza" -> "Pizza"). A
+# query is split into terms and a product matches when every term does, so
+# a keystroke costs a few set intersections instead of a scan of the whole
+# catalogue. Accents and case are ignored ("jamon" finds "Jamón").
+
+SHORT_TERM = 3 # Terms shorter than this match word starts only
+
+
+def normalize(text):
+    text = text or ""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def _trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self.entries = {} # product id -> (normalized name, normalized name and category)
+        self.sources = {} # product id -> (name, category) the entry was made from
+        self.positions = {} # product id -> index in the last get_products() rows, for ranking
+        self.prefixes = {} # first 1 or 2 letters of a word -> product ids
+        self.trigrams = {} # trigram -> product ids
+
+    def update(self, products):
+        # Brings the index in line with `products` (rows as returned by
+        # database.get_products()); only added, renamed, recategorised or
+        # removed products touch the postings
+        current = set()
+        for position, (product_id, name, price, stock, category) in enumerate(products):
+            current.add(product_id)
+            self.positions[product_id] = position
+            if self.sources.get(product_id) != (name, category):
+                self._remove(product_id)
+                self.sources[product_id] = (name, category)
+                self._add(product_id, (normalize(name), normalize(f"{name} {category or ''}")))
+        for product_id in [product_id for product_id in self.entries if product_id not in current]:
+            self._remove(product_id)
+            del self.sources[product_id]
+            del self.positions[product_id]
+
+    def _keys(self, entry):
+        for word in set(entry[1].split()):
+            for length in range(1, SHORT_TERM):
+                if len(word) >= length:
+                    yield self.prefixes, word[:length]
+            for trigram in _trigrams(word):
+                yield self.trigrams, trigram
+
+    def _add(self, product_id, entry):
+        self.entries[product_id] = entry
+        for postings, key in self._keys(entry):
+            postings.setdefault(key, set()).add(product_id)
+
+    def _remove(self, product_id):
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+        for postings, key in self._keys(entry):
+            ids = postings[key]
+            ids.discard(product_id)
+            if not ids:
+                del postings[key]
+
+    def _term_ids(self, term):
+        if len(term) < SHORT_TERM:
+            return self.prefixes.get(term, set())
+        postings = sorted((self.trigrams.get(trigram, set()) for trigram in _trigrams(term)), key=len)
+        ids = postings[0].intersection(*postings[1:])
+        if len(term) == SHORT_TERM:
+            return ids
+        # Every trigram present doesn't mean they are in a row
+        return {product_id for product_id in ids if term in self.entries[product_id][1]}
+
+    def search(self, query):
+        # Ids of the matching products, or None when the query is empty (show
+        # everything). The result may be one of the index's own sets: read only.
+        terms = normalize(query).split()
+        if not terms:
+            return None
+        ids = None
+        for term in sorted(set(terms), key=len, reverse=True): # Longest, usually rarest, first
+            term_ids = self._term_ids(term)
+            ids = term_ids if ids is None else ids & term_ids
+            if not ids:
+                break
+        return ids
+
+    def best(self, query, ids):
+        # The match Enter adds: names starting with the query first, then
+        # names containing it, then category matches; ties in catalogue order
+        if not ids:
+            return None
+        text = " ".join(normalize(query).split())
+        def rank(product_id):
+            name = self.entries[product_id][0]
+            return (0 if name.startswith(text) else 1 if text in name else 2, self.positions[product_id])
+        return min(ids, key=rank)